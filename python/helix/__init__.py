@@ -13,7 +13,10 @@ from helix.database.fix import Fix
 from helix.database.publishedFile import PublishedFile
 from helix.database.snapshot import Snapshot
 from helix.database.stage import Stage
-from helix.database.sql import Manager
+from helix.database.sql import Manager, transaction
+from helix.database.identity import identityMap
+from helix.database.search import search
+from helix.database.changes import changesSince, ChangeFeed
 from helix.environment.permissions import PermissionGroup
 
 root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -1,7 +1,7 @@
 import sys, os, shlex, shutil, getpass, traceback
 import argparse
 import helix.environment.environment as env
-from helix import hxdb, Show, Sequence, Shot, Element, Stage, Snapshot
+from helix import hxdb, Show, Sequence, Shot, Element, Stage, Snapshot, transaction, identityMap
 from helix.api.exceptions import *
 from helix.environment.permissions import PermissionHandler, permissionCheck
 
@@ -31,21 +31,23 @@ def rmshow(showName, clean=False):
 	if not show:
 		raise DatabaseError('Didn\'t recognize show: {}'.format(showName))
 
-	seqs = show.getSequences()
+	# All or nothing, we don't want to be left with half a show
+	with transaction():
+		seqs = show.getSequences()
 
-	for seq in seqs:
-		rmseq(seq.num, clean=clean)
+		for seq in seqs:
+			rmseq(seq.num, clean=clean)
 
-	for el in show.getElements(exclusive=True):
-		if el.delete(clean):
-			continue
-		else:
-			raise DatabaseError('Unable to delete: {}. Cannot continue deletion.'.format(el))
+		for el in show.getElements(exclusive=True):
+			if el.delete(clean):
+				continue
+			else:
+				raise DatabaseError('Unable to delete: {}. Cannot continue deletion.'.format(el))
 
-	if not show.delete(clean):
-		raise DatabaseError('Unable to delete show')
-	else:
-		print 'Successfully removed show'
+		if not show.delete(clean):
+			raise DatabaseError('Unable to delete show')
+
+	print 'Successfully removed show'
 
 @permissionCheck('CREATE_SEQ')
 def mkseq(seqNum):
@@ -62,39 +64,41 @@ def rmseq(seqNum, clean=False):
 	if not seq.exists():
 		raise DatabaseError('Sequence {} doesn\'t exist'.format(seqNum))
 
-	shots = seq.getShots()
+	with transaction():
+		shots = seq.getShots()
 
-	for shot in shots:
-		rmshot(seqNum, shot.num, clipName=shot.clipName, clean=clean)
+		for shot in shots:
+			rmshot(seqNum, shot.num, clipName=shot.clipName, clean=clean)
 
-	for el in seq.getElements(exclusive=True):
-		if el.delete(clean):
-			continue
-		else:
-			raise DatabaseError('Unable to delete: {}. Cannot continue deletion.'.format(el))
+		for el in seq.getElements(exclusive=True):
+			if el.delete(clean):
+				continue
+			else:
+				raise DatabaseError('Unable to delete: {}. Cannot continue deletion.'.format(el))
 
-	if not seq.delete(clean):
-		raise DatabaseError('Unable to delete sequence')
-	else:
-		print 'Successfully removed sequence'
+		if not seq.delete(clean):
+			raise DatabaseError('Unable to delete sequence')
+
+	print 'Successfully removed sequence'
 
 @permissionCheck('CREATE_SHOT')
 def mkshot(seqNum, shotNum, start=0, end=0, clipName=None, stages='delivered'):
 	shot = Shot(shotNum, seqNum, start=start, end=end, clipName=clipName, makeDirs=True)
 
-	if shot.insert():
-		stages = [s.strip().lower() for s in stages.split(',')]
+	stages = [s.strip().lower() for s in stages.split(',')]
 
-		if 'delivered' not in stages:
-			stages.append('delivered')
+	if 'delivered' not in stages:
+		stages.append('delivered')
 
-		for stage in stages:
-			shot.addStage(stage)
+	# Don't leave a shot without its stages if any of them are invalid
+	with transaction():
+		if not shot.insert():
+			raise DatabaseError('Failed to create shot. Does this number already exist?')
 
-		print 'Successfully created shot {}'.format(shot.num)
-		return True
-	else:
-		raise DatabaseError('Failed to create shot. Does this number already exist?')
+		shot.addStages(stages)
+
+	print 'Successfully created shot {}'.format(shot.num)
+	return True
 
 @permissionCheck('DELETE_SHOT')
 def rmshot(seqNum, shotNum, clipName=None, clean=False):
@@ -103,16 +107,17 @@ def rmshot(seqNum, shotNum, clipName=None, clean=False):
 	if not shot:
 		raise DatabaseError('Shot {} doesn\'t exist for sequence {}'.format(shotNum, seqNum))
 
-	for el in shot.getElements(exclusive=True):
-		if el.delete(clean):
-			continue
-		else:
-			raise DatabaseError('Unable to delete: {}. Cannot continue deletion.'.format(el))
+	with transaction():
+		for el in shot.getElements(exclusive=True):
+			if el.delete(clean):
+				continue
+			else:
+				raise DatabaseError('Unable to delete: {}. Cannot continue deletion.'.format(el))
 
-	if not shot.delete(clean):
-		raise DatabaseError('Unable to delete shot')
-	else:
-		print 'Successfully removed shot'
+		if not shot.delete(clean):
+			raise DatabaseError('Unable to delete shot')
+
+	print 'Successfully removed shot'
 
 @permissionCheck('POP')
 def pop(showName):
@@ -155,7 +160,8 @@ def get(elType, name=None, sequence=None, shot=None):
 
 @permissionCheck('CREATE_SNAPSHOT')
 def mksnapshot(input, sequence, shot, clipName=None, commentText='', blackBars=False, shotNum=False, frame=False, author=False, comment=False, stages=False, date=False):
-	snapshot = Snapshot(shot, sequence, clipName=clipName, comment=commentText, makeDirs=True)
+	snapshot = Snapshot(shot, sequence, clipName=clipName, comment=commentText)
+	snapshot.reserveNum()
 
 	import helix.api.nuke as hxnk
 	from helix.api.nuke.scripts import makeSnapshot
@@ -305,7 +311,7 @@ def shots(seqNum):
 	print '\n'.join([str(s) for s in sorted(seq.getShots(), key=lambda x: x.get('num'))])
 
 @permissionCheck('VIEW_ELEMENTS')
-def elements(elType=None, sequence=None, shot=None, date=None):
+def elements(elType=None, sequence=None, shot=None, date=None, limit=None):
 	if elType:
 		elType = elType.split(',')
 
@@ -316,12 +322,13 @@ def elements(elType=None, sequence=None, shot=None, date=None):
 	elif sequence:
 		container = env.getShow().getSequence(sequence)
 
-	els = container.getElements(types=elType)
+	els = container.iterElements(types=elType, limit=limit)
 
 	if date:
-		els = [e for e in els if e.isMoreRecent(date)]
+		els = (e for e in els if e.isMoreRecent(date))
 
-	print '\n'.join([str(el) for el in els])
+	for el in els:
+		print el
 
 @permissionCheck('DELETE_ELEMENT')
 def rme(elType, name, sequence=None, shot=None, clipName=None, clean=False):
@@ -636,6 +643,7 @@ def main(cmd, argv):
 		parser.add_argument('elType', help='A comma separated list of elements to filter by', default=None, nargs='?')
 		parser.add_argument('--sequence', '-sq', default=None, help='The sequence number to get elements from')
 		parser.add_argument('--shot', '-s', default=None, help='The shot number to get elements from')
+		parser.add_argument('--limit', '-l', default=None, type=int, help='Only list the first this many elements, by type and name')
 
 		args = {k:v for k,v in vars(parser.parse_args(argv)).items() if v is not None}
 
@@ -749,7 +757,9 @@ def handleInput(line):
 		cmd = argv[0]
 
 		try:
-			return main(cmd, argv[1:])
+			# Each command resolves the same show/sequence/shot many times over
+			with identityMap():
+				return main(cmd, argv[1:])
 		except Exception as e:
 			if env.DEBUG:
 				print traceback.format_exc()
@@ -33,7 +33,8 @@ class Nuke(DCCPackage):
 
 		# File browser quick links
 		try:
-			element = Element.fromPk(hxenv.getEnvironment('element'))
+			# Walking up to the show below doesn't need to query for each parent then
+			element = Element.fromPk(hxenv.getEnvironment('element'), eager=True)
 
 			if element:
 				nuke.addFavoriteDir(
@@ -0,0 +1,110 @@
+"""A feed of the changes made to the database, so that clients can keep what they've loaded
+up to date by applying only what changed since they last looked, rather than reloading
+everything:
+
+	feed = helix.ChangeFeed()
+
+	# Later, i.e. on a timer
+	for change in feed.poll():
+		print change.table, change.pk, change.op
+
+Triggers on every table (see migrations) add a row to the changelog for each row inserted,
+updated or deleted, numbered by an ever increasing seq. A change to a fix's comments is
+logged as an update of the fix. Before reading the changelog, polling checks SQLite's PRAGMA
+data_version, which only moves when some other connection commits, so a poll while nothing
+happened doesn't run any query at all.
+
+Only the last 100000 changes are kept. Clients that fall further behind than that are
+told to reload everything instead (changesSince returns None).
+"""
+import collections
+
+Change = collections.namedtuple('Change', ('seq', 'table', 'pk', 'op'))
+
+def latest():
+	"""The seq of the last change made, for clients to start following changes from after
+	they've loaded everything
+	"""
+	from helix.database.sql import Manager
+
+	with Manager(willCommit=False) as mgr:
+		return _latest(mgr.connection())
+
+def changesSince(seq, tables=None):
+	"""Gets the changes made after the given one
+
+	Args:
+	    seq (int): The seq of the last change the client has seen, see latest
+	    tables (list, optional): Only changes to these tables, defaults to all
+
+	Returns:
+	    list: The Change for each inserted, updated or deleted row, oldest first. A row changed
+	    	several times has a Change for each. None if some of the changes since then are no
+	    	longer kept (or the database was remade), everything has to be reloaded instead.
+	"""
+	from helix.database.sql import Manager
+
+	with Manager(willCommit=False) as mgr:
+		return _since(mgr.connection(), seq, tables)[0]
+
+class ChangeFeed(object):
+	def __init__(self, since=None, tables=None):
+		"""Follows the changes made to the database, see poll
+
+		Args:
+		    since (int, optional): The seq of the last change already seen, defaults to the
+		    	latest one
+		    tables (list, optional): Only changes to these tables, defaults to all
+		"""
+		self.seq = latest() if since is None else since
+		self.tables = tables
+		self._conn = None
+		self._dataVersion = None
+
+	def poll(self):
+		"""Gets the changes made since the last poll. Cheap enough to call every second or so,
+		it only reads the changelog if something was committed since the last time.
+
+		Returns:
+		    list: The new changes, oldest first (see changesSince), or None if the feed has
+		    	fallen too far behind and everything has to be reloaded. The feed carries on
+		    	from the latest change either way.
+		"""
+		from helix.database.sql import Manager
+
+		with Manager(willCommit=False) as mgr:
+			conn = mgr.connection()
+			dataVersion = conn.execute('PRAGMA data_version').fetchone()[0]
+
+			# data_version is per connection, the pooled one may have been swapped out since
+			if conn is self._conn and dataVersion == self._dataVersion:
+				return []
+
+			self._conn = conn
+			self._dataVersion = dataVersion
+
+			changes, self.seq = _since(conn, self.seq, self.tables)
+
+			return changes
+
+def _latest(conn):
+	return conn.execute('SELECT MAX(seq) FROM changelog').fetchone()[0] or 0
+
+def _since(conn, seq, tables):
+	"""Returns:
+	    tuple: The changes after the given seq (see changesSince) and the seq of the latest
+	    	change, to carry on from
+	"""
+	from helix.database.query import Query
+
+	first, last = conn.execute('SELECT MIN(seq), MAX(seq) FROM changelog').fetchone()
+	last = last or 0
+
+	# Pruned past where the client is, or the client is ahead of a changelog that was remade
+	if seq > last or (first is not None and seq < first - 1):
+		return None, last
+
+	query = Query('changelog', ['seq', 'tableName', 'pk', 'op']).whereRaw('seq>?', seq).whereRaw('seq<=?', last)
+	query.whereIn('tableName', tables).orderBy('seq')
+
+	return [Change(*row) for row in query.execute(conn).fetchall()], last
@@ -0,0 +1,75 @@
+"""Counters that hand out fix numbers (per show), snapshot numbers (per shot) and published
+file versions (per element), kept in a table of their own with one row per counter.
+
+Taking the next number is a single UPDATE of that row, made in the same write transaction
+as the insert that uses it. The transaction holds the database's write lock, so two artists
+publishing the same element at once can't both get the same version, which they could when
+the number was the MAX of the table read on a separate connection ahead of the insert.
+
+Counters that don't have a row yet (i.e. the first fix of a new show) start from the MAX
+of what's already in their table, so they pick up where the old numbering left off.
+"""
+
+# table -> (numbered column, the columns numbers are unique within)
+COUNTED = {
+	'fixes': ('num', ('show', )),
+	'snapshots': ('num', ('show', 'sequenceId', 'shotId')),
+	'publishedFiles': ('version', ('show', 'elementId'))
+}
+
+def name(table, *scope):
+	"""The name of the counter for the given table and values of its COUNTED columns, in
+	order, i.e. name('publishedFiles', 'foo', element.id)
+	"""
+	return u'/'.join([table] + [u'' if s is None else unicode(s) for s in scope])
+
+def peek(conn, table, *scope):
+	"""The number the given counter will hand out next, without taking it. Another process
+	may take it first, so this is only good for showing (see take).
+
+	Args:
+	    conn (sqlite3.Connection): The connection to read from
+	    table (str): The numbered table, see COUNTED
+	    *scope: The values of the table's COUNTED columns, in order
+
+	Returns:
+	    int: The next number
+	"""
+	row = conn.execute('SELECT value FROM counters WHERE name=?', (name(table, *scope), )).fetchone()
+
+	return (row[0] if row else _current(conn, table, scope)) + 1
+
+def take(conn, table, *scope):
+	"""Takes the next number of the given counter. Must be called in a write transaction
+	(i.e. inside a Manager that will commit), so that nothing else can take the same one
+	before the transaction ends. Numbers taken by a transaction that's rolled back are
+	handed out again.
+
+	Args:
+	    conn (sqlite3.Connection): The connection of the write transaction
+	    table (str): The numbered table, see COUNTED
+	    *scope: The values of the table's COUNTED columns, in order
+
+	Returns:
+	    int: The number, which is now taken
+	"""
+	key = name(table, *scope)
+
+	if conn.execute('UPDATE counters SET value=value+1 WHERE name=?', (key, )).rowcount == 0:
+		conn.execute('INSERT INTO counters (name, value) VALUES (?, ?)', (key, _current(conn, table, scope) + 1))
+
+	return conn.execute('SELECT value FROM counters WHERE name=?', (key, )).fetchone()[0]
+
+def _current(conn, table, scope):
+	"""The highest number in the table itself, for counters that don't have a row yet"""
+	from helix.database.query import Query
+
+	column, columns = COUNTED[table]
+	query = Query(table, ['MAX({})'.format(column)])
+
+	for c, value in zip(columns, scope):
+		query.where(c, value)
+
+	row = query.execute(conn).fetchone()
+
+	return int(row[0]) if row and row[0] else 0
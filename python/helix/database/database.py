@@ -14,14 +14,18 @@ __date__    = 07/28/18
 import sqlite3
 import shutil
 import hashlib
+import operator
+import collections
 from helix.database.sql import Manager
+from helix.database.query import Query
+from helix.database import identity, lineage
 from helix.api.exceptions import DatabaseError
 
 class DatabaseObject(object):
 	def get(self, attr, default=None):
 		with Manager(willCommit=False) as mgr:
 			try:
-				return mgr.connection().execute('SELECT {} FROM {} WHERE {}="{}"'.format(attr, self.table, self.pk, getattr(self, self.pk, None))).fetchone()[0]
+				return mgr.connection().execute('SELECT {} FROM {} WHERE {}=?'.format(attr, self.table, self.pk), (getattr(self, self.pk, None), )).fetchone()[0]
 			except sqlite3.OperationalError as e:
 				print 'No such attribute: {}, defaulting to {}'.format(attr, default)
 				return default
@@ -29,13 +33,8 @@ class DatabaseObject(object):
 	def set(self, attr, val, insertIfMissing=False):
 		with Manager() as mgr:
 			if self.exists():
-				mgr.connection().execute("UPDATE {} SET {}={} WHERE {}='{}'".format(
-					self.table,
-					attr,
-					"'{}'".format(val) if val is not None else "NULL",
-					self.pk,
-					getattr(self, self.pk))
-				)
+				mgr.connection().execute('UPDATE {} SET {}=? WHERE {}=?'.format(self.table, attr, self.pk), (val, getattr(self, self.pk)))
+				_written(self)
 			else:
 				setattr(self, attr, val)
 				if insertIfMissing:
@@ -43,11 +42,84 @@ class DatabaseObject(object):
 
 	def insert(self):
 		with Manager() as mgr:
+			self._beforeInsert(mgr.connection())
 			self._exists = mgr._insert(self.table, self)
+			_written(self)
 
 			return self._exists
 
+	@staticmethod
+	def insertMany(objs):
+		"""Inserts all the given objects in one transaction, batching the rows of each
+		table into a single statement. Much faster than calling insert() on each
+		when making a lot of objects at once (i.e. all the stages of a new shot).
+
+		Objects are inserted table by table, in the order each table is first seen,
+		so list parents before their children.
+
+		Args:
+		    objs (list): The DatabaseObjects to insert
+
+		Returns:
+		    list: Whether each object was inserted, in the same order as objs
+		"""
+		results = [False] * len(objs)
+
+		with Manager() as mgr:
+			for table, indexes in _groupByTable(objs):
+				batch = [objs[i] for i in indexes]
+
+				for obj in batch:
+					obj._beforeInsert(mgr.connection())
+
+				for i, obj, inserted in zip(indexes, batch, mgr._insertMany(table, batch)):
+					obj._exists = inserted
+					results[i] = inserted
+					_written(obj)
+
+		return results
+
+	def _beforeInsert(self, conn):
+		"""Called in the insert's write transaction right before the row is inserted, for
+		anything that has to be decided atomically with it (i.e. taking the next number from
+		helix.database.counters). Does nothing by default.
+
+		Args:
+		    conn (sqlite3.Connection): The connection of the write transaction
+		"""
+		pass
+
+	@staticmethod
+	def updateMany(objs, attrs):
+		"""Writes the current values of the given attributes of all the given objects
+		in one transaction, batching the rows of each table into a single statement.
+
+		Args:
+		    objs (list): The DatabaseObjects to update
+		    attrs (list): The attributes (columns) to update on each object
+
+		Returns:
+		    list: Whether each object was updated, in the same order as objs. Objects
+		    	that don't exist in the DB count as failed.
+		"""
+		if isinstance(attrs, basestring):
+			attrs = [attrs]
+
+		results = [False] * len(objs)
+
+		with Manager() as mgr:
+			for table, indexes in _groupByTable(objs):
+				batch = [objs[i] for i in indexes]
+
+				for i, obj, updated in zip(indexes, batch, mgr._updateMany(table, batch[0].pk, attrs, batch)):
+					results[i] = updated
+					_written(obj)
+
+		return results
+
 	def delete(self, clean=False):
+		_written(self)
+
 		with Manager() as mgr:
 			if clean:
 				try:
@@ -70,7 +142,7 @@ class DatabaseObject(object):
 
 		with Manager(willCommit=False) as mgr:
 			try:
-				rows = mgr.connection().execute('SELECT * FROM {} WHERE {}="{}"'.format(self.table, self.pk, getattr(self, self.pk, None))).fetchall()
+				rows = mgr.connection().execute('SELECT * FROM {} WHERE {}=?'.format(self.table, self.pk), (getattr(self, self.pk, None), )).fetchall()
 
 				if fetch:
 					return rows[0] if rows else None
@@ -84,23 +156,140 @@ class DatabaseObject(object):
 					return False
 
 	@classmethod
-	def fromPk(cls, pk):
+	def fromPk(cls, pk, eager=False):
 		if not pk:
 			return None
 
+		cache = identity.current()
+
+		if cache is not None:
+			obj = cache.get(cls, pk)
+
+			if obj is not None:
+				return obj
+
+		query = Query(cls.TABLE).where(cls.PK, pk)
+
+		if eager:
+			# Along with its parents, see iterQuery
+			objs = list(cls.iterQuery(query, eager=True))
+			obj = objs[0] if objs else None
+		else:
+			with Manager(willCommit=False) as mgr:
+				row = query.execute(mgr.connection()).fetchone()
+				obj = cls.rowMapper()(row) if row else None
+
+		if obj is not None and cache is not None:
+			cache.add(obj)
+
+		return obj
+
+	@classmethod
+	def iterQuery(cls, query, chunkSize=None, records=False, columns=None, limit=None, after=None, eager=False):
+		"""Runs the given query on this type's table, yielding each row as an object of this
+		type. Rows are fetched and hydrated a chunk at a time as the caller iterates, so only
+		one chunk is held in memory no matter how many rows match.
+
+		Given a limit or after, only one page of the results is returned, ordered by the
+		type's PAGE_KEY (or just its primary key). Pass the last object of a page as after
+		to get the next one:
+
+			page = show.getElements(limit=100)
+			nextPage = show.getElements(limit=100, after=page[-1])
+
+		Args:
+		    query (helix.database.query.Query): The query, selecting all columns
+		    chunkSize (int, optional): How many rows to fetch at a time
+		    records (bool, optional): Whether to yield read-only records (see recordType)
+		    	rather than full objects
+		    columns (list, optional): Only select these columns, see projection. The query's
+		    	own columns are replaced.
+		    limit (int, optional): The most objects to return
+		    after (DatabaseObject, optional): Only return the objects that come after this one
+		    	(or record, or tuple of its PAGE_KEY values) in page order
+		    eager (bool, optional): Whether to load the show, sequence, shot and element each
+		    	object belongs to (whichever it has) in the same query, so that walking up its
+		    	parents (i.e. Element.parent, Fix.target) doesn't have to query for each
+
+		Raises:
+		    ValueError: If asked for eagerly loaded records, they can't hold their parents
+
+		Returns:
+		    generator: The objects
+		"""
+		if eager and records:
+			raise ValueError('Records can\'t have their parents loaded eagerly')
+
+		relations = _relations(cls) if eager else []
+
+		if limit is not None or after is not None:
+			keys = getattr(cls, 'PAGE_KEY', (cls.PK, ))
+
+			if after is not None and isinstance(after, (DatabaseObject, Record)):
+				after = [getattr(after, k) for k in keys]
+
+			query.page(keys, after=after, limit=limit)
+
+			if columns:
+				# Need these to be able to get the next page
+				columns = list(columns) + list(keys)
+
+		if columns:
+			# Need these to be able to join the parents
+			columns = list(columns) + [col for _, col in relations]
+			query.columns = cls.projection(columns)
+
 		with Manager(willCommit=False) as mgr:
-			query = """SELECT * FROM {} WHERE {}='{}'""".format(
-				cls.TABLE,
-				cls.PK,
-				pk
-			)
+			mapRow = cls.mapper(records=records, columns=columns)
 
-			row = mgr.connection().execute(query).fetchone()
+			if not relations:
+				for row in query.iterate(mgr.connection(), chunkSize):
+					yield mapRow(row)
 
-			if row:
-				return cls.dummy().unmap(row)
+				return
 
-		return None
+			numColumns = len(cls.projection(columns) if columns else cls.columns())
+			outer = Query.wrap(query, 'base', ['base.*'] + ['{}.*'.format(rel.TABLE) for rel, _ in relations])
+			outer.orderBy(*['base.' + o for o in query.order])
+			parents = []
+			start = numColumns
+
+			for rel, col in relations:
+				outer.leftJoin(rel.TABLE, '{}.{}=base.{}'.format(rel.TABLE, rel.PK, col))
+				end = start + len(rel.columns())
+				parents.append((rel, rel.rowMapper(), start, end, start + [c for c, _ in rel.columns()].index(rel.PK)))
+				start = end
+
+			# Every object from this query shares the parents, each is only hydrated once
+			related = {}
+
+			for row in outer.iterate(mgr.connection(), chunkSize):
+				for rel, mapParent, start, end, pkIndex in parents:
+					key = (rel, row[pkIndex])
+
+					if key[1] is not None and key not in related:
+						parent = mapParent(row[start:end])
+						parent._eager = related
+						related[key] = parent
+
+				obj = mapRow(row[:numColumns])
+				obj._eager = related
+
+				yield obj
+
+	def _related(self, cls, pk):
+		"""Same as cls.fromPk(pk), but uses the object that was loaded along with this one if
+		it was loaded eagerly (see iterQuery)
+		"""
+		eager = self.__dict__.get('_eager')
+
+		if eager is not None:
+			obj = eager.get((cls, pk))
+
+			if obj is not None:
+				return obj
+
+		return cls.fromPk(pk)
 
 	def _id(self, token=''):
 		# It's useless to call this on a subclass that hasn't
@@ -109,62 +298,395 @@ class DatabaseObject(object):
 		return hashlib.md5(token).hexdigest()
 
 	def map(self):
-		with Manager(willCommit=False) as mgr:
-			values = ()
+		values = ()
 
-			for c, notNull in mgr.getColumnNames(self.table):
-				val = getattr(self, c, None)
+		for c, notNull in type(self).columns():
+			val = getattr(self, c, None)
 
-				if val is None and notNull:
-					raise ValueError('{} for {} cannot be null'.format(c, type(self).__name__))
+			if val is None and notNull:
+				raise ValueError('{} for {} cannot be null'.format(c, type(self).__name__))
 
-				values += (val, )
+			values += (val, )
 
-			return values
+		return values
 
 	def unmap(self, values):
+		return type(self).rowMapper()(values, self)
+
+	@classmethod
+	def columns(cls):
+		"""Returns:
+		    tuple: The (name, notNull) pair of each column in this type's table, in table order.
+		    	Cached by the Manager, so this doesn't hit the DB after the first call.
+		"""
 		with Manager(willCommit=False) as mgr:
-			for col, val in zip([c[0] for c in mgr.getColumnNames(self.table)], list(values)):
-				try:
-					setattr(self, col, val)
-				except:
-					# Gross, but for private variables we are
-					# probably calculating them a different way anyway
-					# when we retrieve them later
-					pass
+			return mgr.getColumnNames(cls.TABLE)
+
+	@classmethod
+	def rowMapper(cls, columns=None):
+		"""Builds a function that hydrates a row of this type's table into an instance.
+		The column lookup is done once up front, so mapping a whole result set is a tight
+		loop with no further queries. It's made once per set of columns and reused until
+		the schema changes (see Manager.clearSchemaCache):
+
+			mapRow = Element.rowMapper()
+			elements = [mapRow(r) for r in rows]
+
+		Args:
+		    columns (list, optional): The columns the rows have, see projection. Any others
+		    	are left unset on the instance, and loaded from the DB the first time one of
+		    	them is accessed.
+
+		Returns:
+		    function: Takes a row (and optionally an existing instance to map into, otherwise
+		    	a new dummy is made) and returns the mapped instance.
+		"""
+		key = (cls, tuple(columns) if columns else None)
+		mapRow = Manager._rowMappers.get(key)
+
+		if mapRow is not None:
+			return mapRow
+
+		# Gross, but for private variables we are probably calculating them
+		# a different way anyway when we retrieve them later, so skip columns
+		# that are read-only properties on the class
+		settable = []
+		deferred = []
+		idKey = None
+		idIndex = None
+		names = [col for col, _ in cls.columns()]
+		selected = cls.projection(columns) if columns else names
+
+		for col in names:
+			attr = getattr(cls, col, None)
+
+			if isinstance(attr, property) and attr.fset is None:
+				if isinstance(attr, _IdProperty) and col in selected:
+					# The row already has the id, no need to hash it again the first time it's used.
+					# If its fields are all in the row too take them straight from there
+					idIndex = selected.index(col)
+
+					if all([f in selected for f in attr.fields]):
+						idKey = operator.itemgetter(*[selected.index(f) for f in attr.fields])
+
+				continue
+
+			if col in selected:
+				settable.append((selected.index(col), col))
+			else:
+				deferred.append(col)
+
+		deferred = (selected.index(cls.PK), tuple(deferred)) if deferred else None
+		dummy = cls.dummy
+
+		def mapRow(row, obj=None):
+			if obj is None:
+				obj = dummy()
+
+				if deferred is not None:
+					# Drop the dummy's placeholders so that the real values get loaded instead
+					for col in deferred[1]:
+						obj.__dict__.pop(col, None)
+
+			for i, col in settable:
+				setattr(obj, col, row[i])
+
+			if idKey is not None:
+				obj._idMemo = (idKey(row), row[idIndex])
+
+			if deferred is not None:
+				obj._deferred = (row[deferred[0]], deferred[1])
+
+			obj._exists = True
+
+			return obj
+
+		# Don't remember tables that don't exist yet
+		if names:
+			Manager._rowMappers[key] = mapRow
+
+		return mapRow
+
+	@classmethod
+	def projection(cls, columns):
+		"""The columns to actually select for the given subset of this type's columns, so
+		finders can skip the ones a listing doesn't need (i.e. the body of every fix):
+
+			show.getElements(columns=['name', 'type', 'status'])
+
+		The primary key is always included, so that the rest can be loaded later.
+
+		Args:
+		    columns (list): The names of the columns wanted
+
+		Raises:
+		    ValueError: If any of the columns isn't one of this type's
+
+		Returns:
+		    list: The columns, in table order
+		"""
+		names = [col for col, _ in cls.columns()]
+		unknown = [c for c in columns if c not in names]
+
+		if unknown:
+			raise ValueError('No such column(s) for {}: {}'.format(cls.__name__, ', '.join(unknown)))
+
+		return [col for col in names if col in columns or col == cls.PK]
+
+	@classmethod
+	def mapper(cls, records=False, columns=None):
+		"""Returns:
+		    function: Takes a row of the given columns (see projection) and returns either
+		    	an instance (see rowMapper) or a record (see recordType)
+		"""
+		if records:
+			return cls.recordType(columns)._make
 
-			self._exists = True
+		return cls.rowMapper(columns)
 
-			return self
+	def __getattr__(self, attr):
+		# Only reached for attributes that aren't set, which for a partially
+		# hydrated object includes the columns that weren't selected
+		deferred = self.__dict__.get('_deferred')
+
+		if deferred is None or attr not in deferred[1]:
+			raise AttributeError("'{}' object has no attribute '{}'".format(type(self).__name__, attr))
+
+		self._loadDeferred()
+
+		return getattr(self, attr)
+
+	def _loadDeferred(self):
+		"""Loads all the columns that were left out when this object was hydrated"""
+		pk, columns = self.__dict__.pop('_deferred')
+		query = Query(self.TABLE, columns).where(self.PK, pk)
+
+		with Manager(willCommit=False) as mgr:
+			row = query.execute(mgr.connection()).fetchone() or [None] * len(columns)
+
+		for col, val in zip(columns, row):
+			# Don't clobber anything that was set since
+			if col not in self.__dict__:
+				setattr(self, col, val)
 
 	@property
 	def pk(self):
 		raise NotImplementedError()
 
+	@classmethod
+	def recordType(cls, columns=None):
+		"""The read-only record type for rows of this type's table. Records are plain tuples
+		with a named attribute per column, so they take a fraction of the memory of a full
+		object and are much quicker to make. Use them for listing large numbers of rows
+		(i.e. all the published files of a show) and convert only the ones that need to be
+		changed or need the computed properties of the full object:
+
+			for pf in el.getPublishedFiles(records=True):
+				if pf.author == user:
+					pf.toObject().delete()
+
+		Args:
+		    columns (list, optional): Only have these columns, see projection
+
+		Returns:
+		    type: The Record subclass for this type, made once and reused
+		"""
+		names = tuple(cls.projection(columns) if columns else [col for col, _ in cls.columns()])
+		key = (cls, names)
+
+		if key not in _recordTypes:
+			base = collections.namedtuple(cls.__name__ + 'Record', names)
+			_recordTypes[key] = type(base.__name__, (Record, base), {'__slots__': (), 'objectType': cls})
+
+		return _recordTypes[key]
+
 	def __repr__(self):
-		with Manager(willCommit=False) as mgr:
-			vals = []
+		vals = []
 
-			for c, _ in mgr.getColumnNames(self.table):
-				val = getattr(self, c, None)
+		for c, _ in type(self).columns():
+			val = getattr(self, c, None)
 
-				if val is None:
-					val = 'NULL'
+			if val is None:
+				val = 'NULL'
 
-				vals.append((c + '=' + str(val)))
+			vals.append((c + '=' + str(val)))
 
-			return type(self).__name__ + ' (' + ', '.join(vals) + ')'
+		return type(self).__name__ + ' (' + ', '.join(vals) + ')'
 
 	def __eq__(self, other):
 		if not isinstance(other, type(self)):
 			return False
 
-		return self.__dict__ == other.__dict__
+		return _state(self) == _state(other)
 
 	def __ne__(self, other):
 		return not (self == other)
 
-def getAll(cls):
+class Record(object):
+	"""Base for the record types made by DatabaseObject.recordType"""
+	__slots__ = ()
+
+	def toObject(self):
+		"""Returns:
+		    DatabaseObject: The full object for this record
+		"""
+		return self.objectType.rowMapper(self._fields)(self)
+
+_recordTypes = {}
+
+def idProperty(*fields):
+	"""Decorator for the id property of types whose id is computed (i.e. hashed) from some
+	of their fields. The id is computed the first time it's needed and cached on the object,
+	only being computed again once one of the given fields has changed:
+
+		@idProperty('show', 'num')
+		def id(self):
+			return super(Sequence, self)._id('{}_{}'.format(self.show, self.num))
+
+	Args:
+	    *fields (str): The attributes the id is made from
+
+	Returns:
+	    function: The decorator, making a read-only property
+	"""
+	return lambda func: _IdProperty(func, fields)
+
+class _IdProperty(property):
+	def __init__(self, func, fields):
+		self.fields = fields
+		key = operator.attrgetter(*fields)
+
+		def fget(obj):
+			current = key(obj)
+			memo = obj.__dict__.get('_idMemo')
+
+			if memo is not None and memo[0] == current:
+				return memo[1]
+
+			value = func(obj)
+			obj._idMemo = (current, value)
+
+			return value
+
+		super(_IdProperty, self).__init__(fget, doc=func.__doc__)
+
+# Attributes that only cache something that can be looked up again (i.e. Fix.commentList)
+_CACHED = ('_idMemo', '_eager', '_commentList')
+
+def _state(obj):
+	"""Returns:
+	    dict: The given object's attributes, without any that are only cached
+	"""
+	if '_deferred' in obj.__dict__:
+		obj._loadDeferred()
+
+	if not [k for k in _CACHED if k in obj.__dict__]:
+		return obj.__dict__
+
+	state = dict(obj.__dict__)
+
+	for key in _CACHED:
+		state.pop(key, None)
+
+	return state
+
+def _relations(cls):
+	"""Returns:
+	    list: The (type, column) of each of the show, sequence, shot and element that objects
+	    	of the given type can belong to, by the column that references it
+	"""
+	from helix.database.show import Show
+	from helix.database.sequence import Sequence
+	from helix.database.shot import Shot
+	from helix.database.element import Element
+
+	names = [col for col, _ in cls.columns()]
+
+	return [(rel, col) for rel, col in ((Show, 'show'), (Sequence, 'sequenceId'), (Shot, 'shotId'), (Element, 'elementId')) if rel is not cls and col in names]
+
+def _written(obj):
+	"""Drops anything cached about the given object now that it's been written to the DB"""
+	from helix.environment import permissions
+
+	identity.invalidate(obj)
+	lineage.invalidate(obj)
+	permissions.invalidate(obj)
+
+def _groupByTable(objs):
+	"""Returns:
+	    list: (table, [indexes into objs]) for each table in objs, in the order
+	    	each table is first seen
+	"""
+	groups = []
+	byTable = {}
+
+	for i, obj in enumerate(objs):
+		if obj.table not in byTable:
+			byTable[obj.table] = []
+			groups.append((obj.table, byTable[obj.table]))
+
+		byTable[obj.table].append(i)
+
+	return groups
+
+class Pager(object):
+	PAGE_SIZE = 200
+
+	def __init__(self, finder, *args, **kwargs):
+		"""Gets the results of a finder a page at a time, i.e. for a view to show the first
+		rows right away and fetch more as it's scrolled. The finder can be any that takes
+		limit and after (see DatabaseObject.iterQuery) and returns a list:
+
+			pager = Pager(show.getElements, types=['prop'], columns=['name', 'type'])
+			first = pager.nextPage()
+
+		Args:
+		    finder (function): The finder to call for each page
+		    *args: Passed on to the finder
+		    pageSize (int, optional): How many results to get per page, defaults to PAGE_SIZE
+		    accept (function, optional): Only keep the results this returns True for. Pages
+		    	that don't have any left are skipped.
+		    **kwargs: Passed on to the finder
+		"""
+		self.finder = finder
+		self.pageSize = kwargs.pop('pageSize', None) or Pager.PAGE_SIZE
+		self.accept = kwargs.pop('accept', None)
+		self.args = args
+		self.kwargs = kwargs
+		self.last = None
+		self.done = False
+
+	def nextPage(self):
+		"""Returns:
+		    list: The results of the next page, empty once there are no more
+		"""
+		while not self.done:
+			page = self.finder(*self.args, limit=self.pageSize, after=self.last, **self.kwargs)
+
+			if len(page) < self.pageSize:
+				self.done = True
+
+			if page:
+				self.last = page[-1]
+
+			if self.accept is not None:
+				page = [p for p in page if self.accept(p)]
+
+			if page:
+				return page
+
+		return []
+
+	def __iter__(self):
+		page = self.nextPage()
+
+		while page:
+			for result in page:
+				yield result
+
+			page = self.nextPage()
+
+def getAll(cls, records=False, columns=None, limit=None, after=None, eager=False):
 	from helix.database.show import Show
 	from helix.database.sequence import Sequence
 	from helix.database.shot import Shot
@@ -173,59 +695,63 @@ def getAll(cls):
 	from helix.database.fix import Fix
 	from helix.environment.permissions import PermissionGroup
 
-	with Manager(willCommit=False) as mgr:
-		query = """SELECT * FROM {}""".format(cls.TABLE)
-		rows = mgr.connection().execute(query).fetchall()
-		instances = []
+	return list(cls.iterQuery(Query(cls.TABLE), records=records, columns=columns, limit=limit, after=after, eager=eager))
 
-		for r in rows:
-			instances.append(cls.dummy().unmap(r))
+def iterAll(cls, chunkSize=None, records=False, columns=None, limit=None, after=None, eager=False):
+	"""Like getAll, but streams the objects rather than returning them all in a list. Use
+	when only counting, filtering or showing the first few.
 
-		return instances
+	Args:
+	    cls (type): The DatabaseObject subclass to get all of
+	    chunkSize (int, optional): How many rows to fetch from the DB at a time
+	    records (bool, optional): Whether to yield read-only records rather than full
+	    	objects, see DatabaseObject.recordType
+	    columns (list, optional): Only select these columns, see DatabaseObject.projection
+	    limit (int, optional): Only get one page of this many, see DatabaseObject.iterQuery
+	    after (DatabaseObject, optional): The last object of the previous page
+	    eager (bool, optional): Whether to load each object's parents in the same query
+
+	Returns:
+	    generator: The objects
+	"""
+	return cls.iterQuery(Query(cls.TABLE), chunkSize=chunkSize, records=records, columns=columns, limit=limit, after=after, eager=eager)
 
 def getShows():
 	from helix.database.show import Show
 	with Manager(willCommit=False) as mgr:
-		query = """SELECT * FROM {}""".format(Show.TABLE)
-		rows = mgr.connection().execute(query).fetchall()
-		shows = []
-
-		for r in rows:
-			shows.append(Show.dummy().unmap(r))
+		rows = Query(Show.TABLE).execute(mgr.connection()).fetchall()
+		mapRow = Show.rowMapper()
 
-		return shows
+		return [mapRow(r) for r in rows]
 
 def getShow(alias):
 	from helix.database.show import Show
+
+	query = Query(Show.TABLE).where('alias', alias)
+
 	with Manager(willCommit=False) as mgr:
-		query = """SELECT * FROM {} WHERE alias='{}'""".format(Show.TABLE, alias)
-		row = mgr.connection().execute(query).fetchone()
+		row = query.execute(mgr.connection()).fetchone()
 
 		if row and row[0]:
-			return Show.dummy().unmap(row)
+			return Show.rowMapper()(row)
 
 		return None
 
-def getElements():
+def getElements(records=False, columns=None, limit=None, after=None, eager=False):
 	from helix.database.element import Element
-	with Manager(willCommit=False) as mgr:
-		query = """SELECT * FROM {}""".format(Element.TABLE)
-		rows = mgr.connection().execute(query).fetchall()
-		elements = []
 
-		for r in rows:
-			elements.append(Element.dummy().unmap(r))
+	return getAll(Element, records=records, columns=columns, limit=limit, after=after, eager=eager)
+
+def iterElements(chunkSize=None, records=False, columns=None, limit=None, after=None, eager=False):
+	"""Streams every element of every show, see iterAll"""
+	from helix.database.element import Element
 
-		return elements
+	return iterAll(Element, chunkSize=chunkSize, records=records, columns=columns, limit=limit, after=after, eager=eager)
 
 def getUsers():
 	from helix.database.person import Person
 	with Manager(willCommit=False) as mgr:
-		query = """SELECT * FROM {}""".format(Person.TABLE)
-		rows = mgr.connection().execute(query).fetchall()
-		users = []
-
-		for r in rows:
-			users.append(Person.dummy().unmap(r))
+		rows = Query(Person.TABLE).execute(mgr.connection()).fetchall()
+		mapRow = Person.rowMapper()
 
-		return users
+		return [mapRow(r) for r in rows]
@@ -1,12 +1,13 @@
 import os
 import shutil
 
-from helix.database.database import DatabaseObject
+from helix.database.database import DatabaseObject, idProperty
+from helix.database.sql import transaction
+from helix.database import lineage, hierarchy, counters
 from helix.database.mixins import FixMixin
 from helix.database.show import Show
 from helix.database.sequence import Sequence
 from helix.database.shot import Shot
-from helix.database.person import Person
 import helix.environment.environment as env
 import helix.utils.utils as utils
 from helix.utils.fileclassification import FrameSequence
@@ -73,6 +74,7 @@ class Element(DatabaseObject, FixMixin):
 
 	TABLE = 'elements'
 	PK = 'id'
+	PAGE_KEY = ('show', 'type', 'name', 'id')
 	STATUS = {
 		0: 'new',		# The element has just been created
 		1: 'assigned',	# The element is assigned to an artist
@@ -117,11 +119,7 @@ class Element(DatabaseObject, FixMixin):
 			if shot is None or sequence is None:
 				raise ValueError('Element\'s name can only be None (considered nameless) if shot and sequence are also specified')
 			else:
-				self.name = '_{}{}{}'.format(
-						fileutils.SEQUENCE_FORMAT.format(str(self.sequence).zfill(env.SEQUENCE_SHOT_PADDING)),
-						fileutils.SHOT_FORMAT.format(str(self.shot).zfill(env.SEQUENCE_SHOT_PADDING)),
-						clipName if clipName else ''
-					)
+				self.name = Element.namelessName(self.sequence, self.shot, clipName)
 
 		if not self.type:
 			raise ValueError('Element\'s type can\'t be None')
@@ -149,50 +147,52 @@ class Element(DatabaseObject, FixMixin):
 			self.thumbnail = None
 			self.shot_clipName = clipName
 
-			s = Show.fromPk(self.show)
-
-			if not s:
-				raise ValueError('No such show: {}'.format(show))
-
-			p = Person(self.author)
-
-			if not p.exists():
-				raise ValueError('No such user: {}'.format(self.author))
-
-			baseWorkDir = s.work_path
-			baseReleaseDir = s.release_path
-
 			if self.sequence is not None:
 				try:
 					self.sequence = int(self.sequence)
 				except ValueError:
 					raise ValueError('Sequence number must be a number, not: {}'.format(self.sequence))
 
-				sq = Sequence(self.sequence, show=self.show)
-
-				if not sq.exists():
-					raise ValueError('No such sequence {} in show {}'.format(sq.num, sq.show))
-				else:
-					self.sequenceId = sq.id
-
-				baseWorkDir = sq.work_path
-				baseReleaseDir = sq.release_path
-
 			if self.shot is not None and self.sequence is not None:
 				try:
 					self.shot = int(shot)
 				except ValueError:
 					raise ValueError('Shot number must be a number, not: {}'.format(shot))
 
-				sh = Shot(self.shot, self.sequence, show=self.show, clipName=self.shot_clipName)
+			parents = lineage.resolve(
+				self.show,
+				sequence=self.sequence,
+				shot=self.shot if self.sequence is not None else None,
+				clipName=self.shot_clipName,
+				person=self.author
+			)
 
-				if not sh.exists():
-					raise ValueError('No such shot {} in sequence {} in show {}'.format(sh.num, sh.sequence, sh.show))
+			if not parents.show:
+				raise ValueError('No such show: {}'.format(show))
+
+			if not parents.personExists:
+				raise ValueError('No such user: {}'.format(self.author))
+
+			baseWorkDir = parents.show.work_path
+			baseReleaseDir = parents.show.release_path
+
+			if self.sequence is not None:
+				if not parents.sequence:
+					raise ValueError('No such sequence {} in show {}'.format(self.sequence, self.show))
 				else:
-					self.shotId = sh.id
+					self.sequenceId = parents.sequence.id
 
-				baseWorkDir = sh.work_path
-				baseReleaseDir = sh.release_path
+				baseWorkDir = parents.sequence.work_path
+				baseReleaseDir = parents.sequence.release_path
+
+			if self.shot is not None and self.sequence is not None:
+				if not parents.shot:
+					raise ValueError('No such shot {} in sequence {} in show {}'.format(self.shot, self.sequence, self.show))
+				else:
+					self.shotId = parents.shot.id
+
+				baseWorkDir = parents.shot.work_path
+				baseReleaseDir = parents.shot.release_path
 
 			self.work_path = os.path.join(baseWorkDir, self.directory)
 			self.release_path = os.path.join(baseReleaseDir, self.directory)
@@ -308,21 +308,27 @@ class Element(DatabaseObject, FixMixin):
 			if missing and not ignoreMissing:
 				raise PublishError('Missing frames from sequence: {}'.format(FrameSequence.prettyPrintFrameList(missing)))
 
-			versionless, versionedSeq = self.publishFile(sequence)
-			name = self.name if not self.name.startswith('_') else None
-			pf = PublishedFile(name, self.type, versionedSeq, versionless, show=self.show, sequence=self.sequence, shot=self.shot)
-			pf.insert()
-			self.set('pubVersion', pf.version)
-		else:
-			versionless, versioned = self.publishFile(sourceFile)
-			name = self.name if not self.name.startswith('_') else None
-			pf = PublishedFile(name, self.type, versioned, versionless, show=self.show, sequence=self.sequence, shot=self.shot)
-			pf.insert()
-			self.set('pubVersion', pf.version)
+			sourceFile = sequence
+
+		name = self.name if not self.name.startswith('_') else None
 
-		self.set('version', self.version + 1)
+		# The version is taken before anything is copied, so concurrent publishes of this element
+		# each copy to their own. Copying can take a while, so it's done outside of any write
+		# transaction, which would keep every other writer waiting on the database. A publish
+		# that fails leaves a gap in the versions.
+		with transaction() as mgr:
+			version = counters.take(mgr.connection(), PublishedFile.TABLE, self.show, self.id)
 
-	def publishFile(self, fileName):
+		versionless, versioned = self.publishFile(sourceFile, version=version)
+
+		with transaction() as mgr:
+			pf = PublishedFile(name, self.type, versioned, versionless, show=self.show, sequence=self.sequence, shot=self.shot, version=version)
+			pf.insert()
+			self.set('pubVersion', version)
+			# Publishes that started later may have been recorded first, never go back
+			self.set('version', counters.peek(mgr.connection(), PublishedFile.TABLE, self.show, self.id))
+
+	def publishFile(self, fileName, version=None):
 		"""Given any arbitrary file name, determines if the file is a single file, part of a sequence, or
 		a directory and copies it accordingly to the release versions directory of the element. This also
 		sets up the hardlink(s) to the new versioned file(s).
@@ -333,17 +339,20 @@ class Element(DatabaseObject, FixMixin):
 		Args:
 			fileName (str): The current existing file/file from a sequence/directory to publish to the
 				release directory
+			version (int, optional): The version to publish as, defaults to the element's current
+				version
 
 		Returns:
 			str: The complete file path to the versioned file/file sequence/directory that was created as a result of the copy process
 		"""
 		versionsDir = os.path.join(self.release_path, '.versions')
+		version = str(version if version is not None else self.version).zfill(env.VERSION_PADDING)
 
 		if isinstance(fileName, FrameSequence):
 			print 'Publishing sequence...'
 			# Publishing a whole sequence
 			newSeq = fileName.copyTo(versionsDir)
-			prefix = '{}.{}'.format(self.get('name'), str(self.version).zfill(env.VERSION_PADDING))
+			prefix = '{}.{}'.format(self.get('name'), version)
 
 			fileName.update(prefix=self.get('name'), changeOnDisk=False)
 			fileName.setDir(self.release_path)
@@ -374,7 +383,7 @@ class Element(DatabaseObject, FixMixin):
 			print 'Publishing folder...'
 			# Directory publish
 			baseDirectory = os.path.split(fileName)[-1]
-			versionedName = '{}.{}'.format(self.get('name'), str(self.version).zfill(env.VERSION_PADDING))
+			versionedName = '{}.{}'.format(self.get('name'), version)
 			versionedDest = os.path.join(versionsDir, versionedName)
 			versionlessName = self.get('name')
 			versionless = os.path.join(self.release_path, versionlessName)
@@ -401,7 +410,7 @@ class Element(DatabaseObject, FixMixin):
 			print 'Publishing single file...'
 			# Single file publish
 			baseName, ext = os.path.splitext(fileName)
-			versionedName = '{}.{}{}'.format(self.get('name'), str(self.version).zfill(env.VERSION_PADDING), ext)
+			versionedName = '{}.{}{}'.format(self.get('name'), version, ext)
 			versionedDest = os.path.join(versionsDir, versionedName)
 			versionlessName = '{}{}'.format(self.get('name'), ext)
 			versionless = os.path.join(self.release_path, versionlessName)
@@ -433,53 +442,37 @@ class Element(DatabaseObject, FixMixin):
 
 	def getPublishedVersions(self):
 		from helix.database.sql import Manager
+		from helix.database.query import Query
 		from helix.database.publishedFile import PublishedFile
 
+		query = Query(PublishedFile.TABLE, ['version']).where('elementId', self.id).where('show', self.show)
+
 		with Manager(willCommit=False) as mgr:
-			query = """SELECT version FROM {} WHERE show='{}' AND elementId='{}'""".format(PublishedFile.TABLE, self.show, self.id)
-			rows = mgr.connection().execute(query).fetchall()
+			rows = query.execute(mgr.connection()).fetchall()
 
 			return [r[0] for r in rows]
 
-	def getPublishedFiles(self, authors=[]):
-		from helix.database.sql import Manager
+	def getPublishedFiles(self, authors=[], records=False, columns=None, limit=None, after=None):
+		from helix.database.query import Query
 		from helix.database.publishedFile import PublishedFile
 
-		with Manager(willCommit=False) as mgr:
-			query = """SELECT * FROM {} WHERE show='{}' AND elementId='{}'""".format(PublishedFile.TABLE, self.show, self.id)
-
-			if authors is not None:
-				if isinstance(authors, str):
-					authors = [authors]
-				if authors:
-					query += " AND author in ({})".format(','.join(["'{}'".format(n) for n in authors]))
+		query = Query(PublishedFile.TABLE).where('elementId', self.id).where('show', self.show).whereIn('author', authors)
 
-			pfs = []
-
-			for row in mgr.connection().execute(query).fetchall():
-				pfs.append(PublishedFile.dummy().unmap(row))
-
-			return pfs
+		return list(PublishedFile.iterQuery(query, records=records, columns=columns, limit=limit, after=after))
 
 	def getPublishedFileByVersion(self, version, authors=[]):
 		from helix.database.sql import Manager
+		from helix.database.query import Query
 		from helix.database.publishedFile import PublishedFile
 
 		version = int(version)
+		query = Query(PublishedFile.TABLE).where('elementId', self.id).where('show', self.show).where('version', version).whereIn('author', authors)
 
 		with Manager(willCommit=False) as mgr:
-			query = """SELECT * FROM {} WHERE show='{}' AND elementId='{}' AND version='{}'""".format(PublishedFile.TABLE, self.show, self.id, version)
-
-			if authors is not None:
-				if isinstance(authors, str):
-					authors = [authors]
-				if authors:
-					query += " AND author in ({})".format(','.join(["'{}'".format(n) for n in authors]))
-
-			row = mgr.connection().execute(query).fetchone()
+			row = query.execute(mgr.connection()).fetchone()
 
 			if row and row[0]:
-				return PublishedFile.dummy().unmap(row)
+				return PublishedFile.rowMapper()(row)
 			else:
 				return None
 
@@ -517,7 +510,7 @@ class Element(DatabaseObject, FixMixin):
 				self.type
 			)
 
-	@property
+	@idProperty('show', 'sequence', 'shot', 'name', 'type')
 	def id(self):
 		return super(Element, self)._id(self._rawId)
 
@@ -549,11 +542,52 @@ class Element(DatabaseObject, FixMixin):
 	@property
 	def parent(self):
 		if self.shotId is not None:
-			return Shot.fromPk(self.shotId)
+			return self._related(Shot, self.shotId)
 		elif self.sequenceId is not None:
-			return Sequence.fromPk(self.sequenceId)
+			return self._related(Sequence, self.sequenceId)
 		else:
-			return Show.fromPk(self.show)
+			return self._related(Show, self.show)
+
+	@property
+	def ancestry(self):
+		"""The ids of the show, sequence and shot this element is in, see helix.database.hierarchy"""
+		return hierarchy.path(self.show, self.sequenceId, self.shotId)
+
+	@property
+	def subtree(self):
+		"""The ancestry of everything under this element, i.e. its fixes"""
+		return hierarchy.path(self.show, self.sequenceId, self.shotId, self.id)
+
+	@staticmethod
+	def namelessName(sequence, shot, clipName=None):
+		"""Returns:
+		    str: The name given to a nameless element of the given shot
+		"""
+		return '_{}{}{}'.format(
+				fileutils.SEQUENCE_FORMAT.format(str(sequence).zfill(env.SEQUENCE_SHOT_PADDING)),
+				fileutils.SHOT_FORMAT.format(str(shot).zfill(env.SEQUENCE_SHOT_PADDING)),
+				clipName if clipName else ''
+			)
+
+	@staticmethod
+	def identify(name, elType, show, sequence=None, shot=None):
+		"""Makes a dummy element with only the fields its id is made from set, for when
+		only the id of an element is needed and not the element itself.
+
+		Raises:
+		    ValueError: If the element is nameless but not in a shot
+		"""
+		if name is None and (sequence is None or shot is None):
+			raise ValueError('Element\'s name can only be None (considered nameless) if shot and sequence are also specified')
+
+		el = Element.dummy()
+		el.name = name if name is not None else Element.namelessName(sequence, shot)
+		el.type = elType.lower()
+		el.show = show
+		el.sequence = sequence
+		el.shot = shot
+
+		return el
 
 	@staticmethod
 	def dummy():
@@ -2,18 +2,19 @@ import os
 
 from datetime import datetime
 
-from helix.database.database import DatabaseObject
+from helix.database.database import DatabaseObject, idProperty
+from helix.database import lineage, hierarchy, counters
 from helix.database.show import Show
 from helix.database.sequence import Sequence
 from helix.database.shot import Shot
 from helix.database.element import Element
-from helix.database.person import Person
 import helix.environment.environment as env
 import helix.utils.utils as utils
 
 class Fix(DatabaseObject):
 	TABLE = 'fixes'
 	PK = 'id'
+	PAGE_KEY = ('creation', 'id')
 	STATUS = {
 		0: 'new',
 		1: 'assigned',
@@ -41,7 +42,6 @@ class Fix(DatabaseObject):
 
 	def __init__(self, fixType, title, body, dept, show=None, sequence=None, shot=None, clipName=None, elementName=None, elementType=None, author=None, status=STATUS[0], priority=3, dummy=False):
 		self.table = Fix.TABLE
-		self.commentList = []
 
 		if dummy:
 			return
@@ -93,46 +93,48 @@ class Fix(DatabaseObject):
 			if self.for_dept not in env.cfg.departments and self.for_dept != 'general':
 				raise ValueError('Invalid department ({}) to assign fix to. Options are: {}'.format(self.for_dept, ', '.join(['general'] + env.cfg.departments)))
 
-			s = Show.fromPk(self.show)
-
-			if not s:
-				raise ValueError('No such show: {}'.format(show))
-
-			p = Person(self.author)
-
-			if not p.exists():
-				raise ValueError('No such user: {}'.format(self.author))
-
 			if self.sequence is not None:
 				try:
 					self.sequence = int(self.sequence)
 				except ValueError:
 					raise ValueError('Sequence number must be a number, not: {}'.format(self.sequence))
 
-				sq = Sequence(self.sequence, show=self.show)
-
-				if not sq.exists():
-					raise ValueError('No such sequence {} in show {}'.format(sq.num, sq.show))
-				else:
-					self.sequenceId = sq.id
-
 			if self.shot is not None and self.sequence is not None:
 				try:
 					self.shot = int(shot)
 				except ValueError:
 					raise ValueError('Sequence number must be a number, not: {}'.format(shot))
 
-				sh = Shot(self.shot, self.sequence, show=self.show, clipName=clipName)
+			el = Element.identify(self.elementName, self.elementType, self.show, self.sequence, self.shot) if self.elementType else None
+			parents = lineage.resolve(
+				self.show,
+				sequence=self.sequence,
+				shot=self.shot if self.sequence is not None else None,
+				clipName=clipName,
+				person=self.author,
+				elementId=el.id if el else None
+			)
+
+			if not parents.show:
+				raise ValueError('No such show: {}'.format(show))
 
-				if not sh.exists():
-					raise ValueError('No such shot {}{} in sequence {} in show {}'.format(sh.num, sh.clipName if sh.clipName else '', sh.sequence, sh.show))
+			if not parents.personExists:
+				raise ValueError('No such user: {}'.format(self.author))
+
+			if self.sequence is not None:
+				if not parents.sequence:
+					raise ValueError('No such sequence {} in show {}'.format(self.sequence, self.show))
 				else:
-					self.shotId = sh.id
+					self.sequenceId = parents.sequence.id
 
-			if self.elementType:
-				el = Element(self.elementName, self.elementType, self.show, self.sequence, self.shot)
+			if self.shot is not None and self.sequence is not None:
+				if not parents.shot:
+					raise ValueError('No such shot {}{} in sequence {} in show {}'.format(self.shot, clipName if clipName else '', self.sequence, self.show))
+				else:
+					self.shotId = parents.shot.id
 
-				if not el.exists():
+			if el:
+				if not parents.element:
 					raise ValueError(
 						'No such element {} ({}){}{} in show {}'.format(
 							el.name,
@@ -146,25 +148,38 @@ class Fix(DatabaseObject):
 					self.elementId = el.id
 
 	def addComment(self, text):
-		text = text.replace("'", '').replace('"', '') # Temp work around until I can either escape quotes or properly update the DB with the value
-		self.commentList.append((env.USER, str(env.getCreationInfo(format=False)[1]), text))
-		self.set('comments', self.comments)
+		"""Adds a comment from the current user to this fix. Comments are rows of their own, so
+		this is a single insert rather than rewriting the fix.
 
-	@property
-	def comments(self):
-		return str(self.commentList).replace("'", '"')
-
-	@comments.setter
-	def comments(self, comments):
-		try:
-			if comments:
-				self.commentList = eval(comments)
-			else:
-				self.commentList = []
-		except:
-			self.commentList = []
+		Args:
+		    text (str): The comment
+		"""
+		from helix.database.sql import Manager
+
+		author, creation = env.getCreationInfo(format=False)
+		comment = (author, str(creation), text)
+
+		with Manager() as mgr:
+			mgr.connection().execute('INSERT INTO fixComments (fixId, author, creation, text) VALUES (?, ?, ?, ?)', (self.id, ) + comment)
+
+		if '_commentList' in self.__dict__:
+			self._commentList.append(comment)
 
 	@property
+	def commentList(self):
+		"""The (author, creation, text) of each comment on this fix, oldest first. Only fetched
+		the first time they're asked for, not with the fix itself.
+		"""
+		from helix.database.sql import Manager
+
+		if '_commentList' not in self.__dict__:
+			with Manager(willCommit=False) as mgr:
+				rows = mgr.connection().execute('SELECT author, creation, text FROM fixComments WHERE fixId=? ORDER BY id', (self.id, )).fetchall()
+				self._commentList = [tuple(r) for r in rows]
+
+		return self._commentList
+
+	@idProperty('show', 'sequence', 'shot', 'elementId', 'title', 'body')
 	def id(self):
 		return super(Fix, self)._id(
 			'{}_{}_{}_{}_{}_{}'.format(
@@ -184,13 +199,18 @@ class Fix(DatabaseObject):
 	@property
 	def target(self):
 		if self.elementId:
-			return Element.fromPk(self.elementId)
+			return self._related(Element, self.elementId)
 		elif self.shotId:
-			return Shot.fromPk(self.shotId)
+			return self._related(Shot, self.shotId)
 		elif self.sequenceId:
-			return Sequence.fromPk(self.sequenceId)
+			return self._related(Sequence, self.sequenceId)
 		elif self.show:
-			return Show.fromPk(self.show)
+			return self._related(Show, self.show)
+
+	@property
+	def ancestry(self):
+		"""The ids of the target and everything above it, see helix.database.hierarchy"""
+		return hierarchy.path(self.show, self.sequenceId, self.shotId, self.elementId)
 
 	@property
 	def bid(self):
@@ -206,8 +226,16 @@ class Fix(DatabaseObject):
 
 		return None
 
+	def _beforeInsert(self, conn):
+		# The number from the constructor is only what was next then, take it for real now
+		if not self._exists:
+			self.num = counters.take(conn, Fix.TABLE, self.show)
+
 	@staticmethod
 	def nextFixNum(show=None):
+		"""The number the next fix made in the given show will most likely get. It's only
+		taken once the fix is inserted, see helix.database.counters
+		"""
 		show = show if show else env.show
 		if not show:
 			raise ValueError('Tried to fallback to environment-set show, but it was null.')
@@ -215,16 +243,7 @@ class Fix(DatabaseObject):
 		from helix.database.sql import Manager
 
 		with Manager(willCommit=False) as mgr:
-			res = mgr.connection().execute(
-				'''
-					SELECT MAX(num) from {} WHERE show='{}'
-				'''.format(Fix.TABLE, show)
-			).fetchone()
-
-			if res and res[0]:
-				return int(res[0]) + 1
-			else:
-				return 1
+			return counters.peek(mgr.connection(), Fix.TABLE, show)
 
 	@staticmethod
 	def byNum(fixNum, show=None):
@@ -233,16 +252,15 @@ class Fix(DatabaseObject):
 			raise ValueError('Tried to fallback to environment-set show, but it was null.')
 
 		from helix.database.sql import Manager
+		from helix.database.query import Query
+
+		query = Query(Fix.TABLE).where('show', show).where('num', fixNum)
 
 		with Manager(willCommit=False) as mgr:
-			res = mgr.connection().execute(
-				'''
-					SELECT * from {} WHERE num='{}' AND show='{}'
-				'''.format(Fix.TABLE, fixNum, show)
-			).fetchone()
+			res = query.execute(mgr.connection()).fetchone()
 
 			if res:
-				return Fix('.', '.', show).unmap(res)
+				return Fix.rowMapper()(res)
 			else:
 				return None
 
@@ -0,0 +1,32 @@
+"""Materialized ancestry paths. Elements, fixes and snapshots store the ids of everything
+above them in the show's hierarchy in their ancestry column, i.e. '/foo/<sequence id>/<shot id>/'
+for an element of a shot. Everything under a show, sequence, shot or element (its subtree)
+can then be found with a single indexed range query, rather than by walking each object's
+parents:
+
+	query.whereStartsWith('ancestry', sequence.subtree)
+
+Since the ids are already fields of the object, the ancestry is computed from them as it's
+inserted and never has to be maintained separately.
+"""
+
+SEP = '/'
+
+def path(*ids):
+	"""Returns:
+	    str: The path made of the given ids (i.e. the show alias, sequence id, shot id), in
+	    	order from the top of the hierarchy, skipping any that are None
+	"""
+	return SEP + ''.join(['{}{}'.format(i, SEP) for i in ids if i])
+
+def isDescendant(obj, ancestor):
+	"""Whether the given object is somewhere under the given show, sequence, shot or element
+
+	Args:
+	    obj (DatabaseObject): The object, anything with an ancestry
+	    ancestor (DatabaseObject): The possible ancestor, anything with a subtree
+
+	Returns:
+	    bool: Whether obj is a descendant of ancestor
+	"""
+	return obj.ancestry.startswith(ancestor.subtree)
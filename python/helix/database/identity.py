@@ -0,0 +1,131 @@
+"""An identity map for DatabaseObject.fromPk. While a session is active on a thread,
+each (type, pk) is only fetched from the database once and the same object is handed
+back for every later lookup of it, i.e. the Show and Sequence that every fix in the fix
+list resolves as its parent.
+
+Sessions are meant to be short, wrapping one command or one UI refresh, since changes
+made by other processes won't be seen until the session ends. Changes made through
+this process (insert, set, delete and the bulk variants) evict what they touch.
+
+	with helix.identityMap():
+		for fix in hxdb.getAll(Fix):
+			print fix.target.parent
+"""
+import threading
+import collections
+
+_local = threading.local()
+
+class IdentityMap(object):
+	MAX_SIZE = 10000
+
+	def __init__(self, maxSize=None):
+		"""Makes an empty identity map, which evicts the least recently used objects once
+		it holds maxSize of them.
+
+		Args:
+		    maxSize (int, optional): The most objects to hold, defaults to MAX_SIZE
+		"""
+		self.maxSize = maxSize or IdentityMap.MAX_SIZE
+		self.objects = collections.OrderedDict()
+
+	def get(self, cls, pk):
+		"""Returns:
+		    DatabaseObject: The object of the given type with the given pk, or None if it
+		    	hasn't been looked up yet
+		"""
+		obj = self.objects.pop((cls, pk), None)
+
+		if obj is not None:
+			self.objects[(cls, pk)] = obj # Most recently used goes to the end
+
+		return obj
+
+	def add(self, obj):
+		key = (type(obj), getattr(obj, obj.pk))
+
+		self.objects.pop(key, None)
+		self.objects[key] = obj
+
+		while len(self.objects) > self.maxSize:
+			self.objects.popitem(last=False)
+
+	def invalidate(self, cls, pk):
+		self.objects.pop((cls, pk), None)
+
+	def clear(self):
+		self.objects.clear()
+
+	def __len__(self):
+		return len(self.objects)
+
+class Session(object):
+	def __init__(self, enabled=True, maxSize=None):
+		self.enabled = enabled
+		self.maxSize = maxSize
+		self.map = None
+
+	def __enter__(self):
+		if self.enabled:
+			# Nested sessions share the outer one's map
+			self.map = current() or IdentityMap(self.maxSize)
+
+		_stack().append(self.map)
+
+		return self.map
+
+	def __exit__(self, exception_type, exception_value, traceback):
+		_stack().pop()
+
+def identityMap(enabled=True, maxSize=None):
+	"""Starts an identity map session on this thread for the duration of the with block. A
+	disabled session turns off an outer one until the block is done.
+
+	Args:
+	    enabled (bool, optional): Whether lookups should go through the map in the block
+	    maxSize (int, optional): The most objects to hold, see IdentityMap
+
+	Returns:
+	    Session: The session to use as a context manager
+	"""
+	return Session(enabled=enabled, maxSize=maxSize)
+
+def current():
+	"""Returns:
+	    IdentityMap: The map of this thread's active session, or None if there is none or
+	    	it's disabled
+	"""
+	stack = _stack()
+
+	return stack[-1] if stack else None
+
+def invalidate(obj):
+	"""Evicts the given object from every map on this thread, including those of sessions
+	that are disabled by an inner one, so they don't go stale once re-enabled.
+	"""
+	pk = getattr(obj, obj.pk, None)
+
+	for map in _maps():
+		map.invalidate(type(obj), pk)
+
+def clear():
+	"""Empties every map on this thread, i.e. after a rolled back transaction when we
+	can't know what was read from the changes that were discarded.
+	"""
+	for map in _maps():
+		map.clear()
+
+def _stack():
+	if not hasattr(_local, 'stack'):
+		_local.stack = []
+
+	return _local.stack
+
+def _maps():
+	maps = []
+
+	for map in _stack():
+		if map is not None and map not in maps:
+			maps.append(map)
+
+	return maps
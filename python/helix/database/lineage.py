@@ -0,0 +1,106 @@
+"""Resolves everything a new object has to be validated against (its show, sequence and
+shot, its author and, for published files, its element) in a single query. Since the ids
+of sequences, shots and elements are derived from their show/numbers/names, the whole
+chain can be looked up by primary key with one row of LEFT JOINs, rather than constructing
+each parent in turn (each running its own queries).
+
+Chains that fully resolved are kept for a couple of seconds, since objects tend to be
+made in bursts under the same parents (i.e. all the elements of a new shot). Writes to any
+of the chain's tables made through this process drop the cache right away.
+"""
+import time
+
+CACHE_TTL = 2 # Seconds
+MAX_CACHED = 1000
+
+_cache = {}
+
+class Lineage(object):
+	def __init__(self, show=None, sequence=None, shot=None, element=None, personExists=False):
+		"""The parents that were found, each None if it wasn't asked for or doesn't exist
+
+		Args:
+		    show (Show): The show
+		    sequence (Sequence): The sequence
+		    shot (Shot): The shot
+		    element (Element): The element
+		    personExists (bool): Whether the person exists
+		"""
+		self.show = show
+		self.sequence = sequence
+		self.shot = shot
+		self.element = element
+		self.personExists = personExists
+
+def resolve(show, sequence=None, shot=None, clipName=None, person=None, elementId=None):
+	"""Looks up the given chain of parents
+
+	Args:
+	    show (str): The show alias
+	    sequence (int, optional): The sequence number in the show
+	    shot (int, optional): The shot number in the sequence, requires sequence
+	    clipName (str, optional): The clip name of the shot
+	    person (str, optional): The username to check for
+	    elementId (str, optional): The id of the element to get
+
+	Returns:
+	    Lineage: The parents that were found
+	"""
+	from helix.database.sql import Manager
+	from helix import hxenv, Show, Sequence, Shot, Element
+
+	sequenceId = None
+	shotId = None
+
+	if sequence is not None:
+		sequenceId = Sequence(sequence, show=show, dummy=True).id
+
+		if shot is not None:
+			shotId = Shot(shot, sequence, show=show, clipName=clipName, dummy=True).id
+
+	key = (hxenv.getEnvironment('db'), show, sequenceId, shotId, person, elementId)
+	cached = _cache.get(key)
+
+	if cached is not None and time.time() - cached[0] < CACHE_TTL:
+		return cached[1]
+
+	types = [Show, Sequence, Shot, Element]
+	query = '''
+		SELECT {}.*, {}.*, {}.*, {}.*, people.username FROM (SELECT 1)
+		LEFT JOIN {} ON {}.{}=?
+		LEFT JOIN {} ON {}.{}=?
+		LEFT JOIN {} ON {}.{}=?
+		LEFT JOIN {} ON {}.{}=?
+		LEFT JOIN people ON people.username=?
+	'''.format(*([t.TABLE for t in types] + [v for t in types for v in (t.TABLE, t.TABLE, t.PK)]))
+
+	with Manager(willCommit=False) as mgr:
+		row = mgr.connection().execute(query, (show, sequenceId, shotId, elementId, person)).fetchone()
+		objs = []
+		start = 0
+
+		for t in types:
+			end = start + len(t.columns())
+			objs.append(t.rowMapper()(row[start:end]) if row[start] is not None else None)
+			start = end
+
+	lineage = Lineage(*objs, personExists=row[-1] is not None)
+	found = [lineage.show, lineage.sequence, lineage.shot, lineage.element]
+	wanted = [show, sequenceId, shotId, elementId]
+
+	if all([f is not None for f, w in zip(found, wanted) if w is not None]) and (person is None or lineage.personExists):
+		if len(_cache) >= MAX_CACHED:
+			_cache.clear()
+
+		_cache[key] = (time.time(), lineage)
+
+	return lineage
+
+def invalidate(obj=None):
+	"""Drops the cached chains, i.e. once the given object was written, if it's of a type
+	that can be part of a chain.
+	"""
+	from helix import Show, Sequence, Shot, Element, Person
+
+	if obj is None or isinstance(obj, (Show, Sequence, Shot, Element, Person)):
+		_cache.clear()
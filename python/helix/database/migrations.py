@@ -0,0 +1,417 @@
+"""Versioned schema migrations. The version a database's schema is at is kept in its
+PRAGMA user_version, and the Manager brings any database it opens up to the latest
+version in place the first time it connects to it.
+
+Migrations are only ever appended to MIGRATIONS, never reordered or edited once
+released. Each one must be safe to run again on a database that already has its
+changes (i.e. use IF NOT EXISTS), since dropping and re-initializing tables resets
+the version. They spell out all of their SQL rather than calling into the modules
+that use what they make, so that changing those later doesn't change what an old
+migration does.
+"""
+import ast
+import json
+import sqlite3
+
+def _addLookupIndexes(conn):
+	# Container lookups, i.e. ElementContainer.getElements and Show/Sequence.getShots
+	conn.execute("CREATE INDEX IF NOT EXISTS 'elements_show_sequence_shot' ON 'elements' ('show', 'sequence', 'shot')")
+	conn.execute("CREATE INDEX IF NOT EXISTS 'elements_shotId' ON 'elements' ('shotId')")
+	conn.execute("CREATE INDEX IF NOT EXISTS 'sequences_show_num' ON 'sequences' ('show', 'num')")
+	conn.execute("CREATE INDEX IF NOT EXISTS 'shots_show_sequence_num' ON 'shots' ('show', 'sequence', 'num')")
+	conn.execute("CREATE INDEX IF NOT EXISTS 'shots_sequenceId_show_num' ON 'shots' ('sequenceId', 'show', 'num')")
+	conn.execute("CREATE INDEX IF NOT EXISTS 'stages_shotId' ON 'stages' ('shotId')")
+
+	# Element.getPublishedFiles/getPublishedVersions, PublishedFile.nextVersion
+	conn.execute("CREATE INDEX IF NOT EXISTS 'publishedFiles_elementId_show_version' ON 'publishedFiles' ('elementId', 'show', 'version')")
+
+	# FixMixin task counts, Fix.nextFixNum/byNum
+	conn.execute("CREATE INDEX IF NOT EXISTS 'fixes_show_type_status' ON 'fixes' ('show', 'type', 'status')")
+	conn.execute("CREATE INDEX IF NOT EXISTS 'fixes_show_num' ON 'fixes' ('show', 'num')")
+	conn.execute("CREATE INDEX IF NOT EXISTS 'fixes_sequenceId' ON 'fixes' ('sequenceId')")
+	conn.execute("CREATE INDEX IF NOT EXISTS 'fixes_shotId' ON 'fixes' ('shotId')")
+	conn.execute("CREATE INDEX IF NOT EXISTS 'fixes_elementId' ON 'fixes' ('elementId')")
+
+	# Snapshot.nextSnapshotNum, Shot.getLatestSnapshot
+	conn.execute("CREATE INDEX IF NOT EXISTS 'snapshots_shotId_num' ON 'snapshots' ('shotId', 'num')")
+
+def _addPageIndexes(conn):
+	# Keyset pagination order of elements (per show) and fixes, see Query.page
+	conn.execute("CREATE INDEX IF NOT EXISTS 'elements_show_type_name_id' ON 'elements' ('show', 'type', 'name', 'id')")
+	conn.execute("CREATE INDEX IF NOT EXISTS 'fixes_creation_id' ON 'fixes' ('creation', 'id')")
+	conn.execute("CREATE INDEX IF NOT EXISTS 'publishedFiles_elementId_creation_id' ON 'publishedFiles' ('elementId', 'creation', 'id')")
+
+def _addAncestry(conn):
+	# See helix.database.hierarchy. Backfills with the same paths hierarchy.path makes
+	for table, ids in (('elements', ['sequenceId', 'shotId']), ('fixes', ['sequenceId', 'shotId', 'elementId']), ('snapshots', ['sequenceId', 'shotId'])):
+		columns = [r[1] for r in conn.execute('PRAGMA TABLE_INFO ({})'.format(table)).fetchall()]
+
+		if 'ancestry' not in columns:
+			conn.execute("ALTER TABLE '{}' ADD COLUMN 'ancestry' TEXT".format(table))
+
+		path = " || ".join(["'/' || show || '/'"] + ["COALESCE(NULLIF({}, '') || '/', '')".format(c) for c in ids])
+
+		conn.execute("UPDATE '{}' SET ancestry={}".format(table, path))
+		conn.execute("CREATE INDEX IF NOT EXISTS '{0}_ancestry' ON '{0}' ('ancestry')".format(table))
+
+def _addSearchIndex(conn):
+	# See helix.database.search, which falls back to scanning if SQLite doesn't have FTS5.
+	# Fix comments are indexed once they have their own table, see _addFixComments
+	try:
+		conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS 'search' USING fts5(title, body, comments)")
+	except sqlite3.OperationalError:
+		return
+
+	conn.execute("INSERT INTO search(search, rank) VALUES('rank', 'bm25(10.0, 1.0, 1.0)')")
+	conn.execute(
+	'''
+		CREATE TABLE IF NOT EXISTS 'searchDocs' (
+			'kind'		TEXT NOT NULL,
+			'ref'		VARCHAR(32) NOT NULL,
+			'show'		VARCHAR(10),
+			'ancestry'	TEXT,
+			UNIQUE('kind', 'ref')
+		)
+	'''
+	)
+	conn.execute("CREATE INDEX IF NOT EXISTS 'searchDocs_ancestry' ON 'searchDocs' ('ancestry')")
+
+	# Start over, the tables may have been dropped and remade since it was last filled
+	conn.execute('DELETE FROM search')
+	conn.execute('DELETE FROM searchDocs')
+
+	# (kind, table, ((search column, column of the table), ...), ancestry of the row with the given prefix)
+	for kind, table, text, ancestry in (
+		('element', 'elements', (('title', 'name'), ('body', 'type')), '{}ancestry'),
+		('fix', 'fixes', (('title', 'title'), ('body', 'body')), '{}ancestry'),
+		('publishedFile', 'publishedFiles', (('body', 'comment'), ), "(SELECT ancestry || id || '/' FROM elements WHERE id={}elementId)")
+	):
+		fields = ', '.join([f for f, _ in text])
+		doc = "(SELECT rowid FROM searchDocs WHERE kind='{}' AND ref={{}}.id)".format(kind)
+
+		conn.execute(
+			"INSERT INTO searchDocs (kind, ref, show, ancestry) SELECT '{}', id, show, {} FROM {}"
+			.format(kind, ancestry.format(table + '.'), table)
+		)
+		conn.execute(
+			"INSERT INTO search (rowid, {}) SELECT searchDocs.rowid, {} FROM {} JOIN searchDocs ON searchDocs.kind='{}' AND searchDocs.ref={}.id"
+			.format(fields, ', '.join([table + '.' + c for _, c in text]), table, kind, table)
+		)
+
+		for event in ('insert', 'update', 'delete'):
+			conn.execute("DROP TRIGGER IF EXISTS '{}_search_{}'".format(table, event))
+
+		conn.execute(
+		'''
+			CREATE TRIGGER '{0}_search_insert' AFTER INSERT ON '{0}' BEGIN
+				INSERT INTO searchDocs (kind, ref, show, ancestry) VALUES ('{1}', new.id, new.show, {2});
+				INSERT INTO search (rowid, {3}) VALUES (last_insert_rowid(), {4});
+			END
+		'''.format(table, kind, ancestry.format('new.'), fields, ', '.join(['new.' + c for _, c in text]))
+		)
+		conn.execute(
+		'''
+			CREATE TRIGGER '{0}_search_update' AFTER UPDATE OF {1} ON '{0}' BEGIN
+				UPDATE search SET {2} WHERE rowid={3};
+			END
+		'''.format(table, ', '.join([c for _, c in text]), ', '.join(['{}=new.{}'.format(f, c) for f, c in text]), doc.format('new'))
+		)
+		conn.execute(
+		'''
+			CREATE TRIGGER '{0}_search_delete' AFTER DELETE ON '{0}' BEGIN
+				DELETE FROM search WHERE rowid={1};
+				DELETE FROM searchDocs WHERE kind='{2}' AND ref=old.id;
+			END
+		'''.format(table, doc.format('old'), kind)
+		)
+
+def _addFixComments(conn):
+	# See Fix.addComment. Comments used to be the repr of a list of (author, creation, text)
+	# in the fixes' comments column, read back with eval
+	conn.execute(
+	'''
+		CREATE TABLE IF NOT EXISTS 'fixComments' (
+			'id'		INTEGER PRIMARY KEY,
+			'fixId'		VARCHAR(32) NOT NULL,
+			'author'	VARCHAR(10) NOT NULL,
+			'creation'	DATE NOT NULL,
+			'text'		TEXT NOT NULL,
+			FOREIGN KEY('fixId') REFERENCES 'fixes'('id'),
+			FOREIGN KEY('author') REFERENCES 'people'('username')
+		)
+	'''
+	)
+	conn.execute("CREATE INDEX IF NOT EXISTS 'fixComments_fixId' ON 'fixComments' ('fixId', 'id')")
+	conn.execute(
+	'''
+		CREATE TRIGGER IF NOT EXISTS 'fixes_comments_delete' AFTER DELETE ON 'fixes' BEGIN
+			DELETE FROM fixComments WHERE fixId=old.id;
+		END
+	'''
+	)
+
+	columns = [r[1] for r in conn.execute("PRAGMA TABLE_INFO ('fixes')").fetchall()]
+
+	if 'comments' in columns:
+		rows = []
+
+		for fixId, comments in conn.execute("SELECT id, comments FROM fixes WHERE comments IS NOT NULL AND comments != ''").fetchall():
+			try:
+				rows.extend([(fixId, ) + tuple(c) for c in ast.literal_eval(comments) if len(c) == 3])
+			except (ValueError, SyntaxError, TypeError):
+				continue # Unreadable, same as before when it failed to eval
+
+		conn.executemany('INSERT INTO fixComments (fixId, author, creation, text) VALUES (?, ?, ?, ?)', rows)
+		conn.execute('UPDATE fixes SET comments=NULL')
+
+	if not _hasTable(conn, 'search'):
+		return # No FTS5, see _addSearchIndex
+
+	# Index the comments from their new table, all of a fix's in the comments column of its row
+	comments = "(SELECT group_concat(text, ' ') FROM fixComments WHERE fixId={})"
+
+	conn.execute(
+		"UPDATE search SET comments={} WHERE rowid IN (SELECT rowid FROM searchDocs WHERE kind='fix')"
+		.format(comments.format('(SELECT ref FROM searchDocs WHERE searchDocs.rowid=search.rowid)'))
+	)
+
+	for event in ('insert', 'update'):
+		conn.execute("DROP TRIGGER IF EXISTS 'fixes_search_{}'".format(event))
+
+	conn.execute(
+	'''
+		CREATE TRIGGER 'fixes_search_insert' AFTER INSERT ON 'fixes' BEGIN
+			INSERT INTO searchDocs (kind, ref, show, ancestry) VALUES ('fix', new.id, new.show, new.ancestry);
+			INSERT INTO search (rowid, title, body, comments) VALUES (last_insert_rowid(), new.title, new.body, {});
+		END
+	'''.format(comments.format('new.id'))
+	)
+	conn.execute(
+	'''
+		CREATE TRIGGER 'fixes_search_update' AFTER UPDATE OF title, body ON 'fixes' BEGIN
+			UPDATE search SET title=new.title, body=new.body WHERE rowid=(SELECT rowid FROM searchDocs WHERE kind='fix' AND ref=new.id);
+		END
+	'''
+	)
+
+	# Adding or removing a comment redoes the comments of its fix
+	for event, row in (('insert', 'new'), ('delete', 'old')):
+		conn.execute("DROP TRIGGER IF EXISTS 'fixComments_search_{}'".format(event))
+		conn.execute(
+		'''
+			CREATE TRIGGER 'fixComments_search_{0}' AFTER {1} ON 'fixComments' BEGIN
+				UPDATE search SET comments={2} WHERE rowid=(SELECT rowid FROM searchDocs WHERE kind='fix' AND ref={3});
+			END
+		'''.format(event, event.upper(), comments.format(row + '.fixId'), row + '.fixId')
+		)
+
+def _permNodesToJson(conn):
+	# See PermissionGroup.perm_nodes, these used to be the repr of a list too
+	for name, nodes in conn.execute('SELECT group_name, perm_nodes FROM permissions').fetchall():
+		try:
+			nodes = ast.literal_eval(nodes) if nodes else []
+		except (ValueError, SyntaxError):
+			nodes = []
+
+		conn.execute('UPDATE permissions SET perm_nodes=? WHERE group_name=?', (json.dumps(list(nodes)), name))
+
+def _addCounters(conn):
+	# See helix.database.counters, started from the numbers that are already taken
+	conn.execute(
+	'''
+		CREATE TABLE IF NOT EXISTS 'counters' (
+			'name'	TEXT PRIMARY KEY,
+			'value'	INTEGER NOT NULL
+		)
+	'''
+	)
+
+	# Counters that are already ahead (numbers that were taken but never inserted) stay there
+	for table, column, scope in (('fixes', 'num', ('show', )), ('publishedFiles', 'version', ('show', 'elementId')), ('snapshots', 'num', ('show', 'sequenceId', 'shotId'))):
+		for row in conn.execute('SELECT {0}, MAX({1}) FROM {2} GROUP BY {0}'.format(', '.join(scope), column, table)).fetchall():
+			key = u'/'.join([table] + [u'' if s is None else unicode(s) for s in row[:-1]])
+
+			if conn.execute('UPDATE counters SET value=MAX(value, ?) WHERE name=?', (row[-1], key)).rowcount == 0:
+				conn.execute('INSERT INTO counters (name, value) VALUES (?, ?)', (key, row[-1]))
+
+def _addChangelog(conn):
+	# See helix.database.changes. Every 1000th change prunes the ones more than 100000 back
+	conn.execute(
+	'''
+		CREATE TABLE IF NOT EXISTS 'changelog' (
+			'seq'		INTEGER PRIMARY KEY AUTOINCREMENT,
+			'tableName'	TEXT NOT NULL,
+			'pk'		TEXT NOT NULL,
+			'op'		TEXT NOT NULL
+		)
+	'''
+	)
+	conn.execute("DROP TRIGGER IF EXISTS 'changelog_prune'")
+	conn.execute(
+	'''
+		CREATE TRIGGER 'changelog_prune' AFTER INSERT ON 'changelog' WHEN new.seq % 1000 = 0 BEGIN
+			DELETE FROM changelog WHERE seq <= new.seq - 100000;
+		END
+	'''
+	)
+
+	for table in ('shows', 'sequences', 'shots', 'elements', 'stages', 'snapshots', 'publishedFiles', 'fixes', 'people', 'permissions'):
+		pk = [r[1] for r in conn.execute('PRAGMA TABLE_INFO ({})'.format(table)).fetchall() if r[5]]
+
+		if not pk:
+			continue # Not made yet
+
+		for event, row in (('insert', 'new'), ('update', 'new'), ('delete', 'old')):
+			conn.execute("DROP TRIGGER IF EXISTS '{}_changelog_{}'".format(table, event))
+			conn.execute(
+			'''
+				CREATE TRIGGER '{0}_changelog_{1}' AFTER {2} ON '{0}' BEGIN
+					INSERT INTO changelog (tableName, pk, op) VALUES ('{0}', {3}.{4}, '{1}');
+				END
+			'''.format(table, event, event.upper(), row, pk[0])
+			)
+
+	# A change to a fix's comments is logged as an update of the fix, unless it's deleting them
+	# along with the fix, which is already logged as the fix's delete
+	for event, row in (('insert', 'new'), ('delete', 'old')):
+		conn.execute("DROP TRIGGER IF EXISTS 'fixComments_changelog_{}'".format(event))
+		conn.execute(
+		'''
+			CREATE TRIGGER 'fixComments_changelog_{0}' AFTER {1} ON 'fixComments'
+			WHEN EXISTS (SELECT 1 FROM fixes WHERE id={2}.fixId) BEGIN
+				INSERT INTO changelog (tableName, pk, op) VALUES ('fixes', {2}.fixId, 'update');
+			END
+		'''.format(event, event.upper(), row)
+		)
+
+def _addSearchMoveTriggers(conn):
+	# See helix.database.search, searchDocs didn't follow objects moving to another show or parent
+	if not _hasTable(conn, 'search'):
+		return # No FTS5, see _addSearchIndex
+
+	conn.execute(
+		"UPDATE searchDocs SET show=(SELECT show FROM elements WHERE id=ref), ancestry=(SELECT ancestry FROM elements WHERE id=ref) WHERE kind='element'"
+	)
+	conn.execute(
+		"UPDATE searchDocs SET show=(SELECT show FROM fixes WHERE id=ref), ancestry=(SELECT ancestry FROM fixes WHERE id=ref) WHERE kind='fix'"
+	)
+	conn.execute(
+	'''
+		UPDATE searchDocs SET
+			show=(SELECT show FROM publishedFiles WHERE id=ref),
+			ancestry=(SELECT elements.ancestry || elements.id || '/' FROM publishedFiles JOIN elements ON elements.id=publishedFiles.elementId WHERE publishedFiles.id=ref)
+		WHERE kind='publishedFile'
+	'''
+	)
+
+	for table in ('elements', 'fixes', 'publishedFiles'):
+		conn.execute("DROP TRIGGER IF EXISTS '{}_search_move'".format(table))
+
+	# An element's published files are under it, so they move along with it
+	conn.execute(
+	'''
+		CREATE TRIGGER 'elements_search_move' AFTER UPDATE OF show, ancestry ON 'elements' BEGIN
+			UPDATE searchDocs SET show=new.show, ancestry=new.ancestry WHERE kind='element' AND ref=new.id;
+			UPDATE searchDocs SET ancestry=new.ancestry || new.id || '/'
+			WHERE kind='publishedFile' AND ref IN (SELECT id FROM publishedFiles WHERE elementId=new.id);
+		END
+	'''
+	)
+	conn.execute(
+	'''
+		CREATE TRIGGER 'fixes_search_move' AFTER UPDATE OF show, ancestry ON 'fixes' BEGIN
+			UPDATE searchDocs SET show=new.show, ancestry=new.ancestry WHERE kind='fix' AND ref=new.id;
+		END
+	'''
+	)
+	conn.execute(
+	'''
+		CREATE TRIGGER 'publishedFiles_search_move' AFTER UPDATE OF show, elementId ON 'publishedFiles' BEGIN
+			UPDATE searchDocs SET show=new.show, ancestry=(SELECT ancestry || id || '/' FROM elements WHERE id=new.elementId)
+			WHERE kind='publishedFile' AND ref=new.id;
+		END
+	'''
+	)
+
+def _searchTrigrams(conn):
+	# See helix.database.search. The index was of words, which only match from their start,
+	# so searching for part of a name (i.e. 'car' in 'herocar') found nothing
+	if not _hasTable(conn, 'search'):
+		return # No FTS5, see _addSearchIndex
+
+	conn.execute('CREATE TEMP TABLE searchCopy AS SELECT rowid AS id, title, body, comments FROM search')
+	conn.execute('DROP TABLE search')
+
+	try:
+		conn.execute("CREATE VIRTUAL TABLE 'search' USING fts5(title, body, comments, tokenize='trigram')")
+	except sqlite3.OperationalError:
+		# SQLite before 3.34 doesn't have trigrams. Searching falls back to scanning, which
+		# matches anywhere too, rather than keeping an index that wouldn't
+		for table, events in (('elements', ('insert', 'update', 'move', 'delete')), ('fixes', ('insert', 'update', 'move', 'delete')), ('publishedFiles', ('insert', 'update', 'move', 'delete')), ('fixComments', ('insert', 'delete'))):
+			for event in events:
+				conn.execute("DROP TRIGGER IF EXISTS '{}_search_{}'".format(table, event))
+
+		conn.execute('DROP TABLE searchDocs')
+	else:
+		conn.execute("INSERT INTO search(search, rank) VALUES('rank', 'bm25(10.0, 1.0, 1.0)')")
+		conn.execute('INSERT INTO search (rowid, title, body, comments) SELECT id, title, body, comments FROM searchCopy')
+
+	conn.execute('DROP TABLE searchCopy')
+
+# (version, description, function taking the connection to migrate), in order
+MIGRATIONS = [
+	(1, 'Add indexes for the hot lookup columns', _addLookupIndexes),
+	(2, 'Add indexes for paging elements, fixes and published files', _addPageIndexes),
+	(3, 'Add the materialized ancestry of elements, fixes and snapshots', _addAncestry),
+	(4, 'Add the full-text search index', _addSearchIndex),
+	(5, 'Move fix comments into their own table', _addFixComments),
+	(6, 'Store permission nodes as JSON', _permNodesToJson),
+	(7, 'Add counters for fix numbers, snapshot numbers and publish versions', _addCounters),
+	(8, 'Add the changelog of inserted, updated and deleted rows', _addChangelog),
+	(9, 'Keep the search index\'s show and ancestry up to date', _addSearchMoveTriggers),
+	(10, 'Match parts of words in the search index', _searchTrigrams),
+]
+
+LATEST = MIGRATIONS[-1][0]
+
+def _hasTable(conn, name):
+	return conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name=?", (name, )).fetchone()[0] > 0
+
+def getVersion(conn):
+	return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def setVersion(conn, version):
+	conn.execute('PRAGMA user_version = {}'.format(int(version)))
+
+def needsMigration(conn):
+	"""Whether the database is behind the latest schema version. A database that hasn't
+	had its tables made yet doesn't need migrating, Manager.initTables will take care of it.
+	"""
+	if getVersion(conn) >= LATEST:
+		return False
+
+	return conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name='elements'").fetchone()[0] > 0
+
+def migrate(conn):
+	"""Applies every migration newer than the database's current version, in order.
+	Should be called on a connection that is already in a write transaction so that
+	the migrations and the new version are committed together.
+
+	Args:
+	    conn (sqlite3.Connection): The connection to the database to migrate
+
+	Returns:
+	    list: The versions that were applied
+	"""
+	current = getVersion(conn)
+	applied = []
+
+	for version, description, func in MIGRATIONS:
+		if version <= current:
+			continue
+
+		func(conn)
+		setVersion(conn, version)
+		applied.append(version)
+
+	return applied
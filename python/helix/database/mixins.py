@@ -1,107 +1,181 @@
 import collections
 
 class FixMixin(object):
-	@property
-	def completion(self):
-		from helix.database.sql import Manager
+	def _fixQuery(self, columns, type='task'):
+		"""Starts a query on the fixes of the given type that belong to this container
+
+		Args:
+		    columns (list): The columns (or expressions) to select
+		    type (str, optional): The fix type, i.e. 'task' or 'bug', or None for any
+
+		Returns:
+		    helix.database.query.Query: The query
+		"""
+		from helix.database.query import Query
 		from helix import Fix, Show
 
 		if isinstance(self, Show):
-			idQualifier = None
-			show = self.alias
+			query = Query(Fix.TABLE, columns).where('show', self.alias)
 		else:
 			idQualifier = self.__class__.__name__.lower() + 'Id'
-			show = self.show
+			query = Query(Fix.TABLE, columns).where(idQualifier, self.id).where('show', self.show)
+
+		if type is not None:
+			query.where('type', type)
+
+		return query
+
+	def getFixes(self, *args, **kwargs):
+		"""Same as iterFixes, but returns all the matching fixes in a list"""
+		return list(self.iterFixes(*args, **kwargs))
+
+	def iterFixes(self, type=None, status=[], departments=[], fixers=[], chunkSize=None, records=False, columns=None, limit=None, after=None, eager=False):
+		"""Streams the fixes that belong to this container, i.e. all the fixes of a show or
+		only the ones of a single element.
+
+		Args:
+		    type (str, optional): The fix type, i.e. 'task' or 'bug', or None for any
+		    status (list, optional): Only fixes with these statuses
+		    departments (list, optional): Only fixes for these departments
+		    fixers (list, optional): Only fixes assigned to these users
+		    chunkSize (int, optional): How many rows to fetch from the DB at a time
+		    records (bool, optional): Whether to yield read-only records rather than full objects
+		    columns (list, optional): Only select these columns, i.e. leaving out the body
+		    limit (int, optional): Only get one page of this many, oldest first
+		    after (Fix, optional): The last fix of the previous page
+		    eager (bool, optional): Whether to load each fix's target and its parents in the
+		    	same query, see DatabaseObject.iterQuery
+
+		Returns:
+		    generator: The fixes
+		"""
+		from helix import Fix
+
+		query = self._fixQuery(['*'], type=type)
+		query.whereIn('status', status)
+		query.whereIn('for_dept', departments)
+		query.whereIn('fixer', fixers)
+
+		return Fix.iterQuery(query, chunkSize=chunkSize, records=records, columns=columns, limit=limit, after=after, eager=eager)
 
-		with Manager(willCommit=False) as mgr:
-			query = """SELECT status, COUNT(*) FROM {} WHERE show='{}' and type='task'""".format(Fix.TABLE, show)
-
-			if idQualifier is not None:
-				query += " AND {}='{}'".format(idQualifier, self.id)
-
-			query += "GROUP BY status"
+	@property
+	def completion(self):
+		# All of them are tasks, so they're a single group. No tasks at all is 0% completion,
+		# maybe we want no tasks to mean 100% completion?
+		return self.completionBy('type')['task']
 
-			rows = mgr.connection().execute(query).fetchall()
+	def completionBy(self, qualifier, type='task'):
+		"""The completion of each group of this container's tasks, i.e. of every shot in a
+		show for an overview, all in one query rather than one per group:
 
-			if rows:
-				done = 0
-				total = 0
+			byShot = show.completionBy('shotId')
+			byShot[shot.id]
 
-				for r in rows:
-					total += r[1] # Add count for this status to total
-					if r[0] == 'done':
-						done += r[1]
+		Args:
+		    qualifier (str): The fix column to group by
+		    type (str, optional): The fix type, i.e. 'task' or 'bug'
 
-				return float(done) / total
-			else:
-				# No tasks at all, 0% completion. Maybe we want no tasks to mean 100% completion?
-				return 0
+		Raises:
+		    ValueError: If the qualifier isn't a column of fixes
 
-	def numTasksBy(self, qualifier, type='task', status=None):
+		Returns:
+		    collections.defaultdict: The fraction of tasks that are done for each value of the
+		    	qualifier. Values without any tasks are 0.
+		"""
 		from helix.database.sql import Manager
-		from helix import Fix, Show
 
-		if isinstance(self, Show):
-			idQualifier = None
-			show = self.alias
-		else:
-			idQualifier = self.__class__.__name__.lower() + 'Id'
-			show = self.show
+		_checkColumns([qualifier])
 
-		with Manager(willCommit=False) as mgr:
-			query = """SELECT {}, COUNT(*) FROM {} WHERE show='{}' and type='{}'""".format(qualifier, Fix.TABLE, show, type)
+		query = self._fixQuery([qualifier, "SUM(status='done')", 'COUNT(*)'], type=type).groupBy(qualifier)
+		results = collections.defaultdict(float)
 
-			if idQualifier is not None:
-				query += " AND {}='{}'".format(idQualifier, self.id)
+		with Manager(willCommit=False) as mgr:
+			for value, done, total in query.execute(mgr.connection()).fetchall():
+				results[value] = float(done) / total
 
-			if status is not None:
-				query += " AND status='{}'".format(status)
+		return results
 
-			query += " GROUP BY {}".format(qualifier)
+	def taskCountsBy(self, groupBy, type='task', status=None):
+		"""Counts this container's fixes grouped by several columns at once, i.e. how many
+		tasks of each status every department has in each shot, all in one query:
 
-			rows = mgr.connection().execute(query).fetchall()
-			results = collections.defaultdict(int)
+			counts = show.taskCountsBy(['shotId', 'for_dept', 'status'])
+			counts[(shot.id, 'comp', 'done')]
 
-			if rows:
-				for r in rows:
-					if not r[0]:
-						results['_'] += r[1]
-					else:
-						results[r[0]] += r[1]
+		Args:
+		    groupBy (list): The fix columns to group by
+		    type (str, optional): The fix type, i.e. 'task' or 'bug', or None for any
+		    status (str, optional): Only count fixes with this status
 
-				return results
-			else:
-				return results
+		Raises:
+		    ValueError: If any of the columns isn't a column of fixes
 
-	def numTasks(self, type='task', status=None, department=None, user=None):
+		Returns:
+		    collections.defaultdict: The count for each tuple of values of the groupBy columns,
+		    	in the same order. Combinations without any fixes are 0.
+		"""
 		from helix.database.sql import Manager
-		from helix import Fix, Show
 
-		if isinstance(self, Show):
-			idQualifier = None
-			show = self.alias
-		else:
-			idQualifier = self.__class__.__name__.lower() + 'Id'
-			show = self.show
+		groupBy = list(groupBy)
+
+		_checkColumns(groupBy)
+
+		query = self._fixQuery(groupBy + ['COUNT(*)'], type=type)
+
+		if status is not None:
+			query.where('status', status)
+
+		query.groupBy(*groupBy)
+		results = collections.defaultdict(int)
 
 		with Manager(willCommit=False) as mgr:
-			query = """SELECT COUNT(*) FROM {} WHERE show='{}' and type='{}'""".format(Fix.TABLE, show, type)
+			for row in query.execute(mgr.connection()).fetchall():
+				results[tuple(row[:-1])] = row[-1]
+
+		return results
 
-			if idQualifier is not None:
-				query += " AND {}='{}'".format(idQualifier, self.id)
+	def numTasksBy(self, qualifier, type='task', status=None):
+		results = collections.defaultdict(int)
 
-			if status is not None:
-				query += " AND status='{}'".format(status)
+		for (value, ), count in self.taskCountsBy([qualifier], type=type, status=status).items():
+			# Tasks without a value (i.e. nobody assigned yet) are counted together
+			results[value if value else '_'] += count
 
-			if department is not None:
-				query += " AND for_dept='{}'".format(department)
+		return results
 
-			if user is not None:
-				query += " AND fixer='{}'".format(user)
+	def numTasks(self, type='task', status=None, department=None, user=None):
+		from helix.database.sql import Manager
 
-			row = mgr.connection().execute(query).fetchone()
+		query = self._fixQuery(['COUNT(*)'], type=type)
+
+		if status is not None:
+			query.where('status', status)
+
+		if department is not None:
+			query.where('for_dept', department)
+
+		if user is not None:
+			query.where('fixer', user)
+
+		with Manager(willCommit=False) as mgr:
+			row = query.execute(mgr.connection()).fetchone()
 
 			if row and row[0]:
 				return row[0]
 			else:
-				return 0
\ No newline at end of file
+				return 0
+
+def _checkColumns(columns):
+	"""Makes sure the given columns, which are formatted into the query rather than passed
+	as values, are all columns of the fixes table
+
+	Raises:
+	    ValueError: If any of them isn't
+	"""
+	from helix import Fix
+
+	names = [c for c, _ in Fix.columns()]
+	unknown = [c for c in columns if c not in names]
+
+	if unknown:
+		raise ValueError('Fixes have no column(s): {}'.format(', '.join(unknown)))
@@ -1,20 +1,20 @@
 import os
 import glob
 
-from helix.database.database import DatabaseObject
+from helix.database.database import DatabaseObject, idProperty
+from helix.database import lineage, counters
 import helix.environment.environment as env
-from helix.database.show import Show
 from helix.database.fix import Fix
 from helix.database.element import Element
-from helix.database.person import Person
 from helix.utils.fileclassification import FrameSequence
 import helix.utils.utils as utils
 
 class PublishedFile(DatabaseObject):
 	TABLE='publishedFiles'
 	PK='id'
+	PAGE_KEY=('creation', 'id')
 
-	def __init__(self, elementName, elementType, filePath, versionlessFilePath, show=None, sequence=None, shot=None, comment=None, fix=None, dummy=False):
+	def __init__(self, elementName, elementType, filePath, versionlessFilePath, show=None, sequence=None, shot=None, comment=None, fix=None, version=None, dummy=False):
 		self.table = PublishedFile.TABLE
 
 		if dummy:
@@ -26,6 +26,8 @@ class PublishedFile(DatabaseObject):
 		self.elementId = None
 		self.fixId = None
 		self._exists = None
+		# Already taken from the counter (see Element.versionUp), rather than on insert
+		self._versionTaken = version is not None
 
 		if not self.show:
 			raise ValueError('Tried to fallback to environment-set show, but it was null.')
@@ -39,9 +41,11 @@ class PublishedFile(DatabaseObject):
 		if self.elementType is None:
 			raise ValueError('Must provide an element type to attach this Published File to')
 
-		e = Element(self.elementName, self.elementType, show=self.show, sequence=sequence, shot=shot)
+		e = Element.identify(self.elementName, self.elementType, self.show, sequence, shot)
+		author = env.getCreationInfo(format=False)[0]
+		parents = lineage.resolve(self.show, person=author, elementId=e.id)
 
-		if not e.exists():
+		if not parents.element:
 			raise ValueError(
 				'No such element to attach to: {} ({}) in {}{}{}'.format(
 					e.name,
@@ -54,40 +58,33 @@ class PublishedFile(DatabaseObject):
 		else:
 			self.elementId = e.id
 
-		self.version = PublishedFile.nextVersion(self.show, self.elementId)
+		self.version = version if self._versionTaken else PublishedFile.nextVersion(self.show, self.elementId)
 
-		fetched = self.exists(fetch=True)
+		# Always a new publish. A row with this version could only be another publish that took
+		# it in the meantime, which this one mustn't be mistaken for (and not take its own).
+		self._exists = False
 
-		if fetched:
-			self.unmap(fetched)
-			self._exists = True
-		else:
-			self._exists = False
-
-			creationInfo = env.getCreationInfo(format=False)
-
-			self.author = creationInfo[0]
-			self.creation = creationInfo[1]
-			self.comment = comment
-			self.file_path = filePath
-			self.versionless_path = versionlessFilePath
+		creationInfo = env.getCreationInfo(format=False)
 
-			s = Show.fromPk(self.show)
-			p = Person(self.author)
+		self.author = creationInfo[0]
+		self.creation = creationInfo[1]
+		self.comment = comment
+		self.file_path = filePath
+		self.versionless_path = versionlessFilePath
 
-			if not s:
-				raise ValueError('No such show: {}'.format(self.show))
+		if not parents.show:
+			raise ValueError('No such show: {}'.format(self.show))
 
-			if not p.exists():
-				raise ValueError('No such user: {}'.format(self.author))
+		if not parents.personExists:
+			raise ValueError('No such user: {}'.format(self.author))
 
-			if fix:
-				f = Fix.byNum(fix, self.show)
+		if fix:
+			f = Fix.byNum(fix, self.show)
 
-				if not f or not f.exists():
-					raise ValueError('No such fix number: {} in show {}'.format(fix, self.show))
-				else:
-					self.fixId = f.id
+			if not f or not f.exists():
+				raise ValueError('No such fix number: {} in show {}'.format(fix, self.show))
+			else:
+				self.fixId = f.id
 
 	def getFilePaths(self):
 		globString = FrameSequence.asGlobString(self.file_path)
@@ -105,19 +102,19 @@ class PublishedFile(DatabaseObject):
 			path = fs.getFormatted(includeDir=True)
 
 		from helix.database.sql import Manager
+		from helix.database.query import Query
+
+		query = Query(PublishedFile.TABLE).whereRaw('(file_path=? OR versionless_path=?)', path, path)
+
 		with Manager(willCommit=False) as mgr:
-			res = mgr.connection().execute(
-				'''
-					SELECT * from {} WHERE file_path='{}' OR versionless_path='{}'
-				'''.format(PublishedFile.TABLE, path, path)
-			).fetchone()
+			res = query.execute(mgr.connection()).fetchone()
 
 			if res:
-				return PublishedFile.dummy().unmap(res)
+				return PublishedFile.rowMapper()(res)
 
 		return None
 
-	@property
+	@idProperty('show', 'elementId', 'version')
 	def id(self):
 		return super(PublishedFile, self)._id(
 			'{}_{}_{}'.format(
@@ -131,21 +128,21 @@ class PublishedFile(DatabaseObject):
 	def pk(self):
 		return PublishedFile.PK
 
+	def _beforeInsert(self, conn):
+		# Two artists publishing the same element at once both see the same next version,
+		# the one whose insert gets the write lock first takes it
+		if not self._exists and not self._versionTaken:
+			self.version = counters.take(conn, PublishedFile.TABLE, self.show, self.elementId)
+
 	@staticmethod
 	def nextVersion(show, element):
+		"""The version the next file published to the given element will most likely get.
+		It's only taken once the published file is inserted, see helix.database.counters
+		"""
 		from helix.database.sql import Manager
 
 		with Manager(willCommit=False) as mgr:
-			res = mgr.connection().execute(
-				'''
-					SELECT MAX(version) from {} WHERE show='{}' AND elementId='{}'
-				'''.format(PublishedFile.TABLE, show, element)
-			).fetchone()
-
-			if res and res[0]:
-				return int(res[0]) + 1
-			else:
-				return 1
+			return counters.peek(mgr.connection(), PublishedFile.TABLE, show, element)
 
 	@staticmethod
 	def dummy():
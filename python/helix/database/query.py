@@ -0,0 +1,255 @@
+"""Builds the SQL for the finder methods. Values are always passed as ? parameters, never
+formatted into the statement, so the text of a query only depends on which filters are
+used (and how many values each has). That keeps quotes in names from breaking queries,
+and lets sqlite3's statement cache reuse the parsed statement across calls.
+
+	query = Query(Element.TABLE).where('show', 'foo').whereIn('type', ['prop', 'set'])
+	rows = query.execute(mgr.connection()).fetchall()
+"""
+
+def isNull(value):
+	"""Whether the given filter value is the special 'null' the finders accept for matching
+	NULL columns.
+	"""
+	return isinstance(value, basestring) and value.lower() == 'null'
+
+class Query(object):
+	CHUNK_SIZE = 500 # Rows fetched at a time when iterating
+
+	def __init__(self, table, columns=None):
+		"""Start a new SELECT query
+
+		Args:
+		    table (str): The table to select from
+		    columns (list, optional): The columns (or expressions) to select, defaults to all
+		"""
+		self.table = table
+		self.columns = list(columns) if columns else ['*']
+		self.joins = []
+		self.conditions = []
+		self.params = []
+		self.groups = []
+		self.order = []
+		self.limitTo = None
+
+	@staticmethod
+	def wrap(query, alias, columns=None):
+		"""Start a new SELECT query on the results of another, i.e. to join other tables to
+		them without the inner query's conditions becoming ambiguous
+
+		Args:
+		    query (Query): The query to select from
+		    alias (str): What to call the inner query's results in the new one
+		    columns (list, optional): The columns (or expressions) to select, defaults to all
+
+		Returns:
+		    Query: The new query
+		"""
+		outer = Query('({}) AS {}'.format(query.sql, alias), columns)
+		outer.params = query.values
+
+		return outer
+
+	def leftJoin(self, table, condition):
+		"""Joins the given table on the given condition, i.e. "shows.alias=elements.show"
+
+		Returns:
+		    Query: This query, for chaining
+		"""
+		self.joins.append('LEFT JOIN {} ON {}'.format(table, condition))
+
+		return self
+
+	def where(self, column, value):
+		"""Filters to rows where the column equals the value, or is NULL if the value is None.
+
+		Returns:
+		    Query: This query, for chaining
+		"""
+		if value is None:
+			self.conditions.append('{} IS NULL'.format(column))
+		else:
+			self.conditions.append('{}=?'.format(column))
+			self.params.append(value)
+
+		return self
+
+	def whereIn(self, column, values):
+		"""Filters to rows where the column is one of the values. Follows the conventions of
+		the finder methods' arguments:
+
+			- None or an empty list doesn't filter at all
+			- A single value is the same as a list of just that value
+			- 'null' (or a list starting with it) matches NULL instead
+
+		Returns:
+		    Query: This query, for chaining
+		"""
+		if values is None:
+			return self
+
+		if isinstance(values, (basestring, int, long)):
+			values = [values]
+
+		values = list(values)
+
+		if not values:
+			return self
+
+		if isNull(values[0]):
+			self.conditions.append('{} IS NULL'.format(column))
+		else:
+			self.conditions.append('{} IN ({})'.format(column, ','.join(['?'] * len(values))))
+			self.params.extend(values)
+
+		return self
+
+	def whereRaw(self, condition, *params):
+		"""Adds an arbitrary condition, i.e. "name LIKE ?". Any values should be given as
+		params rather than formatted into the condition.
+
+		Returns:
+		    Query: This query, for chaining
+		"""
+		self.conditions.append(condition)
+		self.params.extend(params)
+
+		return self
+
+	def whereStartsWith(self, column, prefix):
+		"""Filters to rows where the column starts with the given prefix. Unlike a LIKE, this
+		is a range on the column, so it can use the column's index. An empty prefix doesn't
+		filter at all.
+
+		Returns:
+		    Query: This query, for chaining
+		"""
+		if not prefix:
+			return self
+
+		# Everything starting with the prefix sorts between it and the prefix with its
+		# last character bumped up by one, i.e. /foo/ <= /foo/... < /foo0
+		self.conditions.append('{0}>=? AND {0}<?'.format(column))
+		self.params.extend([prefix, prefix[:-1] + unichr(ord(prefix[-1]) + 1)])
+
+		return self
+
+	def groupBy(self, *columns):
+		self.groups.extend(columns)
+
+		return self
+
+	def orderBy(self, *columns):
+		self.order.extend(columns)
+
+		return self
+
+	def limit(self, num):
+		self.limitTo = int(num)
+
+		return self
+
+	def page(self, columns, after=None, limit=None):
+		"""Keyset pagination: orders by the given columns and only keeps the rows that sort
+		after the given values of them, i.e. the last row of the previous page. Unlike an
+		OFFSET, this doesn't have to walk past all the previous pages' rows first, and rows
+		added or removed in the meantime don't shift what the next page starts at. The
+		columns should uniquely identify a row (i.e. end with the primary key).
+
+			query.page(['creation', 'id'], after=(last.creation, last.id), limit=100)
+
+		Args:
+		    columns (list): The columns to order by
+		    after (tuple, optional): The values of the columns to start after, or None to
+		    	start at the first page
+		    limit (int, optional): How many rows a page has, or None for all the rest
+
+		Returns:
+		    Query: This query, for chaining
+		"""
+		columns = list(columns)
+		self.order = list(columns)
+
+		if after is not None:
+			after = list(after)
+
+			if len(after) != len(columns):
+				raise ValueError('Expected {} values to page after, got {}'.format(len(columns), len(after)))
+
+			# (a, b) > (x, y) spelled out, since row values need a newer SQLite. The leading
+			# a >= x lets an index on the columns seek straight to the page
+			clauses = []
+			params = [after[0]]
+
+			for i, column in enumerate(columns):
+				clauses.append('(' + ' AND '.join(['{}=?'.format(c) for c in columns[:i]] + ['{}>?'.format(column)]) + ')')
+				params.extend(after[:i + 1])
+
+			self.whereRaw('{}>=? AND ({})'.format(columns[0], ' OR '.join(clauses)), *params)
+
+		if limit is not None:
+			self.limit(limit)
+
+		return self
+
+	@property
+	def sql(self):
+		sql = 'SELECT {} FROM {}'.format(', '.join(self.columns), self.table)
+
+		if self.joins:
+			sql += ' ' + ' '.join(self.joins)
+
+		if self.conditions:
+			sql += ' WHERE ' + ' AND '.join(self.conditions)
+
+		if self.groups:
+			sql += ' GROUP BY ' + ', '.join(self.groups)
+
+		if self.order:
+			sql += ' ORDER BY ' + ', '.join(self.order)
+
+		if self.limitTo is not None:
+			sql += ' LIMIT ?'
+
+		return sql
+
+	@property
+	def values(self):
+		"""Returns:
+		    list: The values for each ? in sql, in order
+		"""
+		if self.limitTo is not None:
+			return self.params + [self.limitTo]
+
+		return list(self.params)
+
+	def execute(self, conn):
+		"""Runs the query on the given connection
+
+		Returns:
+		    sqlite3.Cursor: The cursor to fetch the results from
+		"""
+		return conn.execute(self.sql, self.values)
+
+	def iterate(self, conn, chunkSize=None):
+		"""Runs the query on the given connection, yielding the rows as they're fetched a
+		chunk at a time rather than fetching them all up front
+
+		Args:
+		    conn (sqlite3.Connection): The connection to run on
+		    chunkSize (int, optional): How many rows to fetch at a time, defaults to CHUNK_SIZE
+		"""
+		cursor = self.execute(conn)
+		chunkSize = chunkSize or Query.CHUNK_SIZE
+
+		while True:
+			rows = cursor.fetchmany(chunkSize)
+
+			if not rows:
+				break
+
+			for row in rows:
+				yield row
+
+	def __str__(self):
+		return '{} {}'.format(self.sql, self.values)
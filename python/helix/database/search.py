@@ -0,0 +1,169 @@
+"""Full-text search over elements (name, type), fixes (title, body, comments) and published
+files (comment), ranked by relevance:
+
+	for obj in helix.search('hero car', show='foo', kinds=['element', 'fix']):
+		print obj
+
+The text lives in an FTS5 table (search) next to a regular one (searchDocs) that says which
+object each of its rows is for, linked by rowid. Triggers on the searched tables keep both up
+to date as objects are inserted, edited and deleted, so nothing has to maintain them by hand.
+
+Each word of the query matches anywhere in the text, not just at the start of a word (the
+index is of trigrams), so 'car' finds 'herocar'. SQLite builds without FTS5 or its trigram
+tokenizer (before 3.34) don't get the index (see migrations), and searching falls back to an
+unranked LIKE on the same columns.
+"""
+import re
+import sqlite3
+
+# kind -> (table, title column, body column), None for ones it doesn't have
+KINDS = {
+	'element': ('elements', 'name', 'type'),
+	'fix': ('fixes', 'title', 'body'),
+	'publishedFile': ('publishedFiles', None, 'comment')
+}
+
+# The comments of a fix, given the SQL for its id. They're rows of their own (see
+# Fix.addComment), which all go in the comments column of the fix's row in the index.
+COMMENTS = "(SELECT group_concat(text, ' ') FROM fixComments WHERE fixId={})"
+
+def search(text, show=None, kinds=None, under=None, limit=None, eager=False):
+	"""Finds the elements, fixes and published files matching the given text, best first
+
+	Args:
+	    text (str): What to search for, words that all have to appear somewhere in the text
+	    show (str, optional): Only objects in this show
+	    kinds (list, optional): Only objects of these kinds (see KINDS), defaults to all
+	    under (str, optional): Only objects with this ancestry prefix, i.e. a shot's subtree
+	    limit (int, optional): The most results to return
+	    eager (bool, optional): Whether to load the objects' parents with them, see
+	    	DatabaseObject.iterQuery
+
+	Raises:
+	    ValueError: If any of the kinds are invalid
+
+	Returns:
+	    list: The matching objects, in order of relevance
+	"""
+	from helix.database.sql import Manager
+	from helix.database.query import Query
+
+	kinds = list(kinds) if kinds else sorted(KINDS.keys())
+	unknown = [k for k in kinds if k not in KINDS]
+
+	if unknown:
+		raise ValueError('Invalid kind(s): {}. Must be one of: {}'.format(', '.join(unknown), ', '.join(sorted(KINDS.keys()))))
+
+	words = re.findall(r'\w+', text, re.UNICODE)
+
+	if not words:
+		return []
+
+	with Manager(willCommit=False) as mgr:
+		conn = mgr.connection()
+
+		if isAvailable(conn):
+			query = Query('search', ['searchDocs.kind', 'searchDocs.ref'])
+			query.leftJoin('searchDocs', 'searchDocs.rowid=search.rowid')
+
+			# Quoted so nothing the user types is taken as query syntax. Words shorter than a
+			# trigram can't be matched, the index is scanned for those instead
+			match = ' '.join(['"{}"'.format(w) for w in words if len(w) >= 3])
+
+			if match:
+				query.whereRaw('search MATCH ?', match)
+
+			for word in [w for w in words if len(w) < 3]:
+				query.whereRaw('(search.title LIKE ? OR search.body LIKE ? OR search.comments LIKE ?)', *(['%' + word + '%'] * 3))
+
+			query.whereIn('searchDocs.kind', kinds)
+			query.orderBy('search.rank')
+
+			if show is not None:
+				query.where('searchDocs.show', show)
+
+			if under is not None:
+				query.whereStartsWith('searchDocs.ancestry', under)
+
+			if limit is not None:
+				query.limit(limit)
+
+			found = query.execute(conn).fetchall()
+		else:
+			found = _scan(conn, words, show, kinds, under, limit)
+
+	return _objects(found, eager)
+
+def isAvailable(conn):
+	"""Whether the database has the search index, it's only made when SQLite has FTS5"""
+	return _hasTable(conn, 'search')
+
+def _text(conn, kind, prefix):
+	"""Returns:
+	    list: The (search column, SQL) of each piece of text objects of the given kind have, for
+	    	the row whose columns are referred to with the given prefix (i.e. 'new.')
+	"""
+	table, title, body = KINDS[kind]
+	text = [(f, prefix + c) for f, c in (('title', title), ('body', body)) if c]
+
+	# The comments' table is made by a later migration than the index
+	if kind == 'fix' and _hasTable(conn, 'fixComments'):
+		text.append(('comments', COMMENTS.format(prefix + 'id')))
+
+	return text
+
+def _hasTable(conn, name):
+	return conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name=?", (name, )).fetchone()[0] > 0
+
+def _ancestry(kind, prefix):
+	# Published files don't have an ancestry of their own, they're under their element
+	if kind == 'publishedFile':
+		return "(SELECT ancestry || id || '/' FROM elements WHERE id={}elementId)".format(prefix)
+
+	return '{}ancestry'.format(prefix)
+
+def _scan(conn, words, show, kinds, under, limit):
+	"""Without the index, looks for each word anywhere in the searched columns of each table"""
+	from helix.database.query import Query
+
+	found = []
+
+	for kind in kinds:
+		table = KINDS[kind][0]
+		text = _text(conn, kind, table + '.')
+		query = Query(table, ["'{}'".format(kind), 'id'])
+
+		for word in words:
+			query.whereRaw('(' + ' OR '.join(['{} LIKE ?'.format(e) for _, e in text]) + ')', *(['%' + word + '%'] * len(text)))
+
+		if show is not None:
+			query.where('show', show)
+
+		if under is not None:
+			query.whereRaw('{} LIKE ?'.format(_ancestry(kind, table + '.')), under + '%')
+
+		found.extend(query.execute(conn).fetchall())
+
+	return found[:limit] if limit is not None else found
+
+def _objects(found, eager):
+	"""Fetches the objects for the given (kind, id) pairs, one query per kind, in the same order"""
+	from helix.database.query import Query
+	from helix import Element, Fix, PublishedFile
+
+	types = {'element': Element, 'fix': Fix, 'publishedFile': PublishedFile}
+	idsByKind = {}
+	objs = {}
+
+	for kind, ref in found:
+		idsByKind.setdefault(kind, []).append(ref)
+
+	for kind, ids in idsByKind.items():
+		cls = types[kind]
+
+		# A chunk at a time, older SQLite only allows 999 values per query
+		for i in range(0, len(ids), Query.CHUNK_SIZE):
+			for obj in cls.iterQuery(Query(cls.TABLE).whereIn(cls.PK, ids[i:i + Query.CHUNK_SIZE]), eager=eager):
+				objs[(kind, getattr(obj, cls.PK))] = obj
+
+	return [objs[key] for key in found if key in objs]
@@ -1,9 +1,11 @@
 import os
+import collections
 
+from helix.database.database import idProperty
 from helix.database.elementContainer import ElementContainer
 from helix.database.mixins import FixMixin
+from helix.database import lineage, hierarchy
 from helix.database.show import Show
-from helix.database.person import Person
 import helix.environment.environment as env
 from helix.utils.fileutils import SEQUENCE_FORMAT
 
@@ -14,12 +16,15 @@ class Sequence(ElementContainer, FixMixin):
 	def __init__(self, num, show=None, author=None, makeDirs=False, dummy=False):
 		self.table = Sequence.TABLE
 		self.num = num
-		self.show = show if show else env.getEnvironment('show')
+		self.show = show
 		self._exists = None
 
 		if dummy:
 			return
 
+		# Dummies are only unmapped into, so they don't need a show to fall back to
+		self.show = show if show else env.getEnvironment('show')
+
 		if num is None:
 			raise ValueError('Sequence\'s num can\'t be None')
 
@@ -42,7 +47,8 @@ class Sequence(ElementContainer, FixMixin):
 			self.author = author if author else creationInfo[0]
 			self.creation = creationInfo[1]
 
-			s = Show.fromPk(self.show)
+			parents = lineage.resolve(self.show, person=self.author)
+			s = parents.show
 
 			if not s:
 				raise ValueError('No such show: {}'.format(show))
@@ -50,9 +56,7 @@ class Sequence(ElementContainer, FixMixin):
 				self.work_path = os.path.join(s.work_path, self.directory)
 				self.release_path = os.path.join(s.release_path, self.directory)
 
-			p = Person(self.author)
-
-			if not p.exists():
+			if not parents.personExists:
 				raise ValueError('No such user: {}'.format(self.author))
 
 			if makeDirs:
@@ -62,10 +66,9 @@ class Sequence(ElementContainer, FixMixin):
 				if not os.path.isdir(self.release_path):
 					os.makedirs(self.release_path)
 
-	def getElements(self, names=[], types=[], shots=[], clips=[], authors=[], assignedTo=[], status=[], exclusive=False, debug=False):
-		return super(Sequence, self).getElements(
-			shows=self.show,
-			seqs=self.num,
+	def iterElements(self, names=[], types=[], shots=[], clips=[], authors=[], assignedTo=[], status=[], exclusive=False, debug=False, chunkSize=None, records=False, columns=None, limit=None, after=None, eager=False):
+		return super(Sequence, self).iterElements(
+			under=self.subtree,
 			names=names,
 			types=types,
 			shots=shots if not exclusive else 'null',
@@ -73,56 +76,71 @@ class Sequence(ElementContainer, FixMixin):
 			authors=authors,
 			assignedTo=assignedTo,
 			status=status,
-			debug=debug
+			debug=debug,
+			chunkSize=chunkSize,
+			records=records,
+			columns=columns,
+			limit=limit,
+			after=after,
+			eager=eager
 		)
 
-	def getShots(self, nums=[]):
-		from helix.database.sql import Manager
+	def getShots(self, nums=[], columns=None):
+		from helix.database.query import Query
 		from helix.database.shot import Shot
 
-		with Manager(willCommit=False) as mgr:
-			query = """SELECT * FROM {} WHERE show='{}' AND sequenceId='{}'""".format(Shot.TABLE, self.show, self.id)
-
-			if nums is not None:
-				if isinstance(nums, int):
-					nums = [nums]
-				if nums:
-					query += " AND num in ({})".format(','.join(["'{}'".format(n) for n in nums]))
+		query = Query(Shot.TABLE).where('sequenceId', self.id).where('show', self.show).whereIn('num', nums)
 
-			shots = []
+		return list(Shot.iterQuery(query, columns=columns))
 
-			for row in mgr.connection().execute(query).fetchall():
-				shots.append(Shot.dummy().unmap(row))
+	def getStagesByShot(self):
+		"""Gets every shot of this sequence along with its stages in one query, rather than
+		calling Shot.getStages for each shot.
 
-			return shots
+		Returns:
+		    collections.OrderedDict: The stages of each shot (in Stage.STAGES order), keyed
+		    	by the shots in number order. Shots without any stages map to an empty list.
+		"""
+		from helix.database.sql import Manager
+		from helix.database.query import Query
+		from helix import Shot, Stage
 
-	def __str__(self):
-		return 'Sequence ' + str(self.num)
+		query = Query(Shot.TABLE, ['{}.*'.format(Shot.TABLE), '{}.*'.format(Stage.TABLE)])
+		query.leftJoin(Stage.TABLE, '{}.shotId={}.id'.format(Stage.TABLE, Shot.TABLE))
+		query.where('{}.sequenceId'.format(Shot.TABLE), self.id).where('{}.show'.format(Shot.TABLE), self.show)
+		query.orderBy('{}.num'.format(Shot.TABLE), '{}.clipName'.format(Shot.TABLE))
 
-	@property
-	def completion(self):
-		from helix.database.sql import Manager
-		from helix import Fix
+		order = dict((s, i) for i, s in enumerate(Stage.STAGES))
+		stagesByShot = collections.OrderedDict()
 
 		with Manager(willCommit=False) as mgr:
-			query = """SELECT status, COUNT(*) FROM {} WHERE show='{}' and type='task' AND sequenceId='{}' GROUP BY status""".format(Fix.TABLE, self.show, self.id)
-			rows = mgr.connection().execute(query).fetchall()
+			numShotColumns = len(Shot.columns())
+			shotPk = [c for c, _ in Shot.columns()].index(Shot.PK)
+			stagePk = [c for c, _ in Stage.columns()].index(Stage.PK)
+			mapShot = Shot.rowMapper()
+			mapStage = Stage.rowMapper()
+			shot = None
 
-			if rows:
-				done = 0
-				total = 0
+			# Rows of the same shot are next to each other, since they're ordered by shot
+			for row in query.execute(mgr.connection()).fetchall():
+				shotRow, stageRow = row[:numShotColumns], row[numShotColumns:]
 
-				for r in rows:
-					total += r[1] # Add count for this status to total
-					if r[0] == 'done':
-						done += r[1]
+				if shot is None or getattr(shot, Shot.PK) != shotRow[shotPk]:
+					shot = mapShot(shotRow)
+					stagesByShot[shot] = []
 
-				return float(done) / total
-			else:
-				# No tasks at all, 0% completion. Maybe we want no tasks to mean 100% completion?
-				return 0
+				if stageRow[stagePk] is not None: # LEFT JOIN of a shot without stages
+					stagesByShot[shot].append(mapStage(stageRow))
 
-	@property
+		for stages in stagesByShot.values():
+			stages.sort(key=lambda s: order.get(s.stage, len(order)))
+
+		return stagesByShot
+
+	def __str__(self):
+		return 'Sequence ' + str(self.num)
+
+	@idProperty('show', 'num')
 	def id(self):
 		return super(Sequence, self)._id(
 			'{}_{}'.format(
@@ -153,7 +171,16 @@ class Sequence(ElementContainer, FixMixin):
 
 	@property
 	def parent(self):
-		return Show.fromPk(self.show)
+		return self._related(Show, self.show)
+
+	@property
+	def ancestry(self):
+		return hierarchy.path(self.show)
+
+	@property
+	def subtree(self):
+		"""The ancestry of everything under this sequence, see helix.database.hierarchy"""
+		return hierarchy.path(self.show, self.id)
 
 	@property
 	def pk(self):
@@ -1,10 +1,10 @@
 import os
 
+from helix.database.database import idProperty
 from helix.database.elementContainer import ElementContainer
 from helix.database.mixins import FixMixin
-from helix.database.show import Show
+from helix.database import lineage, hierarchy
 from helix.database.sequence import Sequence
-from helix.database.person import Person
 import helix.environment.environment as env
 from helix.utils.fileutils import SHOT_FORMAT
 
@@ -16,7 +16,7 @@ class Shot(ElementContainer, FixMixin):
 		self.table = Shot.TABLE
 		self.num = num
 		self.sequence = sequence
-		self.show = show if show else env.getEnvironment('show')
+		self.show = show
 		self.clipName = clipName
 		self._exists = None
 
@@ -25,6 +25,8 @@ class Shot(ElementContainer, FixMixin):
 		if dummy:
 			return
 
+		self.show = show if show else env.getEnvironment('show')
+
 		if num is None:
 			raise ValueError('Shot\'s num can\'t be None')
 
@@ -60,19 +62,17 @@ class Shot(ElementContainer, FixMixin):
 			self.clipName = clipName
 			self.snapshot = 0
 
-			s = Show.fromPk(self.show)
-			sq = Sequence(self.sequence, show=self.show)
+			parents = lineage.resolve(self.show, sequence=self.sequence, person=self.author)
+			sq = parents.sequence
 
-			if not s:
+			if not parents.show:
 				raise ValueError('No such show: {}'.format(show))
 
-			p = Person(self.author)
-
-			if not p.exists():
+			if not parents.personExists:
 				raise ValueError('No such user: {}'.format(self.author))
 
-			if not sq.exists():
-				raise ValueError('No such sequence {} in show {}'.format(sq.num, sq.show))
+			if not sq:
+				raise ValueError('No such sequence {} in show {}'.format(self.sequence, self.show))
 			else:
 				self.sequenceId = sq.id
 
@@ -86,68 +86,92 @@ class Shot(ElementContainer, FixMixin):
 				if not os.path.isdir(self.release_path):
 					os.makedirs(self.release_path)
 
-	def getElements(self, names=[], types=[], authors=[], assignedTo=[], status=[], exclusive=False, debug=False):
-		return super(Shot, self).getElements(
-			shows=self.show,
-			seqs=self.sequence,
-			shots=self.num,
-			clips=self.clipName if self.clipName else 'null',
+	def iterElements(self, names=[], types=[], authors=[], assignedTo=[], status=[], exclusive=False, debug=False, chunkSize=None, records=False, columns=None, limit=None, after=None, eager=False):
+		return super(Shot, self).iterElements(
+			under=self.subtree,
 			names=names,
 			types=types,
 			authors=authors,
 			assignedTo=assignedTo,
 			status=status,
-			debug=debug
+			debug=debug,
+			chunkSize=chunkSize,
+			records=records,
+			columns=columns,
+			limit=limit,
+			after=after,
+			eager=eager
 		)
 
 	def getLatestSnapshot(self):
 		from helix.database.sql import Manager
+		from helix.database.query import Query
 		from helix import Snapshot
 
+		query = Query(Snapshot.TABLE).where('shotId', self.id).where('show', self.show).orderBy('num DESC').limit(1)
+
 		with Manager(willCommit=False) as mgr:
-			res = mgr.connection().execute(
-				'''
-					SELECT *
-					FROM {table}
-					WHERE num = (SELECT MAX(num) FROM {table} WHERE show='{show}' AND sequenceId='{seq}' AND shotId='{shot}')
-				'''.format(table=Snapshot.TABLE, show=self.show, seq=self.parent.id, shot=self.id)
-			).fetchone()
+			res = query.execute(mgr.connection()).fetchone()
 
 			if res:
-				return Snapshot.dummy().unmap(res)
+				return Snapshot.rowMapper()(res)
 			else:
 				return None
 
 	def addStage(self, stage):
+		return self.addStages([stage])[0]
+
+	def addStages(self, stages):
+		"""Adds all the given stages to this shot at once. Stages that have already
+		been added are skipped.
+
+		Args:
+		    stages (list): The names of the stages to add, see Stage.STAGES
+
+		Returns:
+		    list: Whether each stage was added
+
+		Raises:
+		    ValueError: If any of the stages are invalid. No stages are added.
+		"""
 		from helix import Stage
 
-		if stage.lower() not in Stage.STAGES:
-			raise ValueError('Invalid stage "{}". Must be one of: {}'.format(stage, ', '.join(Stage.STAGES)))
+		for stage in stages:
+			if stage.lower() not in Stage.STAGES:
+				raise ValueError('Invalid stage "{}". Must be one of: {}'.format(stage, ', '.join(Stage.STAGES)))
 
-		stage = Stage(self.id, stage, show=self.show)
+		results = [False] * len(stages)
+		toAdd = []
 
-		if stage.exists():
-			print 'Stage "{}" has already been added for this shot'.format(stage)
-		else:
-			stage.insert()
+		for i, stage in enumerate(stages):
+			stage = Stage(self.id, stage.lower(), show=self.show)
+
+			if stage.exists():
+				print 'Stage "{}" has already been added for this shot'.format(stage)
+			else:
+				toAdd.append((i, stage))
+
+		for (i, _), added in zip(toAdd, Stage.insertMany([s for _, s in toAdd])):
+			results[i] = added
+
+		return results
 
 	def getStages(self):
 		from helix.database.sql import Manager
+		from helix.database.query import Query
 		from helix import Stage
 
-		with Manager(willCommit=False) as mgr:
-			query = """SELECT * FROM {} WHERE shotId='{}'""".format(Stage.TABLE, self.id)
-			stages = []
+		query = Query(Stage.TABLE).where('shotId', self.id)
 
-			for row in mgr.connection().execute(query).fetchall():
-				stages.append(Stage.dummy().unmap(row))
+		with Manager(willCommit=False) as mgr:
+			mapRow = Stage.rowMapper()
 
-			return stages
+			return [mapRow(row) for row in query.execute(mgr.connection()).fetchall()]
 
 	def __str__(self):
 		return 'Shot ' + str(self.num) + (self.clipName if self.clipName else '')
 
-	@property
+	@idProperty('show', 'sequence', 'num', 'clipName')
 	def id(self):
 		return super(Shot, self)._id(
 			'{}_{}_{}_{}'.format(
@@ -183,7 +207,16 @@ class Shot(ElementContainer, FixMixin):
 
 	@property
 	def parent(self):
-		return Sequence.fromPk(self.sequenceId)
+		return self._related(Sequence, self.sequenceId)
+
+	@property
+	def ancestry(self):
+		return hierarchy.path(self.show, self.sequenceId)
+
+	@property
+	def subtree(self):
+		"""The ancestry of everything under this shot, see helix.database.hierarchy"""
+		return hierarchy.path(self.show, self.sequenceId, self.id)
 
 	@property
 	def thumbnail(self):
@@ -10,6 +10,7 @@ import os
 
 from helix.database.elementContainer import ElementContainer
 from helix.database.mixins import FixMixin
+from helix.database import hierarchy
 from helix.database.person import Person
 import helix.environment.environment as env
 import helix.utils.utils as utils
@@ -90,59 +91,26 @@ class Show(ElementContainer, FixMixin):
 			if not os.path.isdir(self.release_path):
 				os.makedirs(self.release_path)
 
-	def getSequences(self, nums=[]):
-		from helix.database.sql import Manager
+	def getSequences(self, nums=[], columns=None):
+		from helix.database.query import Query
 		from helix.database.sequence import Sequence
 
-		with Manager(willCommit=False) as mgr:
-			query = """SELECT * FROM {} WHERE show='{}'""".format(Sequence.TABLE, self.alias)
+		query = Query(Sequence.TABLE).where('show', self.alias).whereIn('num', nums)
 
-			if nums is not None:
-				if isinstance(nums, int):
-					nums = [nums]
-				if nums:
-					query += " AND num in ({})".format(','.join(["'{}'".format(n) for n in nums]))
-
-			seqs = []
-
-			for row in mgr.connection().execute(query).fetchall():
-				seqs.append(Sequence.dummy().unmap(row))
-
-			return seqs
+		return list(Sequence.iterQuery(query, columns=columns))
 
 	def getSequence(self, num):
 		seqs = self.getSequences(nums=[num])
 
 		return seqs[0] if seqs else None
 
-	def getShots(self, seqs=[], nums=[]):
-		from helix.database.sql import Manager
+	def getShots(self, seqs=[], nums=[], columns=None):
+		from helix.database.query import Query
 		from helix.database.shot import Shot
 
-		with Manager(willCommit=False) as mgr:
-			query = """SELECT * FROM {} WHERE show='{}'""".format(
-				Shot.TABLE,
-				self.alias
-			)
-
-			if seqs is not None:
-				if isinstance(seqs, int):
-					seqs = [seqs]
-				if seqs:
-					query += " AND sequence IN ({})".format(','.join(["'{}'".format(n) for n in seqs]))
-
-			if nums is not None:
-				if isinstance(nums, int):
-					nums = [nums]
-				if nums:
-					query += " AND num IN ({})".format(','.join(["'{}'".format(n) for n in nums]))
-
-			shots = []
+		query = Query(Shot.TABLE).where('show', self.alias).whereIn('sequence', seqs).whereIn('num', nums)
 
-			for row in mgr.connection().execute(query).fetchall():
-				shots.append(Shot.dummy().unmap(row))
-
-			return shots
+		return list(Shot.iterQuery(query, columns=columns))
 
 	def getShot(self, seq, num, clipName=None):
 		shots = self.getShots(seqs=[seq], nums=[num])
@@ -153,8 +121,8 @@ class Show(ElementContainer, FixMixin):
 
 		return None
 
-	def getElements(self, names=[], types=[], seqs=[], shots=[], clips=[], authors=[], assignedTo=[], status=[], exclusive=False, debug=False):
-		return super(Show, self).getElements(
+	def iterElements(self, names=[], types=[], seqs=[], shots=[], clips=[], authors=[], assignedTo=[], status=[], exclusive=False, debug=False, chunkSize=None, records=False, columns=None, limit=None, after=None, eager=False):
+		return super(Show, self).iterElements(
 			shows=self.alias,
 			names=names,
 			types=types,
@@ -164,7 +132,13 @@ class Show(ElementContainer, FixMixin):
 			authors=authors,
 			assignedTo=assignedTo,
 			status=status,
-			debug=debug
+			debug=debug,
+			chunkSize=chunkSize,
+			records=records,
+			columns=columns,
+			limit=limit,
+			after=after,
+			eager=eager
 		)
 
 	def __str__(self):
@@ -198,6 +172,15 @@ class Show(ElementContainer, FixMixin):
 	def id(self):
 		return self.alias
 
+	@property
+	def ancestry(self):
+		return hierarchy.path()
+
+	@property
+	def subtree(self):
+		"""The ancestry of everything under this show, see helix.database.hierarchy"""
+		return hierarchy.path(self.alias)
+
 	@property
 	def pk(self):
 		return Show.PK
@@ -1,10 +1,8 @@
 import os
 
-from helix.database.database import DatabaseObject
-from helix.database.show import Show
-from helix.database.sequence import Sequence
+from helix.database.database import DatabaseObject, idProperty
+from helix.database import lineage, hierarchy, counters
 from helix.database.shot import Shot
-from helix.database.person import Person
 import helix.environment.environment as env
 from helix.utils.fileutils import SHOT_FORMAT, SEQUENCE_FORMAT
 
@@ -14,7 +12,7 @@ class Snapshot(DatabaseObject):
 
 	def __init__(self, shot, sequence, show=None, clipName=None, author=None, comment=None, start=None, end=None, makeDirs=False, dummy=False):
 		self.table = Snapshot.TABLE
-		self.show = show if show else env.getEnvironment('show')
+		self.show = show
 		self.sequence = sequence
 		self.shot = shot
 		self._exists = None
@@ -23,46 +21,58 @@ class Snapshot(DatabaseObject):
 		self.shotId = None
 		self.first_frame = start
 		self.last_frame = end
+		self._numTaken = False
+		self._shotDir = None
 
 		if dummy:
 			return
 
+		self.show = show if show else env.getEnvironment('show')
+
 		if not self.show:
 			raise ValueError('Tried to fallback to environment-set show, but it was null.')
 
-		s = Show.fromPk(self.show)
-
-		if not s:
-			raise ValueError('No such show: {}'.format(show))
-
 		if self.sequence is not None:
 			try:
 				self.sequence = int(self.sequence)
 			except ValueError:
 				raise ValueError('Sequence number must be a number, not: {}'.format(self.sequence))
 
-			sq = Sequence(self.sequence, show=self.show)
-
-			if not sq.exists():
-				raise ValueError('No such sequence {} in show {}'.format(sq.num, sq.show))
-			else:
-				self.sequenceId = sq.id
-
 		if self.shot is not None and self.sequence is not None:
 			try:
 				self.shot = int(shot)
 			except ValueError:
 				raise ValueError('Shot number must be a number, not: {}'.format(shot))
 
-			sh = Shot(self.shot, self.sequence, show=self.show, clipName=clipName)
+		author = author if author else env.getCreationInfo(format=False)[0]
+		parents = lineage.resolve(
+			self.show,
+			sequence=self.sequence,
+			shot=self.shot if self.sequence is not None else None,
+			clipName=clipName,
+			person=author
+		)
+
+		if not parents.show:
+			raise ValueError('No such show: {}'.format(show))
+
+		if self.sequence is not None:
+			if not parents.sequence:
+				raise ValueError('No such sequence {} in show {}'.format(self.sequence, self.show))
+			else:
+				self.sequenceId = parents.sequence.id
+
+		if self.shot is not None and self.sequence is not None:
+			sh = parents.shot
 
-			if not sh.exists():
-				raise ValueError('No such shot {} in sequence {} in show {}'.format(sh.num, sh.sequence, sh.show))
+			if not sh:
+				raise ValueError('No such shot {} in sequence {} in show {}'.format(self.shot, self.sequence, self.show))
 			else:
 				self.shotId = sh.id
 				self.first_frame = self.first_frame if self.first_frame else sh.start
 				self.last_frame = self.last_frame if self.last_frame else sh.end
 
+		# Only what's next right now, the number is taken for real by reserveNum() or on insert
 		self.num = Snapshot.nextSnapshotNum(self.show, self.sequenceId, self.shotId)
 
 		fetched = self.exists(fetch=True)
@@ -74,24 +84,56 @@ class Snapshot(DatabaseObject):
 			creationInfo = env.getCreationInfo(format=False)
 
 			self.comment = comment
-			self.author = author if author else creationInfo[0]
+			self.author = author
 			self.creation = creationInfo[1]
 			self.first_frame = start
 			self.last_frame = end
 
-			p = Person(self.author)
-
-			if not p.exists():
+			if not parents.personExists:
 				raise ValueError('No such user: {}'.format(self.author))
 
-			shotDir = Shot.fromPk(self.shotId).release_path
+			self._shotDir = parents.shot.release_path
+			self.file_path = os.path.join(self._shotDir, '.snapshots', str(self.num))
 
-			self.file_path = os.path.join(shotDir, '.snapshots', str(self.num))
+			if makeDirs:
+				self.reserveNum()
 
-			if makeDirs and not os.path.isdir(self.file_path):
-				os.makedirs(self.file_path)
+	def reserveNum(self, makeDirs=True):
+		"""Takes the number of this snapshot ahead of its insert, so the frames can be rendered
+		to its directory before the snapshot is recorded. A snapshot that's never inserted just
+		leaves a gap in the numbers.
 
-	@property
+		Args:
+		    makeDirs (bool, optional): Whether to also make the directory of the snapshot
+
+		Returns:
+		    int: The number of the snapshot
+		"""
+		if self._exists or self._numTaken:
+			return self.num
+
+		from helix.database.sql import transaction
+
+		with transaction() as mgr:
+			self._takeNum(mgr.connection())
+
+		if makeDirs and not os.path.isdir(self.file_path):
+			os.makedirs(self.file_path)
+
+		return self.num
+
+	def _takeNum(self, conn):
+		self.num = counters.take(conn, Snapshot.TABLE, self.show, self.sequenceId, self.shotId)
+		self.file_path = os.path.join(self._shotDir, '.snapshots', str(self.num))
+		self._numTaken = True
+
+	def _beforeInsert(self, conn):
+		# The number from the constructor is only what was next then, take it for real now
+		# unless it was already reserved
+		if not self._exists and not self._numTaken:
+			self._takeNum(conn)
+
+	@idProperty('show', 'sequenceId', 'shotId', 'num')
 	def id(self):
 		return super(Snapshot, self)._id(
 			'{}_{}_{}_{}'.format(
@@ -106,6 +148,11 @@ class Snapshot(DatabaseObject):
 	def pk(self):
 		return Snapshot.PK
 
+	@property
+	def ancestry(self):
+		"""The ids of the show, sequence and shot of this snapshot, see helix.database.hierarchy"""
+		return hierarchy.path(self.show, self.sequenceId, self.shotId)
+
 	@property
 	def imageSequence(self):
 		fileName = '{}_snapshot{}.{}.png'.format(
@@ -138,19 +185,13 @@ class Snapshot(DatabaseObject):
 
 	@staticmethod
 	def nextSnapshotNum(show, sequence, shot):
+		"""The number the next snapshot made of the given shot will most likely get, see
+		helix.database.counters
+		"""
 		from helix.database.sql import Manager
 
 		with Manager(willCommit=False) as mgr:
-			res = mgr.connection().execute(
-				'''
-					SELECT MAX(num) from {} WHERE show='{}' AND sequenceId='{}' AND shotId='{}'
-				'''.format(Snapshot.TABLE, show, sequence, shot)
-			).fetchone()
-
-			if res and res[0]:
-				return int(res[0]) + 1
-			else:
-				return 1
+			return counters.peek(mgr.connection(), Snapshot.TABLE, show, sequence, shot)
 
 	@staticmethod
 	def dummy():
@@ -1,6 +1,12 @@
 import sqlite3
 import os
+import threading
 from helix.utils.fileutils import FileLock, FileLockException
+from helix.database import identity, lineage
+
+# Per-thread state: the read connection we keep open between Managers, and the
+# stack of Managers currently entered (so nested ones can share a connection)
+_local = threading.local()
 
 class Manager(object):
 	TABLE_LIST = [
@@ -12,10 +18,25 @@ class Manager(object):
 					'snapshots',
 					'publishedFiles',
 					'fixes',
+					'fixComments',
+					'counters',
+					'changelog',
 					'people',
 					'permissions'
 				]
 
+	# Seconds a writer will wait on another process' write transaction before giving up
+	BUSY_TIMEOUT = 5
+
+	# (location, table) -> ((column, notNull), ...), see getColumnNames
+	_schemaCache = {}
+	# location -> the PRAGMA schema_version the cache above was filled at
+	_schemaVersions = {}
+	# (DatabaseObject type, columns) -> function, see DatabaseObject.rowMapper
+	_rowMappers = {}
+	# Locations we have already made sure are migrated to the latest schema version
+	_upgraded = set()
+
 	def __init__(self, location=None, willCommit=True):
 		from helix import hxenv
 
@@ -26,40 +47,137 @@ class Manager(object):
 
 		self.willCommit = willCommit
 		self.fileLock = None
+		self.nested = False
 
 	def __enter__(self):
-		if self.willCommit:
-			# Get file lock and connect to its temp file instead
+		from helix import hxenv
+
+		outer = _activeWriter(self.location)
+
+		if outer is not None:
+			# Already inside a write for this database on this thread, join it rather than
+			# opening a second connection (which, for writes, would block on our own lock)
+			self.conn = outer.conn
+			self.nested = True
+		elif self.willCommit and hxenv.cfg.makeTempFile:
+			# Get file lock and connect to its temp file instead. Only necessary when the DB
+			# lives on a share that doesn't support SQLite's own locking (i.e. samba)
 			import tempfile
-			from helix import hxenv
-			tempDir = tempfile.gettempdir() if hxenv.cfg.makeTempFile else None
-			self.fileLock = FileLock(self.location, tempFileDir=tempDir)
+			self.fileLock = FileLock(self.location, tempFileDir=tempfile.gettempdir())
 
 			try:
 				self.fileLock.open()
-				self.conn = sqlite3.connect(self.fileLock.file)
+				self.conn = sqlite3.connect(self.fileLock.file, isolation_level=None)
 			except FileLockException:
 				raise RuntimeError('Database is currently being modified by a different process')
+
+			# Nobody else can see the temp file, no need to lock up front
+			self.conn.execute('BEGIN')
+			Manager._checkSchemaVersion(self.conn, self.location)
+		elif self.willCommit:
+			# Write in place, letting SQLite handle the locking. WAL lets readers continue
+			# while we write, and BEGIN IMMEDIATE takes the write lock up front so that two
+			# writers queue on the busy timeout instead of deadlocking mid-transaction.
+			self.conn = sqlite3.connect(self.location, timeout=Manager.BUSY_TIMEOUT, isolation_level=None)
+			self.conn.execute('PRAGMA journal_mode = WAL')
+			self.conn.execute('PRAGMA busy_timeout = {}'.format(Manager.BUSY_TIMEOUT * 1000))
+
+			try:
+				self.conn.execute('BEGIN IMMEDIATE')
+			except sqlite3.OperationalError:
+				self.conn.close()
+				raise RuntimeError('Database is currently being modified by a different process')
+
+			Manager._checkSchemaVersion(self.conn, self.location)
 		else:
-			self.conn = sqlite3.connect(self.location)
-			self.conn.execute('PRAGMA foreign_keys = ON')
+			self.conn = _readConnection(self.location, checkReplaced=hxenv.cfg.makeTempFile)
+			self.nested = True # Pooled, not ours to close
+
+		if outer is None:
+			self._upgradeSchema()
+
+		_activeStack().append(self)
 
 		return self
 
 	def __exit__(self, exception_type, exception_value, traceback):
+		_activeStack().remove(self)
+
+		if self.nested:
+			return
+
 		if self.willCommit:
-			self.conn.commit()
+			# Pick up any schema changes we made ourselves
+			Manager._checkSchemaVersion(self.conn, self.location)
+
+		if self.willCommit:
+			self.conn.execute('ROLLBACK' if exception_type is not None else 'COMMIT')
+
+			if exception_type is not None:
+				# Objects read inside the transaction may reflect the changes we just undid
+				from helix.environment import permissions
+
+				identity.clear()
+				lineage.invalidate()
+				permissions.invalidate()
 
 		self.conn.close()
 
 		if self.fileLock is not None:
 			self.fileLock.release()
 
+	def _upgradeSchema(self):
+		"""Brings the database up to the latest schema version, checking only the first
+		time we connect to it.
+		"""
+		if self.location in Manager._upgraded:
+			return
+
+		Manager._upgraded.add(self.location)
+
+		from helix.database import migrations
+
+		if not migrations.needsMigration(self.conn):
+			return
+
+		if self.willCommit:
+			migrations.migrate(self.conn)
+		else:
+			with Manager(location=self.location) as mgr:
+				migrations.migrate(mgr.conn)
+
 	def connection(self):
 		return self.conn
 
 	def getColumnNames(self, table):
-		return [(str(r[1]), bool(r[3])) for r in self.conn.execute('PRAGMA TABLE_INFO ({})'.format(table)).fetchall()]
+		key = (self.location, table)
+		columns = Manager._schemaCache.get(key)
+
+		if columns is None:
+			columns = tuple([(str(r[1]), bool(r[3])) for r in self.conn.execute('PRAGMA TABLE_INFO ({})'.format(table)).fetchall()])
+
+			# Don't remember tables that don't exist yet
+			if columns:
+				Manager._schemaCache[key] = columns
+
+		return columns
+
+	@staticmethod
+	def clearSchemaCache(location=None):
+		for key in Manager._schemaCache.keys():
+			if location is None or key[0] == location:
+				del Manager._schemaCache[key]
+
+		# The mappers were made from the cached columns, and aren't kept per location
+		Manager._rowMappers.clear()
+
+	@staticmethod
+	def _checkSchemaVersion(conn, location):
+		version = conn.execute('PRAGMA schema_version').fetchone()[0]
+
+		if Manager._schemaVersions.get(location) != version:
+			Manager.clearSchemaCache(location)
+			Manager._schemaVersions[location] = version
 
 	def _insert(self, table, obj):
 		from helix import DatabaseObject
@@ -80,12 +198,86 @@ class Manager(object):
 
 	def _delete(self, obj):
 		try:
-			self.conn.execute("DELETE FROM {} WHERE {}='{}'".format(obj.table, obj.pk, getattr(obj, obj.pk)))
+			self.conn.execute('DELETE FROM {} WHERE {}=?'.format(obj.table, obj.pk), (getattr(obj, obj.pk), ))
 			return True
 		except sqlite3.IntegrityError as e:
 			print self.formatError(obj, e)
 			return False
 
+	def _insertMany(self, table, objs):
+		"""Inserts many rows into the given table with a single statement. If any row
+		violates a constraint, the batch is undone and retried row by row so that
+		only the offending rows fail.
+
+		Args:
+		    table (str): The table to insert into
+		    objs (list): The DatabaseObjects (or tuples of values) to insert
+
+		Returns:
+		    list: Whether each row was inserted, in the same order as objs
+		"""
+		from helix import DatabaseObject
+
+		rows = [obj.map() if isinstance(obj, DatabaseObject) else obj for obj in objs]
+
+		if not rows:
+			return []
+
+		query = 'INSERT INTO {} VALUES({})'.format(table, ','.join(['?'] * len(rows[0])))
+
+		return self._executeMany(query, objs, rows)
+
+	def _updateMany(self, table, pk, attrs, objs):
+		"""Updates the given attributes of many rows with a single statement, using the
+		values currently set on each object. Like _insertMany, a failing batch is retried
+		row by row.
+
+		Args:
+		    table (str): The table to update
+		    pk (str): The primary key column of the table
+		    attrs (list): The columns to update
+		    objs (list): The DatabaseObjects to update
+
+		Returns:
+		    list: Whether each row was updated, in the same order as objs. Rows that don't
+		    	exist in the DB count as failed.
+		"""
+		rows = [tuple([getattr(obj, a, None) for a in attrs]) + (getattr(obj, pk),) for obj in objs]
+
+		if not rows:
+			return []
+
+		query = 'UPDATE {} SET {} WHERE {}=?'.format(table, ', '.join(['{}=?'.format(a) for a in attrs]), pk)
+
+		return self._executeMany(query, objs, rows)
+
+	def _executeMany(self, query, objs, rows):
+		self.conn.execute('SAVEPOINT executeMany')
+
+		try:
+			cursor = self.conn.executemany(query, rows)
+
+			if cursor.rowcount == len(rows):
+				self.conn.execute('RELEASE executeMany')
+				return [True] * len(rows)
+		except sqlite3.IntegrityError:
+			pass
+
+		self.conn.execute('ROLLBACK TO executeMany')
+		self.conn.execute('RELEASE executeMany')
+
+		# Something in the batch failed, go row by row to find out what
+		results = []
+
+		for obj, values in zip(objs, rows):
+			try:
+				results.append(self.conn.execute(query, values).rowcount == 1)
+			except sqlite3.IntegrityError as e:
+				print self.formatError(obj, e)
+				results.append(False)
+
+		return results
+
 	def formatError(self, obj, e):
 		error = str(e)
 
@@ -196,6 +388,7 @@ class Manager(object):
 				'pubVersion'	INTEGER NOT NULL,
 				'version'		INTEGER NOT NULL,
 				'thumbnail'		TEXT,
+				'ancestry'		TEXT,
 				FOREIGN KEY('show') REFERENCES 'shows'('alias'),
 				FOREIGN KEY('author') REFERENCES 'people'('username'),
 				FOREIGN KEY('shotId') REFERENCES 'shots'('id'),
@@ -243,7 +436,7 @@ class Manager(object):
 				'shot'			INTEGER,
 				'shotId'		VARCHAR(32),
 				'elementId'		VARCHAR(32),
-				'comments'		TEXT,
+				'ancestry'		TEXT,
 				FOREIGN KEY('author') REFERENCES 'people'('username'),
 				FOREIGN KEY('fixer') REFERENCES 'people'('username'),
 				FOREIGN KEY('show') REFERENCES 'shows'('alias'),
@@ -290,6 +483,7 @@ class Manager(object):
 				'last_frame'	INTEGER,
 				'file_path'		TEXT NOT NULL,
 				'thumbnail'		TEXT,
+				'ancestry'		TEXT,
 				FOREIGN KEY('author') REFERENCES 'people'('username'),
 				FOREIGN KEY('show') REFERENCES 'shows'('alias'),
 				FOREIGN KEY('sequenceId') REFERENCES 'sequences'('id'),
@@ -298,7 +492,16 @@ class Manager(object):
 		'''
 		)
 
+		from helix.database import migrations
+		migrations.migrate(self.conn)
+
 	def dropTables(self, tables=TABLE_LIST):
+		from helix.database import migrations
+
+		# Dropped tables lose their indexes etc. too, so start the migrations over
+		# for when initTables remakes them
+		migrations.setVersion(self.conn, 0)
+
 		for t in [t for t in tables if t in Manager.TABLE_LIST]:
 			try:
 				self.conn.execute('DROP TABLE {}'.format(t))
@@ -306,3 +509,89 @@ class Manager(object):
 				import traceback
 				print traceback.format_exc(e)
 				continue
+
+		Manager.clearSchemaCache(self.location)
+
+def transaction(location=None):
+	"""Groups many helix operations into a single unit of work. Every Manager (and so every
+	DatabaseObject read or write) used on this thread inside the block joins the same
+	connection, so they all share one lock and one commit:
+
+		with helix.transaction():
+			for el in show.getElements():
+				el.delete()
+
+	If anything inside raises, none of the database changes are kept. Changes to files on
+	disk (i.e. makeDirs or clean deletes) are not undone.
+
+	Args:
+	    location (str, optional): The database to work on, defaults to the environment's
+
+	Returns:
+	    Manager: The writing Manager to use as a context manager
+	"""
+	return Manager(location=location)
+
+def _activeStack():
+	if not hasattr(_local, 'active'):
+		_local.active = []
+
+	return _local.active
+
+def _activeWriter(location):
+	for mgr in reversed(_activeStack()):
+		if mgr.willCommit and mgr.location == location:
+			return mgr
+
+	return None
+
+def _readConnection(location, checkReplaced=False):
+	"""Gets this thread's read connection to the given database, only connecting if
+	we don't have one open for it already. The pooled connection is swapped out once
+	the database location changes.
+
+	Args:
+	    location (str): Path to the database
+	    checkReplaced (bool, optional): Whether the database file may be replaced
+	    	wholesale by writers (as with the temp file commits). If so, a connection to
+	    	the file that was replaced is discarded.
+
+	Returns:
+	    sqlite3.Connection: The connection
+	"""
+	signature = None
+
+	if checkReplaced:
+		stat = os.stat(location)
+		signature = (stat.st_ino, stat.st_mtime, stat.st_size)
+
+	conn = getattr(_local, 'readConn', None)
+
+	if conn is not None and (_local.readLocation != location or _local.readSignature != signature):
+		# Not closed outright, anything still streaming from the old connection (see
+		# Query.iterate) keeps it alive until it's done with it
+		_local.readConn = conn = None
+
+	if conn is None:
+		conn = sqlite3.connect(location)
+		conn.execute('PRAGMA foreign_keys = ON')
+		Manager._checkSchemaVersion(conn, location)
+
+		_local.readConn = conn
+		_local.readLocation = location
+		_local.readSignature = signature
+
+	return conn
+
+def closeConnections():
+	"""Closes the current thread's pooled read connection, if any. A new one will be
+	made the next time it's needed.
+	"""
+	conn = getattr(_local, 'readConn', None)
+
+	if conn is not None:
+		conn.close()
+
+	_local.readConn = None
+	_local.readLocation = None
+	_local.readSignature = None
@@ -1,4 +1,4 @@
-from helix.database.database import DatabaseObject
+from helix.database.database import DatabaseObject, idProperty
 from helix.database.shot import Shot
 from helix.database.show import Show
 import helix.environment.environment as env
@@ -80,7 +80,7 @@ class Stage(DatabaseObject):
 	def pk(self):
 		return Stage.PK
 
-	@property
+	@idProperty('shotId', 'stage')
 	def id(self):
 		return super(Stage, self)._id(
 			'{}_{}'.format(
@@ -55,7 +55,7 @@ class GeneralConfigHandler(ConfigFileHandler):
 			self.config.add_section('Database')
 			self.config.set('Database', '# This determines if newly encountered users should automatically be added to the database. If not, they will not be able to do anything in the system without being manually added.')
 			self.config.set('Database', 'AutoAddUsers', True)
-			self.config.set('Database', '# When True, a temp file will be made locally for database commits. This is necessary to avoid database locks when the DB is hosted on a samba mounted drive (i.e. network share).')
+			self.config.set('Database', '# When True, a temp file will be made locally for database commits. This is necessary to avoid database locks when the DB is hosted on a samba mounted drive (i.e. network share). When False, commits are made in place using SQLite transactions, which is much faster for large databases.')
 			self.config.set('Database', 'MakeTempFile', False)
 
 			self.config.add_section('Departments')
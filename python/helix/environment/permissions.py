@@ -1,8 +1,16 @@
 import getpass
+import json
 import re
+import time
 from helix.api.exceptions import *
 from helix import DatabaseObject
 
+# Seconds a user's compiled permissions are kept for. Changes made through this process drop
+# them right away, this only bounds how long changes made by other processes take to apply.
+CACHE_TTL = 30
+
+_cache = {}
+
 class PermissionNodes(object):
 	"""An "enum" for all the permission nodes for the system
 	"""
@@ -84,16 +92,13 @@ class PermissionGroup(DatabaseObject):
 
 	@property
 	def perm_nodes(self):
-		return str(self.permissionList).replace("'", '"')
+		return json.dumps(self.permissionList)
 
 	@perm_nodes.setter
 	def perm_nodes(self, perm_nodes):
 		try:
-			if perm_nodes:
-				self.permissionList = eval(perm_nodes)
-			else:
-				self.permissionList = []
-		except:
+			self.permissionList = json.loads(perm_nodes) if perm_nodes else []
+		except ValueError:
 			self.permissionList = []
 
 	@property
@@ -104,83 +109,140 @@ class PermissionGroup(DatabaseObject):
 	def dummy():
 		return PermissionGroup(None, dummy=True)
 
+class CompiledPermissions(object):
+	def __init__(self, nodes):
+		"""Compiles the given permission nodes (i.e. 'helix.*', '^helix.delete.show') into sets
+		of the allowed and negated ones, so that checking a node is a couple of set lookups
+		rather than scans over the list. Each node's outcome is remembered after its first check.
+
+		Args:
+		    nodes (list): The permission nodes of a group
+		"""
+		self.allowed = set([n for n in nodes if not n.startswith('^')])
+		self.denied = set([n[1:] for n in nodes if n.startswith('^')])
+		self.decisions = {}
+
+	def allows(self, node):
+		"""Returns:
+		    bool: Whether the given node is allowed
+		"""
+		decision = self.decisions.get(node)
+
+		if decision is None:
+			decision = self.decisions[node] = self._decide(node)
+
+		return decision
+
+	def _decide(self, node):
+		# Negated nodes override anything else, and exact nodes any wildcards
+		if node in self.denied:
+			return False
+
+		if node in self.allowed:
+			return True
+
+		wildcards = toWildcard(node)
+
+		if any([w in self.denied for w in wildcards]):
+			return False
+
+		return any([w in self.allowed for w in wildcards])
+
 class PermissionHandler(object):
 	def __init__(self):
-		import helix.environment.environment as env
-
 		self.currentUser = getpass.getuser()
+		self.group, self.permNodes, self.compiled = _compiled(self.currentUser)
 
-		from helix import Person
-		user = Person.fromPk(self.currentUser)
+	def check(self, node, silent=False):
+		if self.compiled.allows(node):
+			return True
 
-		if not user:
-			# Add user to DB automatically if we are configured to
-			if env.cfg.autoAddUsers:
-				user = Person(self.currentUser)
-				user.insert()
+		if silent:
+			return False
+		raise PermissionError('You don\'t have permission to do this')
 
-			# User not existing causes other problems down the line...
-			# Should we handle that here? Or do I just silently ignore and put them
-			# in the default group..
-			permGroup = PermissionGroup.fromPk(PermissionGroup.DEFAULT)
-		else:
-			permGroup = user.permGroup
+	def toWildcard(self, node):
+		return toWildcard(node)
 
-			if not permGroup:
-				permGroup = PermissionGroup.fromPk(PermissionGroup.DEFAULT)
+	def group(self):
+		return self.group
 
-		# In circumstances where even the default perm group doesn't exist, we must add it
-		if not permGroup:
-			permGroup = PermissionGroup(PermissionGroup.DEFAULT, permissions=['helix.*'])
-			permGroup.insert()
+class PermissionError(HelixException):
+	pass
 
-		self.group = permGroup.group_name
-		self.permNodes = permGroup.permissionList
+def toWildcard(node):
+	"""Returns:
+	    list: The wildcard nodes that cover the given node, i.e. 'helix.*' and 'helix.create.*'
+	    	for 'helix.create.show'
+	"""
+	permGroups = node.split('.')
+	wildcards = []
 
-	def check(self, node, silent=False):
-		# First check negated node, since that would override anything else
-		if '^' + node in self.permNodes:
-			if silent:
-				return False
-			raise PermissionError('You don\'t have permission to do this')
+	for i in range(0, len(permGroups) - 1):
+		partial = permGroups[0:i+1] + ['*']
 
-		if node in self.permNodes:
-			return True
+		wildcards.append('.'.join(partial))
 
-		wildcards = self.toWildcard(node)
-		negWildcards = ['^' + w for w in wildcards]
+	return wildcards
 
-		# First check negated wildcard nodes
-		for nw in negWildcards:
-			if nw in self.permNodes:
-				if silent:
-					return False
-				raise PermissionError('You don\'t have permission to do this')
+def invalidate(obj=None):
+	"""Drops the compiled permissions, i.e. once the given object was written, if it's a person
+	or permission group (which could change what someone is allowed to do).
+	"""
+	from helix import Person
 
-		for w in wildcards:
-			if w in self.permNodes:
-				return True
+	if obj is None or isinstance(obj, (Person, PermissionGroup)):
+		_cache.clear()
 
-		if silent:
-			return False
-		raise PermissionError('You don\'t have permission to do this')
+def _compiled(username):
+	"""Gets the given user's permission group and its compiled nodes, only going to the DB if
+	they aren't cached (or are older than CACHE_TTL)
 
-	def toWildcard(self, node):
-		permGroups = node.split('.')
-		wildcards = []
+	Returns:
+	    tuple: The group name, its permission nodes, and the CompiledPermissions of them
+	"""
+	import helix.environment.environment as env
 
-		for i in range(0, len(permGroups) - 1):
-			partial = permGroups[0:i+1] + ['*']
+	key = (env.getEnvironment('db'), username)
+	cached = _cache.get(key)
 
-			wildcards.append('.'.join(partial))
+	if cached is not None and time.time() - cached[0] < CACHE_TTL:
+		return cached[1]
 
-		return wildcards
+	group, nodes = _load(username)
+	compiled = (group, nodes, CompiledPermissions(nodes))
+	_cache[key] = (time.time(), compiled)
 
-	def group(self):
-		return self.group
+	return compiled
 
-class PermissionError(HelixException):
-	pass
+def _load(username):
+	import helix.environment.environment as env
+	from helix import Person
+
+	user = Person.fromPk(username)
+
+	if not user:
+		# Add user to DB automatically if we are configured to
+		if env.cfg.autoAddUsers:
+			user = Person(username)
+			user.insert()
+
+		# User not existing causes other problems down the line...
+		# Should we handle that here? Or do I just silently ignore and put them
+		# in the default group..
+		permGroup = PermissionGroup.fromPk(PermissionGroup.DEFAULT)
+	else:
+		permGroup = user.permGroup
+
+		if not permGroup:
+			permGroup = PermissionGroup.fromPk(PermissionGroup.DEFAULT)
+
+	# In circumstances where even the default perm group doesn't exist, we must add it
+	if not permGroup:
+		permGroup = PermissionGroup(PermissionGroup.DEFAULT, permissions=['helix.*'])
+		permGroup.insert()
+
+	return permGroup.group_name, permGroup.permissionList
 
 def permissionCheck(node):
 	_node = node # In case we error
@@ -14,12 +14,15 @@ import helix.utils.utils as utils
 import helix.environment.environment as env
 import helix
 from helix import Show, Element
+from helix.database.database import Pager
 
 import os
 import collections
 
 class ElementNode(Node):
 	MAPPING = ['name', 'type', 'version', 'parent', 'author', 'creation', 'pubVersion']
+	# What the mapping needs from the DB, so the pickers don't load any other columns up front
+	COLUMNS = ['name', 'type', 'version', 'show', 'sequence', 'shot', 'sequenceId', 'shotId', 'author', 'creation', 'pubVersion']
 
 	def __init__(self, element):
 		self._element = element
@@ -102,15 +105,45 @@ class ElementPickerModel(QAbstractItemModel):
 		self.setElements(elements)
 
 	def setElements(self, elements):
+		"""Args:
+		    elements (iterable): The elements to show, or a Pager to only get the first page
+		    	of them now and the rest as the view is scrolled
+		"""
 		self.beginResetModel()
 
 		self._root = Node()
+		self._pager = None
+
+		if isinstance(elements, Pager):
+			self._pager = elements
+			elements = elements.nextPage()
 
 		for el in elements:
 			self._root.addChild(ElementNode(el))
 
 		self.endResetModel()
 
+	def canFetchMore(self, index=QModelIndex()):
+		return not index.isValid() and self._pager is not None and not self._pager.done
+
+	def fetchMore(self, index=QModelIndex()):
+		if index.isValid() or self._pager is None:
+			return
+
+		elements = self._pager.nextPage()
+
+		if not elements:
+			return
+
+		first = self._root.childCount()
+
+		self.beginInsertRows(QModelIndex(), first, first + len(elements) - 1)
+
+		for el in elements:
+			self._root.addChild(ElementNode(el))
+
+		self.endInsertRows()
+
 	def columnCount(self, index):
 		if index.isValid():
 			return index.internalPointer().columnCount()
@@ -402,7 +435,7 @@ class ElementPickerDialog(QDialog):
 		self.buttonLayout.addWidget(self.okButton)
 
 		if not elements:
-			elements = Show.fromPk(env.getEnvironment('show')).getElements()
+			elements = Show.fromPk(env.getEnvironment('show')).iterElements()
 
 		self.elementViewerWidget = ElementViewWidget(elements, mode=mode, parent=self, forcePublished=forcePublished)
 
@@ -461,7 +494,7 @@ class PublishedAssetBrowser(QDialog):
 		if not isinstance(container, ElementContainer):
 			raise ValueError('Container must be of type ElementContainer. Got: {}'.format(container.__class__.__name__))
 
-		self.model = ElementPickerModel([e for e in self.container.getElements() if e.pubVersion != 0], self)
+		self.model = ElementPickerModel(Pager(self.container.getElements, columns=ElementNode.COLUMNS, eager=True, accept=lambda e: e.pubVersion != 0), self)
 		self.proxyModel = ElementSortFilterProxyModel(parent=self)
 
 		self.initUI()
@@ -506,7 +539,7 @@ class PublishedAssetBrowser(QDialog):
 			return
 
 		el = self.proxyModel.mapToSource(current).internalPointer()._element
-		versions = sorted(el.getPublishedFiles(), reverse=True, key=lambda pf: pf.version)
+		versions = sorted(el.getPublishedFiles(records=True), reverse=True, key=lambda pf: pf.version)
 
 		for pf in versions:
 			self.pfMapping['Version {} ({})'.format(pf.version, utils.prettyDate(pf.creation))] = pf
@@ -515,15 +548,16 @@ class PublishedAssetBrowser(QDialog):
 		self.BTN_import.setEnabled(True)
 
 	def handlePfChosen(self):
-		self.selectedPf = self.pfMapping.get(str(self.CMB_versions.currentText()))
+		pf = self.pfMapping.get(str(self.CMB_versions.currentText()))
+		self.selectedPf = pf.toObject() if pf else None
 
 	def handleLimitAssetScope(self):
 		if self.CHK_limitScope.isChecked():
 			# Just this scope's elements (the container)
-			self.model.setElements([e for e in self.container.getElements() if e.pubVersion != 0])
+			self.model.setElements(Pager(self.container.getElements, columns=ElementNode.COLUMNS, eager=True, accept=lambda e: e.pubVersion != 0))
 		else:
 			# Set to show wide elements
-			self.model.setElements([e for e in Show.fromPk(self.container.show).getElements() if e.pubVersion != 0])
+			self.model.setElements(Pager(Show.fromPk(self.container.show).getElements, columns=ElementNode.COLUMNS, eager=True, accept=lambda e: e.pubVersion != 0))
 
 		self.populatePfTypes()
 		self.setupSearchCompleter()
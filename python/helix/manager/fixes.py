@@ -9,10 +9,12 @@ from helix.database.shot import Shot
 from helix.database.element import Element
 from helix.database.person import Person
 from helix.database.database import DatabaseObject
+from helix.database import hierarchy
 import helix.environment.environment as env
 from helix.utils.qtutils import Node
 import helix.utils.utils as utils
 from helix.manager.comment import CommentWidget
+from helix.manager.watcher import LiveModelMixin
 
 from PyQt4.QtCore import *
 from PyQt4.QtGui import *
@@ -305,16 +307,15 @@ class FixView(QWidget):
 		super(FixView, self).__init__(parent)
 		uic.loadUi(os.path.join(helix.root, 'ui', 'fixViewer.ui'), self)
 
-		fixes = db.getAll(Fix)
-
 		self.proxyModel = FixSortFilterProxyModel()
-		self.model = FixViewerModel(fixes)
+		self.model = FixViewerModel(db.Pager(db.getAll, Fix, columns=FixNode.COLUMNS, eager=True))
 
 		self.proxyModel.setSourceModel(self.model)
 		self.TBL_fixes.setModel(self.proxyModel)
 		self.TBL_fixes.setSelectionModel(QItemSelectionModel(self.proxyModel))
 
-		self.sidebarModel = FixesSidebarTreeModel(fixes)
+		# The sidebar needs every fix's target and its parents to build the tree, but nothing else about them
+		self.sidebarModel = FixesSidebarTreeModel(db.getAll(Fix, columns=FixesSidebarTreeModel.COLUMNS, eager=True))
 		self.TREE_sideNav.setModel(self.sidebarModel)
 		self.TREE_sideNav.setAnimated(True)
 
@@ -369,7 +370,7 @@ class FixView(QWidget):
 		ret = fixDialog.exec_()
 
 		if ret == QDialog.Accepted:
-			self.setFixes(db.getAll(Fix))
+			self.setFixes(db.Pager(db.getAll, Fix, columns=FixNode.COLUMNS, eager=True))
 
 	def resetFilter(self):
 		for deptCheck in self.deptChecks:
@@ -476,11 +477,11 @@ class FixSortFilterProxyModel(QSortFilterProxyModel):
 		days = self.sourceModel().data(daysIndex)
 		priority = self.sourceModel().data(priorityIndex)
 		status = self.sourceModel().data(statusIndex)
-		target = None
+		fix = None
 		fixType = self.sourceModel().data(typeIndex)
 
 		if targetIndex.isValid():
-			target = targetIndex.internalPointer()._fix.target
+			fix = targetIndex.internalPointer()._fix
 
 		if dept not in self.departments:
 			return False
@@ -497,13 +498,9 @@ class FixSortFilterProxyModel(QSortFilterProxyModel):
 		if self.status is not None and self.status != status:
 			return False
 
-		if self.target is not None and target is not None:
-			parents = [target] + [target.parent if not isinstance(target, Show) else target]
-
-			while not isinstance(parents[-1], Show):
-				parents.append(parents[-1].parent)
-
-			if self.target not in parents:
+		if self.target is not None and fix is not None:
+			# The fix's ancestry has its target and everything above it, no need to walk up
+			if not hierarchy.isDescendant(fix, self.target):
 				return False
 
 		if self.type is not None and fixType != self.type:
@@ -547,7 +544,8 @@ class FixSortFilterProxyModel(QSortFilterProxyModel):
 		self.status = status
 		self.invalidateFilter()
 
-class FixViewerModel(QAbstractItemModel):
+class FixViewerModel(QAbstractItemModel, LiveModelMixin):
+	TYPE = Fix
 	HEADERS = ['Number', 'Type', 'Priority', 'Show', 'Requested', 'From', 'Assigned To', 'Assigned', 'Department', 'Target', 'Status', 'Due', 'Days Left', 'Bid', 'Subject']
 
 	def __init__(self, fixes, parent=None):
@@ -556,15 +554,70 @@ class FixViewerModel(QAbstractItemModel):
 		self.setFixes(fixes)
 
 	def setFixes(self, fixes):
+		"""Args:
+		    fixes (iterable): The fixes to show, or a Pager to only get the first page of
+		    	them now and the rest as the view is scrolled
+		"""
 		self.beginResetModel()
 
 		self._root = Node()
+		self._pager = None
+
+		if isinstance(fixes, db.Pager):
+			self._pager = fixes
+			fixes = fixes.nextPage()
 
 		for fix in fixes:
 			self._root.addChild(FixNode(fix))
 
 		self.endResetModel()
 
+	def canFetchMore(self, index=QModelIndex()):
+		return not index.isValid() and self._pager is not None and not self._pager.done
+
+	def fetchMore(self, index=QModelIndex()):
+		if index.isValid() or self._pager is None:
+			return
+
+		fixes = self._pager.nextPage()
+
+		if not fixes:
+			return
+
+		first = self._root.childCount()
+
+		self.beginInsertRows(QModelIndex(), first, first + len(fixes) - 1)
+
+		for fix in fixes:
+			self._root.addChild(FixNode(fix))
+
+		self.endInsertRows()
+
+	def fetch(self, query):
+		return Fix.iterQuery(query, columns=FixNode.COLUMNS, eager=True)
+
+	def objectOf(self, node):
+		return node._fix
+
+	def setObjectOf(self, node, fix):
+		node._fix = fix
+
+	def makeNode(self, fix):
+		return FixNode(fix)
+
+	def canInsert(self, fix):
+		if self._pager is None or self._pager.done:
+			return True
+
+		# Ones that sort after the last fix fetched will come with the next pages instead
+		last = self._root.child(self._root.childCount() - 1)
+
+		return last is not None and self.sortKey(fix) < self.sortKey(last._fix)
+
+	def sortKey(self, fix):
+		# The order the pages are fetched in
+		return tuple([getattr(fix, k) for k in Fix.PAGE_KEY])
+
 	def columnCount(self, index):
 		if index.isValid():
 			return index.internalPointer().columnCount()
@@ -633,6 +686,9 @@ class FixViewerModel(QAbstractItemModel):
 		return QModelIndex()
 
 class FixesSidebarTreeModel(QAbstractItemModel):
+	# What Fix.target needs
+	COLUMNS = ['show', 'sequenceId', 'shotId', 'elementId']
+
 	def __init__(self, fixes, parent=None):
 		super(FixesSidebarTreeModel, self).__init__(parent)
 
@@ -649,8 +705,9 @@ class FixesSidebarTreeModel(QAbstractItemModel):
 
 		nodes = {}
 
-		for f in fixes:
-			self.addFixTargetToTree(f.target, nodes)
+		with helix.identityMap():
+			for f in fixes:
+				self.addFixTargetToTree(f.target, nodes)
 
 		self.endResetModel()
 
@@ -758,6 +815,8 @@ class SidebarNode(Node):
 
 class FixNode(Node):
 	MAPPING = ['num', 'type', 'priority', 'show', 'creation', 'author', 'fixer', 'assign_date', 'for_dept', 'target', 'status', 'deadline', 'days', 'bid', 'title']
+	# Everything but the body and comments, which are only needed once a fix is opened
+	COLUMNS = ['num', 'type', 'author', 'creation', 'for_dept', 'fixer', 'fix_date', 'deadline', 'status', 'priority', 'title', 'assign_date', 'show', 'sequence', 'sequenceId', 'shot', 'shotId', 'elementId']
 
 	def __init__(self, fix):
 		self._fix = fix
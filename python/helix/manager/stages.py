@@ -7,6 +7,7 @@ import helix.environment.environment as env
 from helix import Stage, Person
 import helix.utils.utils as utils
 from helix.utils.qtutils import Node
+from helix.manager.watcher import changedPks
 
 from PyQt4.QtCore import *
 from PyQt4.QtGui import *
@@ -18,6 +19,7 @@ class UpdateStageDialog(QDialog):
 		uic.loadUi(os.path.join(helix.root, 'ui', 'updateStages.ui'), self)
 
 		self.shot = shot
+		self.stages = {}
 
 		self.initUI()
 		self.makeConnections()
@@ -36,7 +38,7 @@ class UpdateStageDialog(QDialog):
 		self.LNE_assignee.setCompleter(self.assignedCompleter)
 
 		self.setWindowTitle('Stages for {} in {} ({})'.format(self.shot, self.shot.parent, self.shot.show))
-		self.handleStageChanged()
+		self.refreshStages()
 
 	def makeConnections(self):
 		self.BTN_add.clicked.connect(self.handleAddStage)
@@ -46,12 +48,17 @@ class UpdateStageDialog(QDialog):
 		self.BTN_ok.clicked.connect(self.accept)
 		self.CMB_stages.currentIndexChanged.connect(self.handleStageChanged)
 
+	def refreshStages(self):
+		# Fetch all of the shot's stages up front, rather than looking up each one as it's chosen
+		self.stages = dict([(stg.stage, stg) for stg in self.shot.getStages()])
+		self.handleStageChanged()
+
 	def handleAddStage(self):
 		stage = str(self.CMB_stages.currentText()).lower()
 		stg = Stage(self.shot.id, stage, show=self.shot.show)
 
 		if stg.insert():
-			self.handleStageChanged()
+			self.refreshStages()
 		else:
 			raise ValueError('Something went wrong trying to add this stage')
 
@@ -73,7 +80,7 @@ class UpdateStageDialog(QDialog):
 			else:
 				raise ValueError('Stage does not exist, can\'t remove')
 
-			self.handleStageChanged()
+			self.refreshStages()
 
 	def handleResetStage(self):
 		ret = QMessageBox.warning(
@@ -89,22 +96,23 @@ class UpdateStageDialog(QDialog):
 			stg = Stage(self.shot.id, stage, show=self.shot.show)
 
 			if stg.exists():
-				stg.set('status', Stage.STATUS[0])
-				stg.set('begin_date', None)
-				stg.set('completion_date', None)
+				stg.status = Stage.STATUS[0]
+				stg.begin_date = None
+				stg.completion_date = None
+				Stage.updateMany([stg], ['status', 'begin_date', 'completion_date'])
 			else:
 				raise ValueError('Stage does not exist, can\'t remove')
 
-			self.handleStageChanged()
+			self.refreshStages()
 
 	def handleStageChanged(self):
 		stage = str(self.CMB_stages.currentText()).lower()
-		stg = Stage(self.shot.id, stage, show=self.shot.show)
+		stg = self.stages.get(stage)
 
 		self.LAY_form.removeWidget(self.currStatusWidget)
 		self.currStatusWidget.hide()
 
-		if stg.exists():
+		if stg is not None:
 			self.BTN_add.setEnabled(False)
 			self.BTN_remove.setEnabled(True)
 			self.LNE_assignee.setEnabled(True)
@@ -118,17 +126,17 @@ class UpdateStageDialog(QDialog):
 			self.LAY_form.setWidget(0, QFormLayout.FieldRole, self.LBL_notIn)
 			self.currStatusWidget = self.LBL_notIn
 
-		if stg.begin_date:
+		if stg is not None and stg.begin_date:
 			self.LBL_startDate.setText(utils.prettyDate(stg.begin_date))
 		else:
 			self.LBL_startDate.setText('--')
 
-		if stg.completion_date:
+		if stg is not None and stg.completion_date:
 			self.LBL_endDate.setText(utils.prettyDate(stg.begin_date))
 		else:
 			self.LBL_endDate.setText('--')
 
-		if stg.assigned_to:
+		if stg is not None and stg.assigned_to:
 			self.LNE_assignee.setText(stg.assigned_to)
 		else:
 			self.LNE_assignee.setText('')
@@ -205,12 +213,13 @@ class StageStatusDialog(QDialog):
 		stageCounter = collections.defaultdict(int)
 		shotsStarted = 0
 		shotsDone = 0
-		seqShots = self.sequence.getShots()
+		stagesByShot = self.sequence.getStagesByShot()
+		seqShots = list(stagesByShot.keys())
 
 		for shot in seqShots:
 			started = False
 			done = True
-			for stg in shot.getStages():
+			for stg in stagesByShot[shot]:
 				stageCounter[stg.stage] += 1
 
 				# If we find any stage in the shot that isn't "N/A" or "done", mark the whole shot as IP
@@ -246,7 +255,7 @@ class StageStatusDialog(QDialog):
 					self.WIDG_stats.layout().setWidget(row, QFormLayout.FieldRole, QLabel('%-9s (%.1f%%)' % (shotPortionString, 100 * float(count) / len(seqShots))))
 					row += 1
 
-		self.model = StageStatusModel(seqShots, self)
+		self.model = StageStatusModel(stagesByShot, self, sequence=self.sequence)
 		self.TREE_stages.setModel(self.model)
 
 	def makeConnections(self):
@@ -255,27 +264,126 @@ class StageStatusDialog(QDialog):
 class StageStatusModel(QAbstractItemModel):
 	HEADERS = ['', 'Status', 'Assignee', 'Started', 'Completed']
 
-	def __init__(self, shots, parent=None):
+	def __init__(self, stagesByShot, parent=None, sequence=None):
 		super(StageStatusModel, self).__init__(parent)
 
-		self.setShots(shots)
+		self.setStages(stagesByShot, sequence=sequence)
+
+	def setStages(self, stagesByShot, sequence=None):
+		"""Rebuilds the model
 
-	def setShots(self, shots):
+		Args:
+		    stagesByShot (collections.OrderedDict): The stages of each shot, already in order,
+		    	see Sequence.getStagesByShot
+		    sequence (Sequence, optional): The sequence the shots are in, new shots of it are
+		    	added as they're made (see applyChanges)
+		"""
 		self.beginResetModel()
 
 		self._root = Node()
+		self.sequence = sequence
 
-		for shot in shots:
-			shotNode = Node(str(shot), defaultVal='')
-			self._root.addChild(shotNode)
-
-			stages = sorted(shot.getStages(), key=lambda c: Stage.STAGES.index(c.stage))
+		for shot, stages in stagesByShot.items():
+			shotNode = self._root.addChild(StageStatusModel._shotNode(shot))
 
 			for stg in stages:
 				shotNode.addChild(StageNode(stg))
 
 		self.endResetModel()
 
+	def applyChanges(self, changes):
+		"""Applies the changes from a ChangeWatcher to only the shots and stages they affect,
+		the same way helix.manager.watcher.LiveModelMixin does for models without children
+
+		Args:
+		    changes (list): The helix.database.changes.Change made
+		"""
+		from helix import Shot
+
+		if self.sequence is None:
+			return
+
+		shotNodes = dict([(self._root.child(r).shot.id, self._root.child(r)) for r in range(self._root.childCount())])
+
+		for pk in changedPks(changes, Shot.TABLE):
+			shot = Shot.fromPk(pk)
+			node = shotNodes.get(pk)
+
+			if shot is not None and shot.sequenceId != self.sequence.id:
+				shot = None
+
+			if shot is None:
+				if node is not None:
+					self.beginRemoveRows(QModelIndex(), node.row(), node.row())
+					self._root.removeChild(node.row())
+					self.endRemoveRows()
+
+					del shotNodes[pk]
+			elif node is None:
+				shotNodes[pk] = self._insertNode(self._root, StageStatusModel._shotNode(shot), lambda n: (n.shot.num, n.shot.clipName))
+			else:
+				node.shot = shot
+				node._data[0] = str(shot)
+				self._nodeChanged(node)
+
+		order = dict((s, i) for i, s in enumerate(Stage.STAGES))
+		stageNodes = dict([(n._stage.id, n) for shotNode in shotNodes.values() for n in shotNode._children])
+
+		for pk in changedPks(changes, Stage.TABLE):
+			stage = Stage.fromPk(pk)
+			node = stageNodes.get(pk)
+			shotNode = shotNodes.get(stage.shotId) if stage is not None else None
+
+			if node is not None and node.parent() is not shotNode:
+				# Deleted (or no longer in a shot that's shown)
+				self.beginRemoveRows(self._indexOf(node.parent()), node.row(), node.row())
+				node.parent().removeChild(node.row())
+				self.endRemoveRows()
+
+				node = None
+
+			if shotNode is None:
+				continue
+
+			if node is None:
+				self._insertNode(shotNode, StageNode(stage), lambda n: order.get(n._stage.stage, len(order)))
+			else:
+				node._stage = stage
+				self._nodeChanged(node)
+
+	@staticmethod
+	def _shotNode(shot):
+		node = Node(str(shot), defaultVal='')
+		node.shot = shot
+
+		return node
+
+	def _indexOf(self, node):
+		if node is self._root:
+			return QModelIndex()
+
+		return self.createIndex(node.row(), 0, node)
+
+	def _insertNode(self, parent, node, key):
+		"""Inserts the given node under the given parent before the first child with a
+		greater key, signalling the views
+		"""
+		row = parent.childCount()
+
+		for i in range(parent.childCount()):
+			if key(parent.child(i)) > key(node):
+				row = i
+				break
+
+		self.beginInsertRows(self._indexOf(parent), row, row)
+		parent.insertChild(row, node)
+		self.endInsertRows()
+
+		return node
+
+	def _nodeChanged(self, node):
+		self.dataChanged.emit(self._indexOf(node), self.createIndex(node.row(), len(StageNode.MAPPING) - 1, node))
+
 	def headerData(self, section, orientation, role=Qt.DisplayRole):
 		if orientation == Qt.Horizontal and role == Qt.DisplayRole:
 			if section >= 0 and section < len(StageStatusModel.HEADERS):
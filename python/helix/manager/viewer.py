@@ -2,7 +2,7 @@ import os, sys
 from datetime import datetime
 
 import helix
-from helix import Show, Sequence, Shot, Element, Stage
+from helix import Show, Sequence, Shot, Element, Stage, Person
 import helix.database.database as db
 import helix.api.commands as hxcmds
 import helix.environment.environment as env
@@ -11,9 +11,10 @@ import helix.utils.fileutils as fileutils
 from helix.manager.dailies import SlapCompDialog
 from helix.manager.config import ConfigEditorDialog
 from helix.manager.console import Console
-from helix.manager.element import ElementViewWidget, ElementPickerDialog, PickMode
+from helix.manager.element import ElementViewWidget, ElementPickerDialog, PickMode, ElementNode
 from helix.manager.fixes import FixDialog, FixView
 from helix.manager.stages import UpdateStageDialog, StageStatusDialog
+from helix.manager.watcher import ChangeWatcher, LiveModelMixin, changedPks
 from helix.utils.qtutils import Node, ExceptionDialog, FileChooserLayout, ElementListWidgetItem, Operation
 import helix.utils.utils as utils
 
@@ -151,14 +152,17 @@ class HierarchyModel(QAbstractItemModel):
 
 		return QModelIndex()
 
-class ShotModel(HierarchyModel):
+class ShotModel(HierarchyModel, LiveModelMixin):
+	TYPE = Shot
+
 	def __init__(self, seq=None, parent=None):
 		super(ShotModel, self).__init__(parent)
 
 		self.thumbnailCache = {}
+		self.sequence = None
 
 		if seq:
-			self.setShots(seq.getShots())
+			self.setShots(seq.getShots(), sequence=seq)
 
 	def data(self, index, role):
 		if not index.isValid():
@@ -182,11 +186,17 @@ class ShotModel(HierarchyModel):
 
 		return super(ShotModel, self).data(index, role)
 
-	def setShots(self, shots):
+	def setShots(self, shots, sequence=None):
+		"""Args:
+		    shots (list): The shots to show
+		    sequence (Sequence, optional): The sequence they're the shots of, new shots of it
+		    	are added as they're made (see applyChanges)
+		"""
 		self.beginResetModel()
 
 		self._root = Node()
 		self.thumbnailCache = {}
+		self.sequence = sequence
 
 		if shots:
 			shots.sort(key=lambda s: s.num)
@@ -196,16 +206,32 @@ class ShotModel(HierarchyModel):
 
 		self.endResetModel()
 
+	def setObjectOf(self, node, shot):
+		# The thumbnail may have changed along with it
+		self.thumbnailCache.pop(shot.id, None)
+
+		super(ShotModel, self).setObjectOf(node, shot)
+
+	def belongs(self, shot):
+		return self.sequence is not None and shot.sequenceId == self.sequence.id
+
+	def sortKey(self, shot):
+		return shot.num
+
 	def headerData(self, section, orientation, role=Qt.DisplayRole):
 		if orientation == Qt.Horizontal and role == Qt.DisplayRole:
 			return 'Shots'
 
-class SequenceModel(HierarchyModel):
+class SequenceModel(HierarchyModel, LiveModelMixin):
+	TYPE = Sequence
+
 	def __init__(self, show=None, parent=None):
 		super(SequenceModel, self).__init__(parent)
 
+		self.show = None
+
 		if show:
-			self.setSequences(show.getSequences())
+			self.setSequences(show.getSequences(), show=show)
 
 	def data(self, index, role):
 		if not index.isValid():
@@ -223,10 +249,16 @@ class SequenceModel(HierarchyModel):
 
 		return super(SequenceModel, self).data(index, role)
 
-	def setSequences(self, sequences):
+	def setSequences(self, sequences, show=None):
+		"""Args:
+		    sequences (list): The sequences to show
+		    show (Show, optional): The show they're the sequences of, new sequences of it are
+		    	added as they're made (see applyChanges)
+		"""
 		self.beginResetModel()
 
 		self._root = Node()
+		self.show = show
 
 		if sequences:
 			sequences.sort(key=lambda s: s.num)
@@ -236,11 +268,26 @@ class SequenceModel(HierarchyModel):
 
 		self.endResetModel()
 
+	def applyChanges(self, changes):
+		super(SequenceModel, self).applyChanges(changes)
+
+		# Sequences without any shots are shown in red, which may no longer be the case
+		if self._root.childCount() and any([c.table == Shot.TABLE for c in changes]):
+			self.dataChanged.emit(self.index(0, 0), self.index(self._root.childCount() - 1, 0))
+
+	def belongs(self, seq):
+		return self.show is not None and seq.show == self.show.alias
+
+	def sortKey(self, seq):
+		return seq.num
+
 	def headerData(self, section, orientation, role=Qt.DisplayRole):
 		if orientation == Qt.Horizontal and role == Qt.DisplayRole:
 			return 'Sequences'
 
-class ShowModel(HierarchyModel):
+class ShowModel(HierarchyModel, LiveModelMixin):
+	TYPE = Show
+
 	def __init__(self, shows=None, parent=None):
 		super(ShowModel, self).__init__(parent)
 
@@ -269,6 +316,9 @@ class ShowModel(HierarchyModel):
 
 		self.endResetModel()
 
+	def sortKey(self, show):
+		return show.alias
+
 	def headerData(self, section, orientation, role=Qt.DisplayRole):
 		if orientation == Qt.Horizontal and role == Qt.DisplayRole:
 			return 'Shows'
@@ -569,13 +619,12 @@ class NewSequenceDialog(QDialog):
 		self._show = show
 
 		from helix.database.sql import Manager
+		from helix.database.query import Query
+
+		query = Query(Sequence.TABLE, ['MAX(num)']).where('show', self._show)
+
 		with Manager(willCommit=False) as mgr:
-			row = mgr.connection().execute(
-				"SELECT MAX(num) FROM {} WHERE show='{}'".format(
-					Sequence.TABLE,
-					self._show
-				)
-			).fetchone()
+			row = query.execute(mgr.connection()).fetchone()
 
 		self.SPN_num.setValue(row[0] + 100 if row and row[0] is not None else 100)
 		self.LBL_show.setText(str(self._show))
@@ -592,7 +641,8 @@ class NewSequenceDialog(QDialog):
 		result = console.inject(['mkseq', str(seqNum)])
 
 		if result:
-			self.parent().handleDBReload()
+			# The new row shows up on its own, no need to reload everything
+			self.parent().watcher.wake()
 			super(NewSequenceDialog, self).accept()
 
 class NewShotDialog(QDialog):
@@ -619,14 +669,12 @@ class NewShotDialog(QDialog):
 		self._seq = seq
 
 		from helix.database.sql import Manager
+		from helix.database.query import Query
+
+		query = Query(Shot.TABLE, ['MAX(num)']).where('show', self._show).where('sequence', self._seq)
+
 		with Manager(willCommit=False) as mgr:
-			row = mgr.connection().execute(
-				"SELECT MAX(num) FROM {} WHERE show='{}' and sequence='{}'".format(
-					Shot.TABLE,
-					self._show,
-					self._seq
-				)
-			).fetchone()
+			row = query.execute(mgr.connection()).fetchone()
 
 		self.SPN_num.setValue(row[0] + 100 if row and row[0] is not None else 100)
 		self.LBL_show.setText(str(self._show))
@@ -675,7 +723,8 @@ class NewShotDialog(QDialog):
 		result = console.inject(cmd)
 
 		if result:
-			self.parent().handleDBReload()
+			# The new row shows up on its own, no need to reload everything
+			self.parent().watcher.wake()
 			super(NewShotDialog, self).accept()
 
 	def getInputs(self):
@@ -907,7 +956,7 @@ class ImportElementDialog(QDialog):
 		self.folderLayout.fileChosen.connect(self.handleFileChosen)
 
 	def handleElementBrowse(self):
-		dialog = ElementPickerDialog(db.getElements(), parent=self)
+		dialog = ElementPickerDialog(db.iterElements(), parent=self)
 
 		dialog.exec_()
 
@@ -1063,7 +1112,7 @@ class ExportDialog(QDialog):
 		self.BTN_export.setEnabled(os.path.exists(self.folderLayout.getFile()))
 
 	def handleElementBrowse(self):
-		dialog = ElementPickerDialog(db.getElements(), parent=self, mode=PickMode.MULTI)
+		dialog = ElementPickerDialog(db.iterElements(), parent=self, mode=PickMode.MULTI)
 
 		dialog.exec_()
 
@@ -1111,12 +1160,20 @@ class ExportDialog(QDialog):
 		super(ExportDialog, self).accept()
 
 class FindDialog(QDialog):
+	SEARCH_DELAY = 250 # ms to wait for more typing before searching
+
 	def __init__(self, parent):
 		super(FindDialog, self).__init__(parent)
 
+		self.searchTimer = QTimer(self)
+		self.searchTimer.setSingleShot(True)
+		self.searchTimer.setInterval(FindDialog.SEARCH_DELAY)
+
 	def makeConnections(self):
 		self.BTN_cancel.clicked.connect(self.reject)
 		self.BTN_find.clicked.connect(self.handleFind)
+		self.LNE_string.textChanged.connect(self.searchTimer.start)
+		self.searchTimer.timeout.connect(self.handleFind)
 		self.CMB_show.currentIndexChanged.connect(self.populateSeqAndShot)
 		self.CMB_seq.currentIndexChanged.connect(self.populateShots)
 
@@ -1135,34 +1192,21 @@ class FindDialog(QDialog):
 		self.shot = None if self.CMB_shot.currentText() == 'any' else str(self.CMB_shot.currentText())
 
 	def filterElements(self, element):
-		if self.string:
-			if self.strOption == 0: # contains
-				if self.string not in element.name:
-					return False
-			elif self.strOption == 1: # starts with
-				if not element.name.startswith(self.string):
-					return False
-			elif self.strOption == 2: # ends with
-				if not element.name.endswith(self.string):
-					return False
+		# The search matches its words in the type too, and in any order, only the name counts here
+		if self.strOption == 0: # contains
+			if self.string.lower() not in element.name.lower():
+				return False
+		elif self.strOption == 1: # starts with
+			if not element.name.lower().startswith(self.string.lower()):
+				return False
+		elif self.strOption == 2: # ends with
+			if not element.name.lower().endswith(self.string.lower()):
+				return False
 
 		if self.elType and self.elType != element.type:
 			return False
 
-		elParent = element.get('parent')
-
-		if not elParent and (self.seq or self.shot): # If parent is a show, but the user specified a seq or shot, we bail
-			return False
-
-		if not elParent and not self.seq and not self.shot:
-			return True
-
-		seq, shot = elParent.split('/')
-
-		if seq and self.seq and seq != self.seq:
-			return False
-
-		if shot and self.shot and shot != self.shot:
+		if self.shot and str(element.shot) != self.shot:
 			return False
 
 		return True
@@ -1207,32 +1251,26 @@ class FindDialog(QDialog):
 		QCoreApplication.instance().setOverrideCursor(QCursor(Qt.WaitCursor))
 		self.storeOptions()
 
-		likeNamePattern = self.string
-
-		if self.strOption == 0:
-			likeNamePattern = '%' + likeNamePattern + '%'
-		elif self.strOption == 1:
-			likeNamePattern = likeNamePattern + '%'
-		elif self.strOption == 2:
-			likeNamePattern = '%' + likeNamePattern
-
-		query = """SELECT * FROM {} WHERE show='{}' AND name LIKE '{}'""".format(Element.TABLE, self._show.alias, likeNamePattern)
+		# Each row shows the element's parent, so get them all in the same query
+		if self.string:
+			under = Sequence(int(self.seq), show=self._show.alias, dummy=True).subtree if self.seq else None
+			elements = helix.search(self.string, show=self._show.alias, kinds=['element'], under=under, eager=True)
+			elements = [el for el in elements if self.filterElements(el)]
+		else:
+			from helix.database.query import Query
 
-		if self.elType:
-			query += "AND type='{}'".format(self.elType)
+			query = Query(Element.TABLE).where('show', self._show.alias)
 
-		if self.seq:
-			query += "AND sequence='{}'".format(self.seq)
+			if self.elType:
+				query.where('type', self.elType)
 
-		if self.shot:
-			query += "AND shot='{}'".format(self.shot)
+			if self.seq:
+				query.where('sequence', self.seq)
 
-		elements = []
+			if self.shot:
+				query.where('shot', self.shot)
 
-		from helix.database.sql import Manager
-		with Manager(willCommit=False) as mgr:
-			for row in mgr.connection().execute(query).fetchall():
-					elements.append(Element.dummy().unmap(row))
+			elements = list(Element.iterQuery(query, eager=True))
 
 		self.TBL_found.clearContents()
 		self.TBL_found.setRowCount(0)
@@ -1306,6 +1344,9 @@ class ManagerWindow(QMainWindow):
 		uic.loadUi(os.path.join(helix.root, 'ui', 'find.ui'), self.findDialog)
 		self.findDialog.makeConnections()
 
+		# Picks up changes made by anyone to what's showing, see handleDBChanges
+		self.watcher = ChangeWatcher(self)
+
 		self.makeConnections()
 		self.setAcceptDrops(True)
 
@@ -1313,6 +1354,7 @@ class ManagerWindow(QMainWindow):
 			self.handleOpenDB(dbLoc=dbPath)
 
 		self.configureUiForPerms()
+		self.watcher.start()
 
 	def restoreSettings(self, version=0):
 		settings = QSettings()
@@ -1361,6 +1403,7 @@ class ManagerWindow(QMainWindow):
 
 	def closeEvent(self, event):
 		self.saveSettings()
+		self.watcher.stop()
 
 		super(ManagerWindow, self).closeEvent(event)
 
@@ -1408,6 +1451,8 @@ class ManagerWindow(QMainWindow):
 	def makeConnections(self):
 		self.ACT_openDB.triggered.connect(self.handleOpenDB)
 		self.ACT_reload.triggered.connect(self.handleDBReload)
+		self.watcher.changed.connect(self.handleDBChanges)
+		self.watcher.reloadNeeded.connect(self.handleDBReload)
 		self.ACT_newShow.triggered.connect(self.handleNewShow)
 		self.ACT_newSeq.triggered.connect(self.handleNewSequence)
 		self.ACT_newShot.triggered.connect(self.handleNewShot)
@@ -1641,7 +1686,9 @@ class ManagerWindow(QMainWindow):
 			fv.setDepartment(dept)
 
 		dock = fv.asDockable()
+		dock.setAttribute(Qt.WA_DeleteOnClose)
 		dock.setFloating(True)
+		self.followChanges(fv.model, dock.destroyed)
 		dock.show()
 
 	def handleDelete(self):
@@ -1739,7 +1786,10 @@ class ManagerWindow(QMainWindow):
 		if not isinstance(idx.internalPointer().data(0), Sequence):
 			raise RuntimeError('Could not obtain sequence from selection, but stage status was queried')
 
-		StageStatusDialog(self, idx.internalPointer().data(0)).show()
+		dialog = StageStatusDialog(self, idx.internalPointer().data(0))
+		dialog.setAttribute(Qt.WA_DeleteOnClose)
+		self.followChanges(dialog.model, dialog.finished)
+		dialog.show()
 
 	def buildContextMenu(self, obj):
 		self.MENU_contextMenu.clear()
@@ -1833,11 +1883,11 @@ class ManagerWindow(QMainWindow):
 			QApplication.instance().restoreOverrideCursor()
 			return
 
-		self.seqModel.setSequences(container.getSequences())
+		self.seqModel.setSequences(container.getSequences(), show=container)
 		self.shotModel.setShots(None)
 
 		if self.globalElViewer:
-			self.globalElViewer.widget().setElements(container.getElements())
+			self.globalElViewer.widget().setElements(db.Pager(container.getElements, columns=ElementNode.COLUMNS, eager=True))
 
 		self.elementList.setContainer(container)
 		QApplication.instance().restoreOverrideCursor()
@@ -1855,7 +1905,7 @@ class ManagerWindow(QMainWindow):
 			return self.handleShowSelected()
 
 		container = idx.internalPointer().data(0)
-		self.shotModel.setShots(container.getShots())
+		self.shotModel.setShots(container.getShots(), sequence=container)
 
 		self.elementList.setContainer(container)
 		QApplication.instance().restoreOverrideCursor()
@@ -1914,6 +1964,30 @@ class ManagerWindow(QMainWindow):
 		self.permHandler = perms.PermissionHandler()
 		QCoreApplication.instance().restoreOverrideCursor()
 
+	def handleDBChanges(self, changes):
+		# Someone's group (or what a group allows) was changed elsewhere, don't wait for the
+		# compiled permissions to expire
+		if changedPks(changes, Person.TABLE) or changedPks(changes, perms.PermissionGroup.TABLE):
+			perms.invalidate()
+			self.permHandler = perms.PermissionHandler()
+
+		self.showModel.applyChanges(changes)
+		self.seqModel.applyChanges(changes)
+		self.shotModel.applyChanges(changes)
+
+	def followChanges(self, model, until):
+		"""Keeps the model of a window opened from here up to date with the watcher's changes,
+		until the given signal of the window says it's gone (i.e. a dialog's finished)
+		"""
+		self.watcher.changed.connect(model.applyChanges)
+		until.connect(lambda *args: self._unfollowChanges(model))
+
+	def _unfollowChanges(self, model):
+		try:
+			self.watcher.changed.disconnect(model.applyChanges)
+		except (TypeError, RuntimeError):
+			pass # Already disconnected, or the watcher went first as the whole manager closes
+
 	def handleAbout(self):
 		dialog = QDialog(self)
 
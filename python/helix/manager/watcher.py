@@ -0,0 +1,199 @@
+"""Keeps the manager's models up to date with changes other artists (or other windows) make to
+the database, without reloading them. A ChangeWatcher polls the change feed (see
+helix.database.changes) in the background and hands what changed to the models, which only
+touch the rows it affects:
+
+	self.watcher = ChangeWatcher(self)
+	self.watcher.changed.connect(self.showModel.applyChanges)
+	self.watcher.start()
+"""
+import os
+import threading
+import collections
+
+from helix.utils.qtutils import Node
+
+from PyQt4.QtCore import *
+
+class ChangeWatcher(QThread):
+	# The list of helix.database.changes.Change made since the last time, oldest first
+	changed = pyqtSignal(object)
+	# The watcher fell too far behind the change feed, everything has to be reloaded
+	reloadNeeded = pyqtSignal()
+
+	INTERVAL = 1.0 # Seconds between polls
+
+	def __init__(self, parent=None, interval=None):
+		super(ChangeWatcher, self).__init__(parent)
+
+		self.interval = interval if interval is not None else ChangeWatcher.INTERVAL
+		self._wake = threading.Event()
+		self._stopped = False
+
+	def run(self):
+		import sqlite3
+		import helix.environment.environment as env
+		from helix.database.changes import ChangeFeed
+
+		feed = None
+		location = None
+
+		while not self._stopped:
+			try:
+				current = env.getEnvironment('db')
+
+				# Connecting would make an empty database where there's none
+				if not current or not os.path.exists(current):
+					feed = None
+				elif feed is None or current != location:
+					# Only changes made from now on, whatever is showing was just loaded
+					feed = ChangeFeed()
+					location = current
+				else:
+					changes = feed.poll()
+
+					if changes is None:
+						self.reloadNeeded.emit()
+					elif changes:
+						self.changed.emit(changes)
+			except (sqlite3.Error, RuntimeError):
+				pass # Locked or being replaced, try again next time
+
+			self._wake.wait(self.interval)
+			self._wake.clear()
+
+	def wake(self):
+		"""Polls right away rather than at the next interval, i.e. right after making changes"""
+		self._wake.set()
+
+	def stop(self):
+		"""Stops polling, waiting for the thread to finish"""
+		self._stopped = True
+		self._wake.set()
+		self.wait()
+
+def changedPks(changes, table):
+	"""Returns:
+	    list: The pks of the rows of the given table that the changes are for, each only
+	    	once, in the order they were first changed
+	"""
+	return list(collections.OrderedDict.fromkeys([c.pk for c in changes if c.table == table]))
+
+class LiveModelMixin(object):
+	"""For models with a row under their root for each DatabaseObject of one type (TYPE).
+	applyChanges refetches the objects that changed: rows of ones that were edited are
+	updated in place, new ones are inserted where they sort and deleted ones are removed.
+	Unlike resetting the model, views keep their selection, scroll position and expanded
+	items.
+	"""
+	TYPE = None
+
+	def applyChanges(self, changes):
+		"""Args:
+		    changes (list): The helix.database.changes.Change made, see ChangeWatcher.changed
+		"""
+		pks = changedPks(changes, self.TYPE.TABLE)
+
+		if not pks:
+			return
+
+		fetched = self._fetch(pks)
+		nodes = {}
+
+		for row in range(self._root.childCount()):
+			node = self._root.child(row)
+			nodes[getattr(self.objectOf(node), self.TYPE.PK)] = node
+
+		lastCol = max(self.columnCount(QModelIndex()) - 1, 0)
+
+		for pk in pks:
+			obj = fetched.get(pk)
+			node = nodes.get(pk)
+
+			if obj is not None and not self.belongs(obj):
+				obj = None
+
+			if obj is None:
+				if node is not None:
+					self.beginRemoveRows(QModelIndex(), node.row(), node.row())
+					self._root.removeChild(node.row())
+					self.endRemoveRows()
+
+					del nodes[pk]
+			elif node is None:
+				if self.canInsert(obj):
+					row = self._insertionRow(obj)
+
+					self.beginInsertRows(QModelIndex(), row, row)
+					nodes[pk] = self._root.insertChild(row, self.makeNode(obj))
+					self.endInsertRows()
+			else:
+				# Same node, so indexes (and selections) of the row stay valid
+				self.setObjectOf(node, obj)
+				self.dataChanged.emit(self.index(node.row(), 0), self.index(node.row(), lastCol))
+
+	def fetch(self, query):
+		"""Fetches the changed objects, the same way the model's objects were loaded
+
+		Args:
+		    query (helix.database.query.Query): The query for them, on TYPE's table
+
+		Returns:
+		    iterable: The objects
+		"""
+		return self.TYPE.iterQuery(query)
+
+	def objectOf(self, node):
+		return node.data(0)
+
+	def setObjectOf(self, node, obj):
+		node._data[0] = obj
+
+	def makeNode(self, obj):
+		return Node(obj)
+
+	def belongs(self, obj):
+		"""Whether the given object should be shown by this model at all, i.e. is in the
+		sequence it shows the shots of
+		"""
+		return True
+
+	def canInsert(self, obj):
+		"""Whether a row should be added for the given new object, if it belongs"""
+		return self.belongs(obj)
+
+	def sortKey(self, obj):
+		"""What rows are ordered by, new rows are inserted before the first row whose key is
+		greater. None to always add them at the end.
+		"""
+		return None
+
+	def _insertionRow(self, obj):
+		key = self.sortKey(obj)
+		count = self._root.childCount()
+
+		if key is None:
+			return count
+
+		for row in range(count):
+			if self.sortKey(self.objectOf(self._root.child(row))) > key:
+				return row
+
+		return count
+
+	def _fetch(self, pks):
+		"""Returns:
+		    dict: The objects with the given pks that still exist, by pk
+		"""
+		from helix.database.query import Query
+
+		objs = {}
+
+		# A chunk at a time, older SQLite only allows 999 values per query
+		for i in range(0, len(pks), Query.CHUNK_SIZE):
+			query = Query(self.TYPE.TABLE).whereIn(self.TYPE.PK, pks[i:i + Query.CHUNK_SIZE])
+
+			for obj in self.fetch(query):
+				objs[getattr(obj, self.TYPE.PK)] = obj
+
+		return objs
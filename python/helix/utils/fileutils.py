@@ -1,7 +1,13 @@
-import os, re, shutil, time
+import os, re, shutil, time, socket
 import helix.environment.environment as env
 import uuid
 
+try:
+	import fcntl
+except ImportError:
+	# Windows, fall back on atomic creation of the lock file alone
+	fcntl = None
+
 cfg = env.getConfig()
 
 SEQUENCE_FORMAT = 'sq{}'
@@ -10,22 +16,44 @@ SHOT_FORMAT = 's{}'
 class FileLockException(Exception): pass
 
 class FileLock(object):
-	def __init__(self, file, timeout=5, keepVersions=5, tempFileDir=None):
+	# Queue tickets older than this (in seconds) are assumed to belong to a waiter that died
+	STALE_TICKET_AGE = 60
+	# Locks held from another host are only assumed to be left behind once they are older
+	# than this (in seconds), there's no reliable way to tell if their holder is alive
+	STALE_LOCK_AGE = 600
+
+	def __init__(self, file, timeout=5, keepVersions=5, tempFileDir=None, backoff=0.01, maxBackoff=0.5):
 		"""Create an exclusive write lock on the specified file
 
+		The lock file is created atomically, so an uncontended lock is obtained immediately.
+		Under contention, waiters take a ticket in a queue next to the lock file and are
+		served in the order they arrived. Locks left behind by a process that died are
+		detected (from the pid recorded in the lock, or the OS advisory lock it held) and
+		cleaned up.
+
 		Args:
 		    file (str): Full path to the file to obtain a lock on
 		    timeout (int, optional): The time, in seconds, before attempting to obtain the lock fails
 		    keepVersions (int, optional): Right before exiting, we create a backup of the file
 		    	in question. This specifies how many backup versions to keep. 0 indicates no backup
 		    	should be performed.
+		    tempFileDir (str, optional): Directory to make the temp file in, defaults to next
+		    	to the file itself
+		    backoff (float, optional): The initial time, in seconds, to wait between attempts
+		    	to obtain the lock. Doubles after every failed attempt.
+		    maxBackoff (float, optional): The longest time, in seconds, to wait between attempts
 		"""
 		self._file = file
 		self.timeout = timeout
 		self.keepVersions = keepVersions
+		self.backoff = backoff
+		self.maxBackoff = maxBackoff
 		self.uuid = str(uuid.uuid4())
 		self.lockFile = self._file + '.lock'
+		self.queueDir = self._file + '.lockqueue'
 		self.tempFile = self._file + '.' + self.uuid
+		self._fd = None
+		self._ticket = None
 
 		if tempFileDir is not None:
 			_, f = os.path.split(self._file)
@@ -43,22 +71,31 @@ class FileLock(object):
 			if not os.path.exists(self._file):
 				raise ValueError("File doesn't exist: {}".format(self._file))
 
-		attempts = 10
-		interval = self.timeout / float(attempts)
-		curr = 0
-		hasLock = False
+		start = time.time()
+		interval = self.backoff
+		# Trying right away while others are waiting would jump the queue
+		hasLock = self._firstTicket() is None and self.getLock()
+
+		if not hasLock:
+			# Contended, wait our turn
+			self._enqueue()
 
-		# Try to obtain the lock until we get it or we timeout
-		while curr < self.timeout and not hasLock:
-			hasLock = self.getLock()
-			curr += interval
+			try:
+				while True:
+					if self._isNext():
+						hasLock = self.getLock()
 
-			time.sleep(interval)
-			# What do we do with dead locks?
+					if hasLock or time.time() - start >= self.timeout:
+						break
+
+					time.sleep(interval)
+					interval = min(interval * 2, self.maxBackoff)
+			finally:
+				self._dequeue()
 
 		if not hasLock:
 			raise FileLockException('Unable to obtain lock on: {}'.format(self._file))
-		
+
 		#database disk image is malformed
 		shutil.copy2(self._file, self.tempFile)
 
@@ -77,30 +114,228 @@ class FileLock(object):
 				os.remove(self.lockFile)
 		except:
 			os.remove(self.lockFile)
+		finally:
+			self._closeLockFile()
 
 	def getLock(self):
-		if not os.path.exists(self.lockFile):
-			with open(self.lockFile, 'w+') as lock:
-				lock.write(self.uuid)
+		"""Makes a single attempt at obtaining the lock, without waiting.
 
-			time.sleep(1)
-			return self.validLock()
-		else:
+		Returns:
+		    bool: Whether we now hold the lock
+		"""
+		if self._fd is not None:
 			return self.validLock()
 
+		if os.path.exists(self.lockFile) and self._isStale():
+			self._removeStale()
+
+		try:
+			fd = os.open(self.lockFile, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+		except OSError:
+			# Somebody else has it
+			return False
+
+		if fcntl is not None:
+			# Only ever held by others briefly, while they check if it's stale
+			fcntl.flock(fd, fcntl.LOCK_EX)
+
+		os.write(fd, '{}\n{}\n{}\n'.format(self.uuid, os.getpid(), socket.gethostname()))
+		os.fsync(fd)
+		self._fd = fd
+
+		return self.validLock()
+
 	def validLock(self):
 		if os.path.exists(self.lockFile):
 			# A lock exists, but is it ours?
-			with open(self.lockFile, 'r') as lock:
-				uuid = lock.read().strip()
+			return self._readLock()[0] == self.uuid
+		else:
+			return False
 
-				if uuid != self.uuid:
-					return False
-				else:
-					return True
+	def _readLock(self, fd=None):
+		"""Args:
+		    fd (int, optional): Read from this open lock file rather than the one at
+		    	the lock's path
+
+		Returns:
+		    tuple: The (uuid, pid, host) recorded in the lock file. Any of these
+		    	may be None if the file is missing or only partially written.
+		"""
+		try:
+			if fd is not None:
+				os.lseek(fd, 0, os.SEEK_SET)
+				lines = [l.strip() for l in os.read(fd, 4096).splitlines()]
+			else:
+				with open(self.lockFile, 'r') as lock:
+					lines = [l.strip() for l in lock.readlines()]
+		except (IOError, OSError):
+			lines = []
+
+		lines += [None] * (3 - len(lines))
+
+		try:
+			pid = int(lines[1])
+		except (TypeError, ValueError):
+			pid = None
+
+		return (lines[0] or None, pid, lines[2])
+
+	def _isStale(self):
+		"""Determines if the current lock file was left behind by a process that no longer
+		exists. A lock that is still being written is never considered stale, and neither
+		is one taken from another host less than STALE_LOCK_AGE ago.
+		"""
+		lockUuid, pid, host = self._readLock()
+
+		if not lockUuid or pid is None:
+			return False
+
+		if host == socket.gethostname():
+			if not _pidAlive(pid):
+				return True
 		else:
+			# Advisory locks are often only enforced locally on network shares (i.e. SMB/CIFS),
+			# so taking it below doesn't mean a holder on another host is gone
+			try:
+				if time.time() - os.path.getmtime(self.lockFile) <= FileLock.STALE_LOCK_AGE:
+					return False
+			except OSError:
+				return False
+
+		if fcntl is not None:
+			# The holder keeps an advisory lock on the file for as long as it is alive,
+			# so if we can take it ourselves the holder is gone
+			try:
+				fd = os.open(self.lockFile, os.O_RDONLY)
+			except OSError:
+				return False
+
+			try:
+				fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+				fcntl.flock(fd, fcntl.LOCK_UN)
+				return self._readLock()[0] == lockUuid
+			except IOError:
+				return False
+			finally:
+				os.close(fd)
+
+		return False
+
+	def _removeStale(self):
+		"""Removes the lock file _isStale found, unless it changed hands since. Other waiters
+		may have found the same stale lock, and one of them may already have removed it and
+		taken the lock. So the holder is read again from the file we have open, while holding
+		its advisory lock, and it's only removed if it's still the same stale holder and
+		still the file at the lock's path.
+		"""
+		if fcntl is None:
+			# No way to tell it didn't change hands
+			return
+
+		staleUuid = self._readLock()[0]
+
+		try:
+			fd = os.open(self.lockFile, os.O_RDONLY)
+		except OSError:
+			return
+
+		try:
+			fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+		except IOError:
+			# Held by someone alive, or by another waiter checking it too
+			os.close(fd)
+			return
+
+		try:
+			if staleUuid and self._readLock(fd)[0] == staleUuid and os.path.samestat(os.fstat(fd), os.stat(self.lockFile)):
+				os.remove(self.lockFile)
+		except OSError:
+			pass
+		finally:
+			fcntl.flock(fd, fcntl.LOCK_UN)
+			os.close(fd)
+
+	def _closeLockFile(self):
+		if self._fd is not None:
+			if fcntl is not None:
+				fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+			os.close(self._fd)
+			self._fd = None
+
+	def _enqueue(self):
+		if not os.path.isdir(self.queueDir):
+			try:
+				os.makedirs(self.queueDir)
+			except OSError:
+				# Made by another waiter in the meantime
+				pass
+
+		# Ticket names sort in arrival order
+		self._ticket = os.path.join(self.queueDir, '{:017.6f}_{}_{}'.format(time.time(), os.getpid(), self.uuid))
+
+		with open(self._ticket, 'w') as ticket:
+			ticket.write(socket.gethostname())
+
+	def _dequeue(self):
+		if self._ticket is not None:
+			try:
+				os.remove(self._ticket)
+			except OSError:
+				pass
+
+			self._ticket = None
+
+	def _isNext(self):
+		"""Whether our ticket is at the front of the queue. If it went missing, whether
+		nobody else is waiting, so we don't lock everyone else out because of it.
+		"""
+		first = self._firstTicket()
+
+		return first is None or first == self._ticket
+
+	def _firstTicket(self):
+		"""Returns:
+		    str: The path of the ticket at the front of the queue, None if there's none.
+		    	Tickets belonging to waiters that died are removed along the way.
+		"""
+		try:
+			tickets = sorted(os.listdir(self.queueDir))
+		except OSError:
+			return None
+
+		for t in tickets:
+			path = os.path.join(self.queueDir, t)
+
+			if path != self._ticket and self._isStaleTicket(path):
+				try:
+					os.remove(path)
+				except OSError:
+					pass
+
+				continue
+
+			return path
+
+		return None
+
+	def _isStaleTicket(self, path):
+		try:
+			if time.time() - os.path.getmtime(path) > FileLock.STALE_TICKET_AGE:
+				return True
+
+			with open(path, 'r') as ticket:
+				host = ticket.read().strip()
+		except (IOError, OSError):
 			return False
 
+		try:
+			pid = int(os.path.basename(path).split('_')[1])
+		except (IndexError, ValueError):
+			return False
+
+		return host == socket.gethostname() and not _pidAlive(pid)
+
 	def __exit__(self, exception_type, exception_value, traceback):
 		self.release()
 
@@ -108,6 +343,19 @@ class FileLock(object):
 	def file(self):
 		return self.tempFile
 
+def _pidAlive(pid):
+	if env.OS == env.WIN:
+		# os.kill would terminate the process on Windows, assume alive
+		return True
+
+	try:
+		os.kill(pid, 0)
+	except OSError as e:
+		import errno
+		return e.errno == errno.EPERM
+
+	return True
+
 def bumpFileVersion(file, maxVersion):
 	folder, file = os.path.split(file)
 	prefix, ext = os.path.splitext(file)
@@ -166,6 +166,26 @@ class Node(object):
 
 		return child
 
+	def insertChild(self, row, child):
+		child._parent = self
+		self._children.insert(row, child)
+		self._colCount = max(child.columnCount(), self._colCount)
+		self._renumber(row)
+
+		return child
+
+	def removeChild(self, row):
+		child = self._children.pop(row)
+		child._parent = None
+		self._renumber(row)
+
+		return child
+
+	def _renumber(self, start):
+		# Rows are cached on the children for the models' parent(), keep them in step
+		for row in range(start, len(self._children)):
+			self._children[row]._row = row
+
 class Operation(object):
 	def __init__(self, numOps=0, parent=None):
 		self.progressDialog = None
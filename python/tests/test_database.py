@@ -1,5 +1,5 @@
 import unittest
-import os, shutil
+import os, shutil, getpass
 
 from helix.database.sql import Manager
 from helix.database.show import Show
@@ -10,7 +10,15 @@ from helix.database.element import Element
 from helix.database.fix import Fix
 from helix.database.take import Take
 from helix.database.publishedFile import PublishedFile
+from helix.database.snapshot import Snapshot
+from helix.database import migrations, hierarchy, lineage
+from helix.database.query import Query
+from helix.database.identity import identityMap
+from helix.database.database import Pager
+from helix.database.search import search
+from helix.database.changes import changesSince, ChangeFeed
 import helix.environment.environment as env
+from helix.environment.permissions import PermissionGroup, PermissionHandler, CompiledPermissions
 
 class DatabaseTestCase(unittest.TestCase):
 	def testShow(self):
@@ -310,6 +318,301 @@ class DatabaseTestCase(unittest.TestCase):
 
 		take2.insert()
 
+	def testBulk(self):
+		els = [Element('bulk{}'.format(i), 'prop', 'foobar') for i in range(10)]
+
+		self.assertEqual(Element.insertMany(els), [True] * 10)
+		self.assertTrue(all([e.exists(fetch=True) for e in els]))
+
+		# Already inserted rows are reported individually
+		self.assertEqual(Element.insertMany([Element('bulk10', 'prop', 'foobar'), Element('bulk0', 'prop', 'foobar')]), [True, False])
+
+		for e in els:
+			e.status = 'ip'
+
+		nonextant = Element('bulk11', 'prop', 'foobar')
+		nonextant.status = 'ip'
+
+		self.assertEqual(Element.updateMany(els[:2] + [nonextant], ['status']), [True, True, False])
+		self.assertEqual(Element('bulk1', 'prop', 'foobar').status, 'ip')
+		self.assertEqual(Element('bulk2', 'prop', 'foobar').status, 'new')
+
+		# Leave the show's elements as the other tests expect them
+		for e in els + [Element('bulk10', 'prop', 'foobar')]:
+			e.delete()
+
+		self.assertFalse(any([e.exists(fetch=True) for e in els]))
+
+	def testMigrations(self):
+		with Manager(willCommit=False) as mgr:
+			self.assertEqual(migrations.getVersion(mgr.connection()), migrations.LATEST)
+			self.assertFalse(migrations.needsMigration(mgr.connection()))
+
+			indexes = [r[0] for r in mgr.connection().execute("SELECT name FROM sqlite_master WHERE type='index'").fetchall()]
+			self.assertIn('elements_show_sequence_shot', indexes)
+
+		# Re-running is a no-op
+		with Manager() as mgr:
+			self.assertEqual(migrations.migrate(mgr.connection()), [])
+
+	def testQuery(self):
+		query = Query('elements').where('show', 'foobar').whereIn('type', ['prop', 'set']).whereIn('shot', []).whereIn('sequence', 'null').limit(5)
+
+		self.assertEqual(query.sql, 'SELECT * FROM elements WHERE show=? AND type IN (?,?) AND sequence IS NULL LIMIT ?')
+		self.assertEqual(query.values, ['foobar', 'prop', 'set', 5])
+
+		# Everything starts with an empty prefix
+		self.assertEqual(Query('elements').whereStartsWith('ancestry', '').sql, 'SELECT * FROM elements')
+
+		# Values are never formatted into the statement
+		show = Show.fromPk('foobar')
+		self.assertEqual(len(show.getElements(authors=["o'brien"])), 0)
+		self.assertEqual(len(show.getShots(seqs=100)), 2)
+
+		# Streaming yields the same elements, a chunk at a time
+		self.assertEqual([e.id for e in show.iterElements(chunkSize=1)], [e.id for e in show.getElements()])
+
+	def testIdentityMap(self):
+		with identityMap() as cache:
+			show = Show.fromPk('foobar')
+
+			self.assertIs(show, Show.fromPk('foobar'))
+			self.assertEqual(len(cache), 1)
+
+			# Writes evict what they touch
+			show.set('name', 'Foo Bar')
+			self.assertIsNot(show, Show.fromPk('foobar'))
+			self.assertEqual(Show.fromPk('foobar').name, 'Foo Bar')
+
+			with identityMap(enabled=False):
+				self.assertIsNot(Show.fromPk('foobar'), Show.fromPk('foobar'))
+
+		self.assertIsNot(Show.fromPk('foobar'), Show.fromPk('foobar'))
+
+	def testRecords(self):
+		Element('recorded', 'prop', 'foobar').insert()
+
+		show = Show.fromPk('foobar')
+		records = show.getElements(names='recorded', records=True)
+
+		self.assertEqual(len(records), 1)
+
+		record = records[0]
+		el = Element('recorded', 'prop', 'foobar')
+
+		self.assertEqual((record.name, record.type, record.id), ('recorded', 'prop', el.id))
+		self.assertRaises(AttributeError, setattr, record, 'name', 'foo')
+		self.assertEqual(record.toObject(), el)
+
+		el.delete()
+
+	def testProjection(self):
+		Element('projected', 'prop', 'foobar').insert()
+		Fix('task', 'Projected fix', 'This is the body', 'comp', show='foobar', elementName='projected', elementType='prop').insert()
+
+		show = Show.fromPk('foobar')
+		el = show.getElements(names='projected', columns=['name', 'type'])[0]
+
+		self.assertNotIn('author', el.__dict__)
+		self.assertEqual(el.author, 'spaouellet') # Loaded on first access
+		self.assertEqual(el, Element('projected', 'prop', 'foobar'))
+
+		fix = el.getFixes(columns=['title'])[0]
+
+		self.assertNotIn('body', fix.__dict__)
+		self.assertEqual(fix.body, 'This is the body')
+		self.assertRaises(ValueError, show.getFixes, columns=['foo'])
+
+		# Mappers are made once per set of columns, until the schema changes
+		mapRow = Element.rowMapper(['name', 'type'])
+
+		self.assertIs(Element.rowMapper(['name', 'type']), mapRow)
+		self.assertIsNot(Element.rowMapper(), mapRow)
+
+		Manager.clearSchemaCache()
+		self.assertIsNot(Element.rowMapper(['name', 'type']), mapRow)
+
+		Fix.fromPk(fix.id).delete()
+		el.delete()
+
+	def testPaging(self):
+		names = ['paged{}'.format(i) for i in range(4)]
+		Element.insertMany([Element(n, t, 'foobar') for n, t in zip(names, ['set', 'prop', 'set', 'prop'])])
+
+		show = Show.fromPk('foobar')
+		els = sorted(show.getElements(names=names), key=lambda e: (e.type, e.name))
+		first = show.getElements(names=names, limit=2)
+		rest = show.getElements(names=names, limit=2, after=first[-1])
+
+		self.assertEqual(first + rest, els)
+		self.assertEqual(show.getElements(names=names, limit=2, after=els[-1]), [])
+		self.assertEqual(list(Pager(show.getElements, names=names, pageSize=1)), els)
+
+		for el in els:
+			el.delete()
+
+	def testEagerLoading(self):
+		show = Show.fromPk('foobar')
+		el = show.getElements(types='plate', eager=True)[0]
+
+		self.assertIn('_eager', el.__dict__)
+		self.assertEqual(el.parent, Shot(100, 100, 'foobar'))
+		self.assertIs(el.parent.parent, el.parent.parent) # Same loaded object, not looked up again
+		self.assertEqual(el, show.getElements(types='plate')[0])
+		self.assertRaises(ValueError, show.getElements, records=True, eager=True)
+
+	def testHierarchy(self):
+		seq = Sequence(100, 'foobar')
+		shot = Shot(100, 100, 'foobar')
+		el = Element('render', 'plate', 'foobar', shot=100, sequence=100)
+
+		self.assertEqual(el.ancestry, '/foobar/{}/{}/'.format(seq.id, shot.id))
+		self.assertTrue(hierarchy.isDescendant(el, seq))
+		self.assertFalse(hierarchy.isDescendant(el, Sequence(900, 'foobar')))
+		self.assertIn('render', [e.name for e in seq.getElements()])
+		self.assertNotIn('render', [e.name for e in seq.getElements(exclusive=True)])
+
+		with Manager(willCommit=False) as mgr:
+			self.assertEqual(mgr.connection().execute('SELECT ancestry FROM elements WHERE id=?', (el.id, )).fetchone()[0], el.ancestry)
+
+	def testTaskStats(self):
+		show = Show.fromPk('foobar')
+		shot = Shot(100, 100, 'foobar')
+		Fix('task', 'Stats task', 'This is the body', 'comp', show='foobar', sequence=100, shot=100).insert()
+
+		self.assertEqual(show.completionBy('shotId')[shot.id], 0)
+		self.assertEqual(show.taskCountsBy(['shotId', 'for_dept'])[(shot.id, 'comp')], 1)
+		self.assertEqual(show.taskCountsBy(['shotId', 'for_dept'])[(shot.id, 'layout')], 0)
+		self.assertRaises(ValueError, show.taskCountsBy, ['nope'])
+
+		# The per container stats are the same queries, grouped once
+		self.assertEqual(shot.completion, 0)
+		self.assertEqual(Sequence(100, 'foobar').completion, show.completionBy('sequence')[100])
+		self.assertEqual(show.numTasksBy('for_dept')['comp'], show.taskCountsBy(['for_dept'])[('comp', )])
+		self.assertEqual(show.numTasksBy('fixer')['_'], show.numTasks())
+
+	def testStagesByShot(self):
+		Shot(200, 100, 'foobar').addStages(['compositing', 'layout'])
+
+		stagesByShot = Sequence(100, 'foobar').getStagesByShot()
+
+		self.assertEqual([s.num for s in stagesByShot.keys()], [100, 200])
+		self.assertEqual(stagesByShot.values()[0], [])
+		self.assertEqual([s.stage for s in stagesByShot.values()[1]], ['layout', 'compositing'])
+
+	def testSearch(self):
+		el = Element('searchable_prop', 'prop', 'foobar', sequence=100)
+		el.insert()
+
+		ids = lambda objs: [o.id for o in objs]
+
+		self.assertIn(el.id, ids(search('searchable', show='foobar')))
+		self.assertIn(el.id, ids(search('search', kinds=['element'], under=Sequence(100, 'foobar').subtree)))
+		self.assertNotIn(el.id, ids(search('searchable', kinds=['fix'])))
+
+		# Any part of the name matches, not just the start of a word
+		self.assertIn(el.id, ids(search('chab', show='foobar')))
+		self.assertIn(el.id, ids(search('e_p', show='foobar')))
+		self.assertIn(el.id, ids(search('ab prop', show='foobar')))
+		self.assertNotIn(el.id, ids(search('bap', show='foobar')))
+
+		# Moving it under another parent moves it in the index too
+		with Manager() as mgr:
+			mgr.connection().execute('UPDATE elements SET ancestry=? WHERE id=?', (Sequence(900, 'foobar').subtree, el.id))
+
+		self.assertIn(el.id, ids(search('searchable', under=Sequence(900, 'foobar').subtree)))
+		self.assertNotIn(el.id, ids(search('searchable', under=Sequence(100, 'foobar').subtree)))
+
+		el.delete()
+
+		self.assertNotIn(el.id, ids(search('searchable')))
+		self.assertRaises(ValueError, search, 'searchable', kinds=['nope'])
+
+	def testPermissions(self):
+		compiled = CompiledPermissions(['helix.*', '^helix.delete.*', 'helix.delete.shot'])
+
+		self.assertTrue(compiled.allows('helix.pop'))
+		self.assertFalse(compiled.allows('helix.delete.element'))
+		self.assertTrue(compiled.allows('helix.delete.shot'))
+		self.assertFalse(compiled.allows('other.pop'))
+
+		# Changing the user's group applies right away
+		user = Person(getpass.getuser())
+		PermissionGroup('viewers', permissions=['helix.view.*']).insert()
+		user.set('perm_group', 'viewers', insertIfMissing=True)
+
+		self.assertTrue(PermissionHandler().check('helix.view.show', silent=True))
+		self.assertFalse(PermissionHandler().check('helix.pop', silent=True))
+
+		user.set('perm_group', PermissionGroup.DEFAULT)
+
+	def testFixComments(self):
+		fix = Fix('task', 'Commented fix', 'This is the body', 'comp', show='foobar')
+		fix.insert()
+		fix.addComment('It\'s "quoted"')
+		fix.addComment('Second')
+
+		self.assertEqual([c[2] for c in Fix.fromPk(fix.id).commentList], ['It\'s "quoted"', 'Second'])
+
+		fix.delete()
+
+		with Manager(willCommit=False) as mgr:
+			self.assertEqual(mgr.connection().execute('SELECT COUNT(*) FROM fixComments WHERE fixId=?', (fix.id, )).fetchone()[0], 0)
+
+	def testCounters(self):
+		# Made at the same time, so both were shown the same number
+		first = Fix('task', 'First counted fix', 'This is the body', 'comp', show='foobar')
+		second = Fix('task', 'Second counted fix', 'This is the body', 'comp', show='foobar')
+
+		self.assertEqual(first.num, second.num)
+
+		second.insert()
+		first.insert()
+
+		self.assertEqual(first.num, second.num + 1)
+		self.assertEqual(Fix.nextFixNum('foobar'), first.num + 1)
+		self.assertEqual(Fix.byNum(second.num, 'foobar').id, second.id)
+
+		first.delete()
+		second.delete()
+
+		# Snapshot numbers are only taken when reserved or inserted
+		snapshot = Snapshot(100, 100, 'foobar')
+		num = snapshot.num
+
+		self.assertEqual(Snapshot(100, 100, 'foobar').num, num)
+		self.assertEqual(snapshot.reserveNum(makeDirs=False), num)
+		self.assertEqual(Snapshot(100, 100, 'foobar').num, num + 1)
+		self.assertTrue(snapshot.file_path.endswith(str(num)))
+
+	def testChangeFeed(self):
+		feed = ChangeFeed(tables=['fixes'])
+		since = feed.seq
+
+		fix = Fix('task', 'Followed fix', 'This is the body', 'comp', show='foobar')
+		fix.insert()
+		fix.addComment('Comment')
+		fix.delete()
+
+		self.assertEqual([(c.pk, c.op) for c in feed.poll()], [(fix.id, 'insert'), (fix.id, 'update'), (fix.id, 'delete')])
+		self.assertEqual(feed.poll(), [])
+		self.assertEqual(len(changesSince(since, tables=['fixes'])), 3)
+		self.assertIsNone(changesSince(feed.seq + 1))
+
+	def testWithoutShowSet(self):
+		# Explicitly given shows shouldn't need one in the environment to fall back to
+		show = os.environ.pop('HELIX_SHOW', None)
+		lineage.invalidate()
+
+		try:
+			self.assertTrue(Shot(100, 100, 'foobar').exists())
+			self.assertTrue(Element('camera', 'camera', 'foobar', sequence=100).exists())
+			self.assertEqual(Fix('task', 'Unset fix', 'This is the body', 'comp', show='foobar', sequence=100, shot=100).shot, 100)
+			self.assertEqual(Snapshot(100, 100, 'foobar').show, 'foobar')
+		finally:
+			if show:
+				env.setEnvironment('show', show)
+
 	@classmethod
 	def setUpClass(cls):
 		if not os.path.exists(os.environ['HELIX_DB']):
@@ -1,8 +1,69 @@
 import unittest
+import os, shutil, socket, tempfile, time
 import helix.utils.utils as utils
+from helix.utils.fileutils import FileLock, FileLockException
 from helix.utils.fileclassification import FrameSequence, Frame
 
 class UtilTestCase(unittest.TestCase):
+	def testFileLock(self):
+		tempDir = tempfile.mkdtemp()
+		file = os.path.join(tempDir, 'test.db')
+
+		try:
+			open(file, 'w').close()
+
+			# Uncontended lock should be immediate
+			start = time.time()
+
+			with FileLock(file, keepVersions=0) as lock:
+				self.assertTrue(lock.validLock())
+
+			self.assertLess(time.time() - start, 0.5)
+			self.assertFalse(os.path.exists(file + '.lock'))
+
+			# Contended lock times out
+			lock = FileLock(file, keepVersions=0)
+			lock.open()
+
+			with self.assertRaises(FileLockException):
+				FileLock(file, keepVersions=0, timeout=0.2).open()
+
+			lock.release()
+
+			# Lock left behind by a dead process is cleaned up
+			with open(file + '.lock', 'w') as stale:
+				stale.write('deadbeef\n999999\n{}\n'.format(socket.gethostname()))
+
+			with FileLock(file, keepVersions=0, timeout=0.2) as lock:
+				self.assertTrue(lock.validLock())
+
+			# Unless it was taken from another host, that's only assumed after a long time
+			with open(file + '.lock', 'w') as remote:
+				remote.write('deadbeef\n999999\nsomeotherhost\n')
+
+			with self.assertRaises(FileLockException):
+				FileLock(file, keepVersions=0, timeout=0.2).open()
+
+			old = time.time() - FileLock.STALE_LOCK_AGE - 1
+			os.utime(file + '.lock', (old, old))
+
+			with FileLock(file, keepVersions=0, timeout=0.2) as lock:
+				self.assertTrue(lock.validLock())
+
+			# Newcomers queue up behind live waiters, even if the lock is free right now
+			waiter = FileLock(file, keepVersions=0)
+			waiter._enqueue()
+
+			with self.assertRaises(FileLockException):
+				FileLock(file, keepVersions=0, timeout=0.2).open()
+
+			waiter._dequeue()
+
+			with FileLock(file, keepVersions=0, timeout=0.2) as lock:
+				self.assertTrue(lock.validLock())
+		finally:
+			shutil.rmtree(tempDir)
+
 	def testFrameSequence(self):
 		pass
 	def testIsSanitary(self):